@@ -13,6 +13,7 @@ from glob import glob
 from pathlib import Path
 from typing import Any, Dict, IO, Iterable, List, Literal, Optional, Set
 
+from .compression import open_text
 from .sharded_files import ShardedFile
 
 METADATA_GLOB = "*metadata.json"
@@ -345,7 +346,8 @@ class AnalysisOutput:
             self.file_handle = None
         else:
             for name in self.file_names():
-                with open(name, "r") as f:
+                # Compressed files are decompressed on the fly.
+                with open_text(name, threaded=True) as f:
                     yield f
 
     def file_names(self) -> Iterable[str]:
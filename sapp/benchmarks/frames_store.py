@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+"""
+Compares the memory used to hold parsed frames in each frames store.
+
+    python -m sapp.benchmarks.frames_store [--models N]
+
+A synthetic Mariana Trench output is parsed once per store. For each store,
+reports the parse time, the memory still allocated once parsing is done, and
+the time to look up the frames of every caller, as the model generator does.
+"""
+
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import List, Tuple
+
+import click
+
+from ..analysis_output import AnalysisOutput, Metadata, Rule
+from ..pipeline import FramesStore, IssuesAndFrames
+from ..pipeline.mariana_trench_parser import Parser
+from .mariana_trench_parser import write_models
+
+
+def _look_up_all(issues_and_frames: IssuesAndFrames) -> int:
+    count = 0
+    for frames in (issues_and_frames.preconditions, issues_and_frames.postconditions):
+        keys = {(frame.caller, frame.caller_port) for frame in frames.all_frames()}
+        for caller, caller_port in keys:
+            count += len(frames.frames_from_caller(caller, caller_port))
+    return count
+
+
+def run(path: str, frames_store: FramesStore) -> Tuple[float, float, float, int]:
+    """Returns the parse time, the allocated memory in MB after parsing, the
+    lookup time and the number of frames looked up."""
+    metadata = Metadata(rules={1: Rule(name="Rule", description="Rule")})
+    parser = Parser(frames_store=frames_store)
+    parser.initialize(metadata)
+    analysis_output = AnalysisOutput(filename_specs=[path], metadata=metadata)
+
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        issues_and_frames = parser.parse_analysis_output(analysis_output)
+        parse_seconds = time.perf_counter() - start
+        allocated, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    start = time.perf_counter()
+    count = _look_up_all(issues_and_frames)
+    lookup_seconds = time.perf_counter() - start
+    issues_and_frames.preconditions.dispose()
+    issues_and_frames.postconditions.dispose()
+    return parse_seconds, allocated / 1024**2, lookup_seconds, count
+
+
+@click.command()
+@click.option("--models", type=int, default=50_000, help="synthetic models")
+@click.option(
+    "--store",
+    "stores",
+    multiple=True,
+    type=click.Choice([store.value for store in FramesStore if store.value != "lazy"]),
+    help="stores to compare, defaults to all of them",
+)
+def main(models: int, stores: List[str]) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "models.json")
+        write_models(path, models)
+        for store in stores or ["memory", "compact", "disk"]:
+            parse_seconds, allocated, lookup_seconds, count = run(
+                path, FramesStore(store)
+            )
+            click.echo(
+                f"{store:>8}: parsed in {parse_seconds:.2f}s, "
+                f"{allocated:.1f} MB allocated, "
+                f"{count} frames looked up in {lookup_seconds:.2f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
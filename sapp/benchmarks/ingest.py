@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+"""
+Measures each step of the ingestion of a synthetic analysis output.
+
+    python -m sapp.benchmarks.ingest [--issues N] [--depth N] [--fan-out N]
+        [--format pysa|mariana-trench] [--report REPORT_FILE]
+
+The output is generated from a seed, so the same options always ingest the same
+output. For each step, the time, the throughput in issues per second and the
+peak RSS of the process once the step is done are written as JSON to
+`--report`, together with the options and the commit being measured, so that
+reports of different commits can be compared.
+"""
+
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from dataclasses import asdict
+from typing import Any, Dict, Iterator, List, Optional
+
+import click
+
+from ..analysis_output import AnalysisOutput
+from ..db import DB, DBType
+from ..metrics_logger import MetricsLogger, NoOpScopedMetricsLogger
+from ..models import PrimaryKeyGenerator, Run
+from ..operating_system import get_peak_rss_in_mb
+from ..pipeline import FramesStore, PipelineBuilder, Summary
+from ..pipeline.create_database import CreateDatabase
+from ..pipeline.database_saver import DatabaseSaver
+from ..pipeline.mariana_trench_parser import Parser as MarianaTrenchParser
+from ..pipeline.model_generator import ModelGenerator
+from ..pipeline.pysa_taint_parser import Parser as PysaParser
+from ..pipeline.trim_trace_graph import TrimTraceGraph
+from .synthetic_output import metadata, OutputFormat, OutputShape, write_output
+
+
+class _StepMetricsLogger(MetricsLogger):
+    def __init__(self, issues: int) -> None:
+        self.issues = issues
+        self.steps: List[Dict[str, Any]] = []
+
+    @contextlib.contextmanager
+    def log_timing(self, key: str) -> Iterator[NoOpScopedMetricsLogger]:
+        start = time.perf_counter()
+        yield NoOpScopedMetricsLogger(self)
+        seconds = time.perf_counter() - start
+        self.steps.append(
+            {
+                "name": key.split(":", 1)[-1],
+                "seconds": round(seconds, 3),
+                "issues_per_second": round(self.issues / seconds, 1),
+                "peak_rss_mb": round(get_peak_rss_in_mb(), 1),
+            }
+        )
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(__file__),
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(
+    directory: str, shape: OutputShape, format: OutputFormat, frames_store: FramesStore
+) -> Dict[str, Any]:
+    paths = write_output(directory, shape, format)
+    size = sum(os.path.getsize(path) for path in paths) / 1024**2
+    initial_rss = get_peak_rss_in_mb()
+
+    database = DB(DBType.SQLITE, os.path.join(directory, "sapp.db"))
+    if format == OutputFormat.PYSA:
+        parser_class, filename_specs = PysaParser, paths
+    else:
+        # Shards of Mariana Trench outputs are found from their pattern.
+        parser_class = MarianaTrenchParser
+        filename_specs = [os.path.join(directory, "model@*.json")]
+    pipeline = (
+        PipelineBuilder()
+        .append(parser_class(frames_store=frames_store))
+        .append(CreateDatabase(database))
+        .append(ModelGenerator())
+        .append(TrimTraceGraph())
+        .append(DatabaseSaver(database, Run, PrimaryKeyGenerator()))
+        .build()
+    )
+    metrics_logger = _StepMetricsLogger(shape.issues)
+    start = time.perf_counter()
+    pipeline.run(
+        AnalysisOutput(filename_specs=filename_specs, metadata=metadata(format)),
+        Summary(),
+        metrics_logger,
+    )
+    seconds = time.perf_counter() - start
+
+    return {
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "format": format.value,
+        "frames_store": frames_store.value,
+        "shape": asdict(shape),
+        "output_mb": round(size, 1),
+        "initial_rss_mb": round(initial_rss, 1),
+        "seconds": round(seconds, 3),
+        "steps": metrics_logger.steps,
+    }
+
+
+@click.command()
+@click.option("--issues", type=int, default=OutputShape.issues)
+@click.option("--depth", type=int, default=OutputShape.depth, help="trace length")
+@click.option("--fan-out", type=int, default=OutputShape.fan_out)
+@click.option("--tito-density", type=float, default=OutputShape.tito_density)
+@click.option("--feature-density", type=float, default=OutputShape.feature_density)
+@click.option("--files", type=int, default=OutputShape.files)
+@click.option("--seed", type=int, default=OutputShape.seed)
+@click.option(
+    "--format",
+    "format_",
+    type=click.Choice([format.value for format in OutputFormat]),
+    default=OutputFormat.PYSA.value,
+)
+@click.option(
+    "--frames-store",
+    type=click.Choice([store.value for store in FramesStore]),
+    default=FramesStore.MEMORY.value,
+)
+@click.option("--report", type=click.Path(dir_okay=False), help="JSON report file")
+def main(
+    issues: int,
+    depth: int,
+    fan_out: int,
+    tito_density: float,
+    feature_density: float,
+    files: int,
+    seed: int,
+    format_: str,
+    frames_store: str,
+    report: Optional[str],
+) -> None:
+    shape = OutputShape(
+        issues=issues,
+        depth=depth,
+        fan_out=fan_out,
+        tito_density=tito_density,
+        feature_density=feature_density,
+        files=files,
+        seed=seed,
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        result = run(directory, shape, OutputFormat(format_), FramesStore(frames_store))
+
+    click.echo(
+        f"Ingested {shape.issues} issues from {result['output_mb']:.1f} MB "
+        f"in {result['seconds']:.2f}s"
+    )
+    for step in result["steps"]:
+        click.echo(
+            f"  {step['name']}: {step['seconds']:.2f}s, "
+            f"{step['issues_per_second']:.0f} issues/s, "
+            f"peak RSS {step['peak_rss_mb']:.1f} MB"
+        )
+    if report is not None:
+        with open(report, "w") as file:
+            json.dump(result, file, indent=2)
+            file.write("\n")
+
+
+if __name__ == "__main__":
+    main()
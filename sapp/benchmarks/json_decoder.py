@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+"""
+Compares the installed JSON decoders on analysis output lines.
+
+    python -m sapp.benchmarks.json_decoder [--lines N]
+
+For every decoder, reports the time to decode the lines alone and the time to
+parse them with the Mariana Trench parser.
+"""
+
+import json
+import os
+import tempfile
+import time
+
+import click
+
+from .. import json_decoder
+from .mariana_trench_parser import run, synthetic_model, write_models
+
+
+@click.command()
+@click.option("--lines", type=int, default=50_000, help="synthetic models")
+@click.option("--repeat", type=int, default=3, help="best of this many runs")
+def main(lines: int, repeat: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "model@00000-of-00001.json")
+        write_models(path, lines)
+        encoded = [json.dumps(synthetic_model(index)) for index in range(lines)]
+        size = sum(len(line) for line in encoded) / 1024**2
+
+        baseline = None
+        for decoder in json_decoder.available_decoders()[::-1]:
+            json_decoder.set_decoder(decoder)
+            loads = json_decoder.loads
+
+            decode_seconds = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                for line in encoded:
+                    loads(line)
+                decode_seconds = min(decode_seconds, time.perf_counter() - start)
+            parse_seconds = min(run([path])[1] for _ in range(repeat))
+
+            baseline = baseline or (decode_seconds, parse_seconds)
+            click.echo(
+                f"{decoder.value:>8}: decode {size / decode_seconds:7.1f} MB/s "
+                f"({baseline[0] / decode_seconds:.1f}x), "
+                f"parse {size / parse_seconds:5.1f} MB/s "
+                f"({baseline[1] / parse_seconds:.1f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
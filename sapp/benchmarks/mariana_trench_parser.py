@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+"""
+Measures the throughput and peak memory of the Mariana Trench parser.
+
+    python -m sapp.benchmarks.mariana_trench_parser [MODEL_FILE ...]
+
+Without model files, a synthetic output with `--models` methods is generated.
+Entries are counted and dropped as they are produced, so the peak RSS is the
+memory needed by the parser itself.
+"""
+
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+import click
+
+from ..analysis_output import Metadata, Rule
+from ..operating_system import get_peak_rss_in_mb
+from ..pipeline.mariana_trench_parser import Parser
+
+
+def _taint(callee: str, kind: str, frame_type: str) -> Dict[str, Any]:
+    return {
+        "call_info": {
+            "call_kind": "CallSite",
+            "resolves_to": callee,
+            "port": "Argument(1)" if frame_type == "sink" else "Return",
+            "position": {"path": "Flow.java", "line": 10, "start": 11, "end": 12},
+        },
+        "kinds": [
+            {
+                "distance": 1,
+                "kind": kind,
+                "origins": [{"method": f"{callee}Leaf", "port": "Argument(1)"}],
+            }
+        ],
+        "local_positions": [{"line": 13, "start": 14, "end": 15}],
+        "local_features": {"always_features": ["via-parameter-field"]},
+    }
+
+
+def synthetic_model(index: int) -> Dict[str, Any]:
+    method = f"LClass{index};.method:()V"
+    callee = f"LClass{index + 1};.method:()V"
+    model: Dict[str, Any] = {
+        "method": method,
+        "position": {"line": 2, "path": f"Class{index}.java"},
+        "sinks": [{"port": "Argument(1)", "taint": [_taint(callee, "Sink", "sink")]}],
+        "generations": [
+            {"port": "Return", "taint": [_taint(callee, "Source", "source")]}
+        ],
+    }
+    if index % 10 == 0:
+        model["issues"] = [
+            {
+                "rule": 1,
+                "position": {"path": "Flow.java", "line": 10, "start": 11, "end": 12},
+                "callee": callee,
+                "sink_index": "0",
+                "sinks": [_taint(callee, "Sink", "sink")],
+                "sources": [_taint(callee, "Source", "source")],
+            }
+        ]
+    return model
+
+
+def write_models(path: str, models: int) -> None:
+    with open(path, "w") as handle:
+        handle.write("// @generated\n")
+        for index in range(models):
+            handle.write(json.dumps(synthetic_model(index)) + "\n")
+
+
+def run(paths: List[str]) -> Tuple[int, float]:
+    parser = Parser()
+    parser.initialize(Metadata(rules={1: Rule(name="Rule", description="Rule")}))
+    entries = 0
+    start = time.perf_counter()
+    for path in paths:
+        with open(path) as handle:
+            for _ in parser.parse_handle(handle):
+                entries += 1
+    return entries, time.perf_counter() - start
+
+
+@click.command()
+@click.option("--models", type=int, default=100_000, help="synthetic models")
+@click.argument("model_files", nargs=-1, type=click.Path(exists=True))
+def main(models: int, model_files: Tuple[str, ...]) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        paths = list(model_files)
+        if not paths:
+            path = os.path.join(directory, "model@00000-of-00001.json")
+            write_models(path, models)
+            paths = [path]
+
+        initial_rss = get_peak_rss_in_mb()
+        entries, seconds = run(paths)
+        size = sum(os.path.getsize(path) for path in paths) / 1024**2
+
+    click.echo(f"Parsed {entries} entries from {size:.1f} MB in {seconds:.2f}s")
+    click.echo(f"{entries / seconds:.0f} entries/s, {size / seconds:.1f} MB/s")
+    click.echo(
+        f"Peak RSS: {get_peak_rss_in_mb():.1f} MB ({initial_rss:.1f} MB before parsing)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+"""
+Deterministic synthetic analysis outputs, in the Pysa or Mariana Trench format.
+
+Callables form layers: the callables with issues, then `depth` layers of
+callables with sink models and as many with source models. Each issue calls
+`fan_out` callables of the first layers, and each model calls `fan_out`
+callables of the next layer, or the leaf for the last layer. Callees are drawn
+at random, so traces of different issues share their models as they do in real
+outputs. The same shape and seed always produce the same output.
+"""
+
+import json
+import os
+import random
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Dict, Iterator, List
+
+from ..analysis_output import Metadata, Rule
+
+MODULES = 100
+FEATURES = 50
+
+
+class OutputFormat(Enum):
+    PYSA = "pysa"
+    MARIANA_TRENCH = "mariana-trench"
+
+
+@dataclass(frozen=True)
+class OutputShape:
+    issues: int = 1_000
+    # Layers of models between an issue and the leaves of its traces.
+    depth: int = 4
+    # Callees of each issue and model, on each side.
+    fan_out: int = 2
+    # Share of frames with a tito position.
+    tito_density: float = 0.2
+    # Average number of features of a frame.
+    feature_density: float = 1.0
+    # Number of files the entries are spread over.
+    files: int = 1
+    seed: int = 0
+
+
+@dataclass(frozen=True)
+class _Call:
+    callee: int
+    line: int
+    features: List[str]
+    titos: List[int]
+
+
+class _Generator:
+    def __init__(self, shape: OutputShape) -> None:
+        self.shape = shape
+        self.random = random.Random(shape.seed)
+
+    def calls(self) -> List[_Call]:
+        shape = self.shape
+        callees = self.random.sample(
+            range(shape.issues), min(shape.fan_out, shape.issues)
+        )
+        return [
+            _Call(
+                callee=callee,
+                line=10 + index,
+                features=self.features(),
+                titos=[20 + index] if self.random.random() < shape.tito_density else [],
+            )
+            for index, callee in enumerate(callees)
+        ]
+
+    def features(self) -> List[str]:
+        density = self.shape.feature_density
+        count = int(density) + (self.random.random() < density - int(density))
+        return [f"feature{self.random.randrange(FEATURES)}" for _ in range(count)]
+
+
+def _pysa_position(line: int) -> Dict[str, int]:
+    return {"line": line, "start": 3, "end": 7}
+
+
+class _Pysa:
+    def __init__(self, shape: OutputShape) -> None:
+        self.shape = shape
+
+    def callable(self, side: str, layer: int, index: int) -> str:
+        return f"m{index % MODULES}.{side}{layer}_{index}"
+
+    def _taint(self, side: str, layer: int, call: _Call, port: str) -> Dict[str, Any]:
+        kind = "RCE" if side == "sink" else "UserControlled"
+        return {
+            "call": {
+                "position": _pysa_position(call.line),
+                "resolves_to": [self.callable(side, layer, call.callee)],
+                "port": port,
+            },
+            "kinds": [{"kind": kind, "length": self.shape.depth - layer + 1}],
+            "tito_positions": [_pysa_position(line) for line in call.titos],
+            "local_features": [{"always-via": feature} for feature in call.features],
+        }
+
+    def _leaf(self, side: str) -> Dict[str, Any]:
+        kind = "RCE" if side == "sink" else "UserControlled"
+        return {"origin": _pysa_position(5), "kinds": [{"kind": kind}]}
+
+    def _port(self, side: str) -> str:
+        return "formal(x)" if side == "sink" else "result"
+
+    def issue(self, index: int, sinks: List[_Call], sources: List[_Call]) -> Any:
+        callable = f"m{index % MODULES}.issue_{index}"
+        return {
+            "kind": "issue",
+            "data": {
+                "callable": callable,
+                "callable_line": 1,
+                "code": 5001,
+                "line": 2,
+                "start": 3,
+                "end": 7,
+                "filename": f"m{index % MODULES}.py",
+                "message": "[UserControlled] to [RCE]",
+                "master_handle": f"{callable}:5001",
+                "features": [{"always-via": "issue"}],
+                "traces": [
+                    {
+                        "name": "forward",
+                        "roots": [
+                            self._taint("source", 1, call, "result") for call in sources
+                        ],
+                    },
+                    {
+                        "name": "backward",
+                        "roots": [
+                            self._taint("sink", 1, call, "formal(x)") for call in sinks
+                        ],
+                    },
+                ],
+            },
+        }
+
+    def model(self, side: str, layer: int, index: int, calls: List[_Call]) -> Any:
+        port = self._port(side)
+        taint = (
+            [self._taint(side, layer + 1, call, port) for call in calls]
+            if layer < self.shape.depth
+            else [self._leaf(side)]
+        )
+        return {
+            "kind": "model",
+            "data": {
+                "callable": self.callable(side, layer, index),
+                "filename": f"m{index % MODULES}.py",
+                "sinks" if side == "sink" else "sources": [
+                    {"port": port, "taint": taint}
+                ],
+            },
+        }
+
+    def header(self) -> str:
+        return json.dumps({"file_version": 3})
+
+    def file_name(self, index: int) -> str:
+        return f"taint-output-{index:05d}.json"
+
+
+class _MarianaTrench:
+    def __init__(self, shape: OutputShape) -> None:
+        self.shape = shape
+
+    def method(self, side: str, layer: int, index: int) -> str:
+        return f"Lm{index % MODULES}/{side.capitalize()}{layer}_{index};.call:(I)V"
+
+    def _port(self, side: str) -> str:
+        return "Argument(1)" if side == "sink" else "Return"
+
+    def _kind(self, side: str, distance: int) -> Dict[str, Any]:
+        return {
+            "kind": side.capitalize(),
+            "distance": distance,
+            "origins": [
+                {
+                    "method": f"Lleaf/{side.capitalize()};.leaf:(I)V",
+                    "port": self._port(side),
+                }
+            ],
+        }
+
+    def _taint(self, side: str, layer: int, call: _Call, path: str) -> Dict[str, Any]:
+        return {
+            "call_info": {
+                "call_kind": "CallSite",
+                "resolves_to": self.method(side, layer, call.callee),
+                "port": self._port(side),
+                "position": {"path": path, "line": call.line, "start": 3, "end": 7},
+            },
+            "kinds": [self._kind(side, self.shape.depth - layer + 1)],
+            "local_positions": [
+                {"line": line, "start": 3, "end": 7} for line in call.titos
+            ],
+            "local_features": {"always_features": call.features},
+        }
+
+    def _leaf(self, side: str, path: str) -> Dict[str, Any]:
+        return {
+            "call_info": {
+                "call_kind": "Origin",
+                "port": self._port(side),
+                "position": {"path": path, "line": 5, "start": 3, "end": 7},
+            },
+            "kinds": [self._kind(side, 0)],
+        }
+
+    def issue(self, index: int, sinks: List[_Call], sources: List[_Call]) -> Any:
+        path = f"m{index % MODULES}/Issue{index}.java"
+        position = {"path": path, "line": 2, "start": 3, "end": 7}
+        return {
+            "method": f"Lm{index % MODULES}/Issue{index};.call:(I)V",
+            "position": {"path": path, "line": 1},
+            "issues": [
+                {
+                    "rule": 1,
+                    "position": position,
+                    "callee": self.method("sink", 1, sinks[0].callee),
+                    "sink_index": "0",
+                    "sinks": [self._taint("sink", 1, call, path) for call in sinks],
+                    "sources": [
+                        self._taint("source", 1, call, path) for call in sources
+                    ],
+                    "always_features": ["issue"],
+                }
+            ],
+        }
+
+    def model(self, side: str, layer: int, index: int, calls: List[_Call]) -> Any:
+        path = f"m{index % MODULES}/{side.capitalize()}{layer}_{index}.java"
+        taint = (
+            [self._taint(side, layer + 1, call, path) for call in calls]
+            if layer < self.shape.depth
+            else [self._leaf(side, path)]
+        )
+        return {
+            "method": self.method(side, layer, index),
+            "position": {"path": path, "line": 1},
+            "sinks" if side == "sink" else "generations": [
+                {"port": self._port(side), "taint": taint}
+            ],
+        }
+
+    def header(self) -> str:
+        return "// @generated"
+
+    def file_name(self, index: int) -> str:
+        return f"model@{index:05d}-of-{self.shape.files:05d}.json"
+
+
+def entries(shape: OutputShape, format: OutputFormat) -> Iterator[Any]:
+    """Entries of the output, issues first."""
+    generator = _Generator(shape)
+    writer = _Pysa(shape) if format == OutputFormat.PYSA else _MarianaTrench(shape)
+    for index in range(shape.issues):
+        yield writer.issue(index, generator.calls(), generator.calls())
+    for side in ("sink", "source"):
+        for layer in range(1, shape.depth + 1):
+            for index in range(shape.issues):
+                calls = generator.calls() if layer < shape.depth else []
+                yield writer.model(side, layer, index, calls)
+
+
+def write_output(directory: str, shape: OutputShape, format: OutputFormat) -> List[str]:
+    """Writes the output into the directory, returns the paths of its files."""
+    writer = _Pysa(shape) if format == OutputFormat.PYSA else _MarianaTrench(shape)
+    paths = [
+        os.path.join(directory, writer.file_name(index)) for index in range(shape.files)
+    ]
+    handles = [open(path, "w") for path in paths]
+    try:
+        for handle in handles:
+            handle.write(writer.header() + "\n")
+        for index, entry in enumerate(entries(shape, format)):
+            handles[index % shape.files].write(json.dumps(entry) + "\n")
+    finally:
+        for handle in handles:
+            handle.close()
+    return paths
+
+
+def metadata(format: OutputFormat) -> Metadata:
+    """Metadata to parse the output with."""
+    if format == OutputFormat.MARIANA_TRENCH:
+        return Metadata(rules={1: Rule(name="Rule", description="Rule")})
+    return Metadata()
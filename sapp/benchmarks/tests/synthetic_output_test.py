@@ -0,0 +1,67 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import os
+import tempfile
+from typing import List
+from unittest import TestCase
+
+from ...analysis_output import AnalysisOutput
+from ...pipeline.mariana_trench_parser import Parser as MarianaTrenchParser
+from ...pipeline.pysa_taint_parser import Parser as PysaParser
+from ..synthetic_output import metadata, OutputFormat, OutputShape, write_output
+
+
+def _read(paths: List[str]) -> List[bytes]:
+    contents = []
+    for path in paths:
+        with open(path, "rb") as handle:
+            contents.append(handle.read())
+    return contents
+
+
+class SyntheticOutputTest(TestCase):
+    def test_deterministic(self) -> None:
+        shape = OutputShape(issues=20, files=2, seed=7)
+        for format in OutputFormat:
+            with (
+                tempfile.TemporaryDirectory() as first,
+                tempfile.TemporaryDirectory() as second,
+            ):
+                output = _read(write_output(first, shape, format))
+                self.assertEqual(output, _read(write_output(second, shape, format)))
+                other_seed = OutputShape(issues=20, files=2, seed=8)
+                self.assertNotEqual(
+                    output, _read(write_output(second, other_seed, format))
+                )
+
+    def test_pysa_parser(self) -> None:
+        shape = OutputShape(issues=20, depth=2, files=2)
+        with tempfile.TemporaryDirectory() as directory:
+            paths = write_output(directory, shape, OutputFormat.PYSA)
+            parsed = PysaParser().parse_analysis_output(
+                AnalysisOutput(
+                    filename_specs=paths, metadata=metadata(OutputFormat.PYSA)
+                )
+            )
+        self.assertEqual(len(parsed.issues), shape.issues)
+        self.assertGreater(parsed.preconditions.frame_count(), 0)
+        self.assertGreater(parsed.postconditions.frame_count(), 0)
+
+    def test_mariana_trench_parser(self) -> None:
+        shape = OutputShape(issues=20, depth=2, files=2)
+        with tempfile.TemporaryDirectory() as directory:
+            write_output(directory, shape, OutputFormat.MARIANA_TRENCH)
+            parsed = MarianaTrenchParser().parse_analysis_output(
+                AnalysisOutput(
+                    filename_specs=[os.path.join(directory, "model@*.json")],
+                    metadata=metadata(OutputFormat.MARIANA_TRENCH),
+                )
+            )
+        self.assertEqual(len(parsed.issues), shape.issues)
+        self.assertGreater(parsed.preconditions.frame_count(), 0)
+        self.assertGreater(parsed.postconditions.frame_count(), 0)
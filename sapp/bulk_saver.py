@@ -10,15 +10,19 @@
 from __future__ import annotations
 
 import logging
-from typing import Any, Iterable, Protocol, Sequence, TypeVar
+import threading
+from itertools import chain
+from queue import Queue
+from typing import Any, Callable, Iterable, NamedTuple, Protocol, Sequence, TypeVar
 
 from sqlalchemy.dialects.mysql import insert as mysql_insert
 from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
-from .db import DB
+from .db import DB, DBType
 from .db_support import RecordMixin
 from .decorators import log_time
 from .iterutil import split_every
+from .memory_budget import MemoryBudget
 from .models import (
     ClassTypeInterval,
     Issue,
@@ -51,6 +55,11 @@ class SavableModel(Protocol):
     def merge(cls, database: DB, items: Iterable[Any]) -> Iterable[Any]: ...
 
 
+class ItemStream(NamedTuple):
+    items: Callable[[], Iterable[Any]]
+    count: int
+
+
 class BulkSaver:
     """Stores new objects created within a run and bulk save them"""
 
@@ -71,12 +80,25 @@ class BulkSaver:
     ]
 
     BATCH_SIZE = 30000
+    # Batches produced ahead of the writer thread.
+    QUEUED_BATCHES = 2
 
     def __init__(
         self,
         primary_key_generator: PrimaryKeyGenerator | None = None,
         extra_saving_classes: list[type[object]] | None = None,
+        background_writes: bool = False,
+        memory_budget: MemoryBudget | None = None,
     ) -> None:
+        """
+        background_writes: Write batches on a separate thread while the next
+        batches of the same class are produced, so that building records (like
+        streamed assocs) overlaps with the database inserts. In memory databases
+        are always written from the calling thread, since each thread would get
+        its own database.
+        memory_budget: If given, batches are no longer produced ahead of the
+        writer thread once the budget is nearly used up.
+        """
         self.primary_key_generator: PrimaryKeyGenerator = (
             primary_key_generator or PrimaryKeyGenerator()
         )
@@ -84,9 +106,13 @@ class BulkSaver:
             extra_saving_classes or []
         ) + self.DEFAULT_SAVING_CLASSES_ORDER
         self.saving: dict[str, Any] = {}
+        self.streams: dict[str, list[ItemStream]] = {}
         for cls in self.saving_classes_order:
             self.saving[cls.__name__] = []
+            self.streams[cls.__name__] = []
         self.prepare_all_done = False
+        self.background_writes = background_writes
+        self.memory_budget = memory_budget
 
     def add(self, item: Any) -> None:
         assert item.model in self.saving_classes_order, (
@@ -101,22 +127,51 @@ class BulkSaver:
             )
             self.saving[items[0].model.__name__].extend(items)
 
+    def add_stream(
+        self, cls: type[object], items: Callable[[], Iterable[Any]], count: int
+    ) -> None:
+        """Adds items that are only produced while preparing and saving them,
+        instead of being held by the saver. Items of classes with ids must
+        already exist elsewhere, so that the ids resolved while preparing are
+        still set when saving. Other items, like assocs, can be created on the
+        fly and are saved in batches as they are produced.
+
+        items: Produces the items, in the same order each time it is called.
+        count: Upper bound of the number of items.
+        """
+        assert cls in self.saving_classes_order, (
+            "%s should be added with session.add_all()" % cls.__name__
+        )
+        if count > 0:
+            self.streams[cls.__name__].append(ItemStream(items, count))
+
     def get_items_to_add(self, cls: type[T]) -> list[T]:
-        return self.saving[cls.__name__]
+        """All items to save. Streamed items are produced into a new list, use
+        `iter_items_to_add` to go over them without holding them."""
+        if not self.streams[cls.__name__]:
+            return self.saving[cls.__name__]
+        return list(self.iter_items_to_add(cls))
+
+    def iter_items_to_add(self, cls: type[T]) -> Iterable[T]:
+        return chain(
+            self.saving[cls.__name__],
+            *(stream.items() for stream in self.streams[cls.__name__]),
+        )
+
+    def get_item_count(self, cls: type[object]) -> int:
+        return len(self.saving[cls.__name__]) + sum(
+            stream.count for stream in self.streams[cls.__name__]
+        )
 
     def get_total_item_count(self) -> int:
-        return sum(len(items) for items in self.saving.values())
+        return sum(self.get_item_count(cls) for cls in self.saving_classes_order)
 
     def prepare_all(self, database: DB) -> None:
         saving_classes = [
-            cls
-            for cls in self.saving_classes_order
-            if len(self.saving[cls.__name__]) != 0
+            cls for cls in self.saving_classes_order if self.get_item_count(cls) != 0
         ]
 
-        item_counts = {
-            cls.__name__: len(self.get_items_to_add(cls)) for cls in saving_classes
-        }
+        item_counts = {cls.__name__: self.get_item_count(cls) for cls in saving_classes}
 
         with database.make_session() as session:
             pk_gen = self.primary_key_generator.reserve(
@@ -125,10 +180,11 @@ class BulkSaver:
 
         for cls in saving_classes:
             log.info(
-                f"Merging and generating ids for {len(self.saving[cls.__name__])} "
+                f"Merging and generating ids for {self.get_item_count(cls)} "
                 f"{cls.__name__}s..."
             )
             self._prepare(database, cls, pk_gen)
+            self._prepare_streams(database, cls, pk_gen)
 
         self.prepare_all_done = True
 
@@ -139,17 +195,15 @@ class BulkSaver:
         assert self.prepare_all_done, "prepare_all must succeed before calling save_all"
 
         saving_classes = [
-            cls
-            for cls in self.saving_classes_order
-            if len(self.saving[cls.__name__]) != 0
+            cls for cls in self.saving_classes_order if self.get_item_count(cls) != 0
         ]
 
         saved_items = 0
         for cls in saving_classes:
-            cls_count = len(self.saving[cls.__name__])
-            log.info(f"Saving {cls_count} {cls.__name__}s...")
+            log.info(f"Saving {self.get_item_count(cls)} {cls.__name__}s...")
+            saved_items += len(self.saving[cls.__name__])
             self._save(database, cls, self.primary_key_generator)
-            saved_items += cls_count
+            saved_items += self._save_streams(database, cls, self.primary_key_generator)
 
         return saved_items
 
@@ -165,20 +219,103 @@ class BulkSaver:
         )
         self.saving[cls.__name__] = items
 
+    # pyre-fixme[2]: Parameter must be annotated.
+    def _prepare_streams(self, database: DB, cls, pk_gen: PrimaryKeyGenerator) -> None:
+        # Only ids need to be generated before saving, so items without ids are
+        # merged while they are saved. Records of a class all have the same keys,
+        # so unlike in `_prepare` there is nothing to gain from sorting them.
+        if not hasattr(cls, "id"):
+            return
+        for stream in self.streams[cls.__name__]:
+            for _ in cls.prepare(database, pk_gen, stream.items()):
+                pass
+
     @log_time
     # pyre-fixme[2]: Parameter must be annotated.
     def _save(self, database: DB, cls, pk_gen: PrimaryKeyGenerator) -> None:
         items = self.saving[cls.__name__]
         self.saving[cls.__name__] = []  # allow GC after we are done
+        self._save_items(database, cls, items)
+
+    @log_time
+    # pyre-fixme[2]: Parameter must be annotated.
+    def _save_streams(self, database: DB, cls, pk_gen: PrimaryKeyGenerator) -> int:
+        """Saves the streamed items of a class, return the number of items saved"""
+        streams = self.streams[cls.__name__]
+        self.streams[cls.__name__] = []
+        saved_items = 0
+        for stream in streams:
+            if hasattr(cls, "id"):
+                # Items merged into existing records were resolved as not new.
+                items = (item for item in stream.items() if item.id.is_new)
+            else:
+                items = cls.prepare(database, pk_gen, stream.items())
+            saved_items += self._save_items(database, cls, items)
+        return saved_items
+
+    # pyre-fixme[2]: Parameter must be annotated.
+    def _save_items(self, database: DB, cls, items: Iterable[Any]) -> int:
+        batches = split_every(self.BATCH_SIZE, items)
+        if self.background_writes and database.dbtype != DBType.MEMORY:
+            return self._save_batches_in_background(database, cls, batches)
+        saved_items = 0
+        for batch in batches:
+            self._write_batch(database, cls, batch)
+            saved_items += len(batch)
+        return saved_items
 
+    # pyre-fixme[2]: Parameter must be annotated.
+    def _write_batch(self, database: DB, cls, batch: Sequence[Any]) -> None:
         # bulk_insert_mappings should only be used for new objects.
         # To update an existing object, just modify its attribute(s)
         # and call session.commit()
-        for batch in split_every(self.BATCH_SIZE, items):
-            if cls.has_potential_for_key_races():
-                self._save_batch_and_handle_key_conflicts(database, cls, batch)
-            else:
-                self._save_batch(database, cls, batch)
+        if cls.has_potential_for_key_races():
+            self._save_batch_and_handle_key_conflicts(database, cls, batch)
+        else:
+            self._save_batch(database, cls, batch)
+
+    def _save_batches_in_background(
+        self,
+        database: DB,
+        # pyre-fixme[2]: Parameter must be annotated.
+        cls,
+        batches: Iterable[list[Any]],
+    ) -> int:
+        # Batches of a class are all written before the next class is saved, as
+        # ids of records may only be final once written.
+        queue: Queue[list[Any] | None] = Queue(maxsize=self.QUEUED_BATCHES)
+        errors: list[BaseException] = []
+
+        def write() -> None:
+            while (batch := queue.get()) is not None:
+                # After an error, keep draining so that the producer is not
+                # blocked.
+                if not errors:
+                    try:
+                        self._write_batch(database, cls, batch)
+                    except BaseException as error:
+                        errors.append(error)
+                queue.task_done()
+
+        writer = threading.Thread(target=write, name=f"{cls.__name__} writer")
+        writer.start()
+        saved_items = 0
+        try:
+            for batch in batches:
+                if errors:
+                    break
+                memory_budget = self.memory_budget
+                if memory_budget is not None and memory_budget.is_nearing():
+                    # Queued batches hold their records until they are written.
+                    queue.join()
+                queue.put(batch)
+                saved_items += len(batch)
+        finally:
+            queue.put(None)
+            writer.join()
+        if errors:
+            raise errors[0]
+        return saved_items
 
     # Save a batch of records to the database, handling duplicate key errors
     # by skipping those records during insert and then performing an additional merge
@@ -335,5 +472,5 @@ class BulkSaver:
     def dump_stats(self) -> str:
         stat_str = ""
         for cls in self.saving_classes_order:
-            stat_str += "%s: %d\n" % (cls.__name__, len(self.saving[cls.__name__]))
+            stat_str += "%s: %d\n" % (cls.__name__, self.get_item_count(cls))
         return stat_str
@@ -8,13 +8,14 @@
 
 import logging
 import os
-from typing import Dict, Type
+from typing import Dict, Optional, Type
 
 import click
 
 from .cli_lib import commands, common_options
 from .context import Context
 from .db import DB, DBType
+from .json_decoder import JSONDecoder, set_decoder
 from .lint import lint
 from .pipeline.base_parser import BaseParser
 from .pipeline.mariana_trench_parser import Parser as MarianaTrenchParser
@@ -44,6 +45,12 @@ PARSERS: Dict[str, Type[BaseParser]] = {
     default="pysa",
     help="tool the data is coming from",
 )
+@click.option(
+    "--json-decoder",
+    type=click.Choice([decoder.value for decoder in JSONDecoder]),
+    default=None,
+    help="library used to decode analysis output, defaults to the fastest installed",
+)
 @click.pass_context
 def cli(
     ctx: click.Context,
@@ -51,7 +58,13 @@ def cli(
     database_name: str,
     database_engine: str,
     tool: str,
+    json_decoder: Optional[str],
 ) -> None:
+    if json_decoder is not None:
+        try:
+            set_decoder(JSONDecoder(json_decoder))
+        except ValueError as error:
+            raise click.BadParameter(str(error), param_hint="--json-decoder")
     ctx.obj = Context(
         repository=repository,
         database=DB(
@@ -9,7 +9,7 @@ import logging
 import os
 import pathlib
 from functools import wraps
-from typing import Callable, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import click
 import click_log
@@ -23,12 +23,21 @@ from .db import DB
 from .extensions import prompt_extension
 from .filesystem import find_root
 from .json_cmd import json_cmd
+from .memory_budget import MemoryBudget
 from .models import PrimaryKeyGenerator, Run
-from .pipeline import PipelineBuilder, Summary
+from .pipeline import FramesStore, linemap as linemap_lib, PipelineBuilder, Summary
 from .pipeline.add_features import AddFeatures
+from .pipeline.checkpoint import Checkpoints
 from .pipeline.create_database import CreateDatabase
 from .pipeline.database_saver import DatabaseSaver
+from .pipeline.incremental_ingest import (
+    IncrementalIngest,
+    ReuseUnchangedShards,
+    SaveShardManifest,
+)
 from .pipeline.model_generator import ModelGenerator
+from .pipeline.parallel_parser import ParallelParser
+from .pipeline.step_profiler import StepProfiler
 from .pipeline.trim_trace_graph import TrimTraceGraph
 from .ui import filters
 from .ui.interactive import Interactive
@@ -100,12 +109,20 @@ def default_database(
     context_settings={"ignore_unknown_options": True},
 )
 @pass_context
+@option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=None,
+    help="number of processes used to index analysis output, defaults to all cores",
+)
 @click.argument("ipython_args", nargs=-1, type=click.UNPROCESSED)
-def explore(ctx: Context, ipython_args: Tuple[str, ...]) -> None:
+def explore(ctx: Context, jobs: Optional[int], ipython_args: Tuple[str, ...]) -> None:
     scope_vars = Interactive(
         database=ctx.database,
         repository_directory=ctx.repository,
         parser_class=ctx.parser_class,
+        jobs=jobs,
     ).setup()
     config = Config()
     config.InteractiveShellApp.extensions = [
@@ -138,7 +155,10 @@ def explore(ctx: Context, ipython_args: Tuple[str, ...]) -> None:
 @option(
     "--linemap",
     type=Path(exists=True),
-    help="json file mapping new locations to old locations",
+    help=(
+        "json file mapping new locations to old locations, or its binary form "
+        "produced by `sapp linemap convert`"
+    ),
 )
 @option(
     "--store-unused-models",
@@ -146,6 +166,84 @@ def explore(ctx: Context, ipython_args: Tuple[str, ...]) -> None:
     help="store pre/post conditions unrelated to an issue",
 )
 @option("--dry-run", is_flag=True)
+@option(
+    "--background-writes",
+    is_flag=True,
+    help="write to the database on a separate thread while the next records "
+    "are produced",
+)
+@option(
+    "--memory-budget",
+    type=click.FloatRange(min=0, min_open=True),
+    help="RSS in GB to stay under, by spilling parsed issues and frames kept in "
+    "memory to disk as it is neared. Only the RSS of the main process counts, "
+    "not that of the --jobs workers. Frames kept by --frames-store disk, compact "
+    "or lazy are not spilled",
+)
+@option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=1,
+    help="number of processes used to parse the analysis output",
+)
+@option(
+    "--trace-jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    help="number of processes used to generate the traces of issues",
+)
+@option(
+    "--frames-store",
+    type=click.Choice([store.value for store in FramesStore]),
+    default=FramesStore.MEMORY.value,
+    help="where to keep parsed pre/postconditions until traces are generated; "
+    "compact and disk use less memory than the default, but are slower to look "
+    "frames up in",
+)
+@option(
+    "--parse-cache",
+    type=Path(file_okay=False),
+    help="directory caching parse results of unchanged analysis output files",
+)
+@option(
+    "--shard-manifest",
+    type=Path(dir_okay=False),
+    help=(
+        "fingerprints of the analysis output files of the previous run, updated "
+        "once saved; issues of unchanged files are copied from the previous run"
+    ),
+)
+@option(
+    "--previous-run-id",
+    type=int,
+    help="run to copy issues of unchanged files from, defaults to the run of "
+    "--shard-manifest",
+)
+@option(
+    "--checkpoint-directory",
+    type=Path(file_okay=False),
+    help="directory to save the output of each step in, to resume a failed run",
+)
+@option(
+    "--checkpoint-step",
+    type=str,
+    multiple=True,
+    help="step whose output is saved in --checkpoint-directory, may be repeated; "
+    "defaults to the parser and ModelGenerator",
+)
+@option(
+    "--resume-from",
+    type=str,
+    help="step to resume from, using the output of the previous step saved in "
+    "--checkpoint-directory, e.g. DatabaseSaver; steps after the latest saved "
+    "output before it are run again",
+)
+@option(
+    "--profile",
+    type=Path(file_okay=False),
+    help="directory to write CPU samples and allocation sites of each step to",
+)
 @argument("input_file", type=Path(exists=True))
 def analyze(
     ctx: Context,
@@ -158,6 +256,18 @@ def analyze(
     linemap: Optional[str],
     store_unused_models: bool,
     dry_run: bool,
+    background_writes: bool,
+    memory_budget: Optional[float],
+    jobs: int,
+    trace_jobs: int,
+    frames_store: str,
+    parse_cache: Optional[str],
+    shard_manifest: Optional[str],
+    previous_run_id: Optional[int],
+    checkpoint_directory: Optional[str],
+    checkpoint_step: List[str],
+    resume_from: Optional[str],
+    profile: Optional[str],
     input_file: str,
     add_feature: Optional[List[str]],
 ) -> None:
@@ -182,17 +292,88 @@ def analyze(
     else:
         analysis_output = AnalysisOutput.from_file(input_file)
 
-    pipeline = (
+    if previous_run_id is not None and shard_manifest is None:
+        raise click.UsageError("--previous-run-id requires --shard-manifest")
+    incremental = (
+        IncrementalIngest(shard_manifest, previous_run_id) if shard_manifest else None
+    )
+    if checkpoint_step and checkpoint_directory is None:
+        raise click.UsageError("--checkpoint-step requires --checkpoint-directory")
+    if resume_from is not None and checkpoint_directory is None:
+        raise click.UsageError("--resume-from requires --checkpoint-directory")
+    if resume_from is not None and incremental:
+        # Shards reused by the parser are not part of the checkpoints.
+        raise click.UsageError("--resume-from cannot be used with --shard-manifest")
+
+    if frames_store == FramesStore.LAZY.value and (
+        jobs > 1
+        or parse_cache
+        or incremental
+        or not ctx.parser_class.SUPPORTS_LAZY_FRAMES
+    ):
+        raise click.UsageError(
+            "--frames-store lazy is only supported by the Pysa parser, without "
+            "--jobs, --parse-cache or --shard-manifest"
+        )
+    budget = MemoryBudget(memory_budget) if memory_budget else None
+    if budget is not None and frames_store != FramesStore.MEMORY.value:
+        logger.warning(
+            f"Frames kept by --frames-store {frames_store} are not spilled "
+            "under --memory-budget, only issues are"
+        )
+    # Parser classes of other tools may not take a frames store or a budget,
+    # so they are only passed when set.
+    parser_options: Dict[str, Any] = {}
+    if budget is not None:
+        parser_options["memory_budget"] = budget
+    if jobs > 1 or parse_cache or incremental:
+        parser = ParallelParser(
+            ctx.parser_class,
+            set(),
+            processes=jobs,
+            frames_store=FramesStore(frames_store),
+            parse_cache_directory=parse_cache,
+            incremental=incremental,
+            **parser_options,
+        )
+    else:
+        if frames_store != FramesStore.MEMORY.value:
+            parser_options["frames_store"] = FramesStore(frames_store)
+        parser = ctx.parser_class(**parser_options)
+
+    builder = (
         PipelineBuilder()
-        .append(ctx.parser_class())
+        .append(parser)
         .append(CreateDatabase(ctx.database))
         .append(AddFeatures(add_feature))
-        .append(ModelGenerator())
-        .append(TrimTraceGraph())
-        .append(DatabaseSaver(ctx.database, Run, PrimaryKeyGenerator(), dry_run))
-        .build()
+        .append(ModelGenerator(processes=trace_jobs))
+    )
+    if incremental:
+        builder = builder.append(ReuseUnchangedShards(ctx.database, incremental))
+    builder = builder.append(TrimTraceGraph()).append(
+        DatabaseSaver(
+            ctx.database,
+            Run,
+            PrimaryKeyGenerator(),
+            dry_run,
+            background_writes=background_writes,
+            memory_budget=budget,
+        )
     )
-    pipeline.run(analysis_output, summary_blob)
+    if incremental:
+        builder = builder.append(SaveShardManifest(incremental))
+    checkpoints = None
+    if checkpoint_directory:
+        # Other steps are quick to run again from the output of these.
+        checkpoints = Checkpoints(
+            checkpoint_directory,
+            checkpoint_step or [type(parser).__name__, ModelGenerator.__name__],
+        )
+    builder.build(
+        checkpoints=checkpoints,
+        resume_from=resume_from,
+        profiler=StepProfiler(profile) if profile else None,
+    ).run(analysis_output, summary_blob)
 
 
 @click.command(
@@ -321,11 +502,27 @@ def update_warning_codes(
     update_warning_messages(ctx.database, pathlib.Path(input_metadata_file))
 
 
+@click.group()
+def linemap() -> None:
+    pass
+
+
+@linemap.command(
+    name="convert",
+    help="Convert a json linemap into a binary linemap that loads instantly",
+)
+@argument("input_linemap", type=Path(exists=True, dir_okay=False))
+@argument("output_linemap", type=Path(dir_okay=False, writable=True))
+def convert_linemap(input_linemap: str, output_linemap: str) -> None:
+    linemap_lib.convert(input_linemap, output_linemap)
+
+
 commands: List[click.Command] = [
     analyze,
     explore,
     server,
     filter,
     update,
+    linemap,
     json_cmd,
 ]
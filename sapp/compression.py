@@ -0,0 +1,167 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+"""
+Streaming decompression of analysis output files.
+
+Files ending in `.gz` or `.zst` are decompressed while they are read, without a
+decompressed copy on disk. Offsets reported by `tell` on these handles are
+positions in the decompressed stream, so they cannot be used to seek into the
+file on disk. These handles can only seek forward, by decompressing up to the
+offset.
+"""
+
+import gzip
+import io
+import os
+import queue
+import threading
+from typing import BinaryIO, IO, List, Optional, Union
+
+import zstandard
+
+GZIP_EXTENSION = ".gz"
+ZSTD_EXTENSION = ".zst"
+COMPRESSED_EXTENSIONS: List[str] = [ZSTD_EXTENSION, GZIP_EXTENSION]
+
+_CHUNK_BYTES: int = 1024 * 1024
+# Number of decompressed chunks a background thread reads ahead.
+_PREFETCH_CHUNKS = 8
+
+
+def is_compressed(path: str) -> bool:
+    return any(path.endswith(extension) for extension in COMPRESSED_EXTENSIONS)
+
+
+def find_file(path: str) -> Optional[str]:
+    """Returns `path` if it exists, or else its compressed variant if one
+    exists."""
+    for candidate in [path] + [path + extension for extension in COMPRESSED_EXTENSIONS]:
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def _decompressing_reader(path: str) -> BinaryIO:
+    if path.endswith(GZIP_EXTENSION):
+        return gzip.open(path, "rb")
+    return zstandard.ZstdDecompressor().stream_reader(
+        open(path, "rb"), read_across_frames=True, closefd=True
+    )
+
+
+class _DecompressedReader(io.RawIOBase):
+    """Raw stream over decompressed data. `tell` reports the position in the
+    decompressed data, which is all parsers need to record offsets of lines.
+
+    With `threaded`, a background thread decompresses ahead of the reader.
+    Both zlib and zstd release the GIL, so decompression then overlaps with
+    parsing."""
+
+    def __init__(self, source: BinaryIO, threaded: bool) -> None:
+        super().__init__()
+        self._source = source
+        self._position = 0
+        self._pending = memoryview(b"")
+        self._chunks: Optional["queue.Queue[Union[bytes, BaseException]]"] = None
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        if threaded:
+            self._chunks = queue.Queue(maxsize=_PREFETCH_CHUNKS)
+            self._thread = threading.Thread(
+                target=self._prefetch, name="sapp-decompression", daemon=True
+            )
+            self._thread.start()
+
+    def _prefetch(self) -> None:
+        chunks = self._chunks
+        assert chunks is not None
+        try:
+            while True:
+                chunk = self._source.read(_CHUNK_BYTES)
+                if not self._put(chunks, chunk) or not chunk:
+                    return
+        except BaseException as error:
+            self._put(chunks, error)
+
+    def _put(
+        self, chunks: "queue.Queue[Union[bytes, BaseException]]", item: object
+    ) -> bool:
+        while not self._stopped.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _next_chunk(self) -> bytes:
+        chunks = self._chunks
+        if chunks is None:
+            return self._source.read(_CHUNK_BYTES)
+        chunk = chunks.get()
+        if isinstance(chunk, BaseException):
+            raise chunk
+        if not chunk:
+            # Keep signalling the end of the stream to later reads.
+            chunks.put(chunk)
+        return chunk
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        # Only to allow `tell` and seeking forward, see `seek`.
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence != io.SEEK_SET:
+            raise io.UnsupportedOperation("Compressed files can only be read forward")
+        if offset < self._position:
+            raise io.UnsupportedOperation("Compressed files can only be read forward")
+        # Decompress and drop the data up to the offset.
+        buffer = bytearray(min(offset - self._position, _CHUNK_BYTES))
+        while self._position < offset:
+            view = memoryview(buffer)[: offset - self._position]
+            if self.readinto(view) == 0:
+                break
+        return self._position
+
+    def readinto(self, buffer: Union[bytearray, memoryview]) -> int:  # pyre-ignore
+        if not self._pending:
+            self._pending = memoryview(self._next_chunk())
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        self._position += size
+        return size
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self._stopped.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+        self._source.close()
+        super().close()
+
+
+def open_text(path: str, threaded: bool = False) -> IO[str]:
+    """Opens the file for reading text, decompressing it on the fly if it is
+    compressed."""
+    if not is_compressed(path):
+        return open(path)
+    reader = _DecompressedReader(_decompressing_reader(path), threaded)
+    return io.TextIOWrapper(
+        io.BufferedReader(reader, buffer_size=_CHUNK_BYTES), encoding="utf-8"
+    )
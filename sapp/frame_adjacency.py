@@ -0,0 +1,122 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+"""Array backed index of the trace frames of a graph.
+
+`TraceGraph` indexes its frames by (kind, caller id, caller port) and by (kind,
+callee id, callee port) in nested dictionaries of sets. Each small set and
+dictionary costs a few hundred bytes, which on large runs is more than the frame
+ids they hold.
+
+Once frames are generated the indexes are only read, so `TraceGraph.compact`
+moves them into a `FrameAdjacency`: for each kind, the sorted array of keys, and
+for the key at index `i` the frame ids `frame_ids[offsets[i]:offsets[i + 1]]`.
+A key combines the shared text id with the index of the port in a table of
+distinct ports, so that all ports of a shared text are adjacent.
+"""
+
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from typing import DefaultDict, Dict, Iterable, List, NamedTuple, Sequence, Tuple
+
+from .models import TraceKind
+
+AdjacencyEntry = Tuple[TraceKind, int, str, Iterable[int]]
+
+
+class _Table(NamedTuple):
+    keys: "array[int]"
+    offsets: "array[int]"
+    frame_ids: "array[int]"
+
+
+class FrameAdjacency:
+    def __init__(self, entries: Iterable[AdjacencyEntry]) -> None:
+        """
+        entries: Frame ids by kind, shared text id and port. Frame ids of the
+        same key are combined.
+        """
+        self._ports: Dict[str, int] = {}
+        self._port_names: List[str] = []
+        grouped: DefaultDict[TraceKind, DefaultDict[Tuple[int, int], List[int]]] = (
+            defaultdict(lambda: defaultdict(list))
+        )
+        for kind, text_id, port, frame_ids in entries:
+            port_index = self._ports.get(port)
+            if port_index is None:
+                port_index = len(self._port_names)
+                self._ports[port] = port_index
+                self._port_names.append(port)
+            grouped[kind][(text_id, port_index)].extend(frame_ids)
+
+        self._port_count: int = max(len(self._port_names), 1)
+        self._tables: Dict[TraceKind, _Table] = {}
+        for kind, frames_by_key in grouped.items():
+            keys = array("q")
+            offsets = array("q", [0])
+            frame_ids = array("q")
+            for text_id, port_index in sorted(frames_by_key):
+                ids = frames_by_key[(text_id, port_index)]
+                if not ids:
+                    continue
+                keys.append(self._key(text_id, port_index))
+                frame_ids.extend(sorted(set(ids)))
+                offsets.append(len(frame_ids))
+            self._tables[kind] = _Table(keys, offsets, frame_ids)
+
+    def _key(self, text_id: int, port_index: int) -> int:
+        return text_id * self._port_count + port_index
+
+    def frame_ids(self, kind: TraceKind, text_id: int, port: str) -> Sequence[int]:
+        table = self._tables.get(kind)
+        port_index = self._ports.get(port)
+        if table is None or port_index is None:
+            return ()
+        key = self._key(text_id, port_index)
+        index = bisect_left(table.keys, key)
+        if index == len(table.keys) or table.keys[index] != key:
+            return ()
+        return table.frame_ids[table.offsets[index] : table.offsets[index + 1]]
+
+    def ports(
+        self, kind: TraceKind, text_id: int
+    ) -> Iterable[Tuple[str, Sequence[int]]]:
+        """Ports of the shared text with their frame ids."""
+        table = self._tables.get(kind)
+        if table is None:
+            return
+        start = bisect_left(table.keys, self._key(text_id, 0))
+        end = bisect_left(table.keys, self._key(text_id + 1, 0), start)
+        for index in range(start, end):
+            port_index = table.keys[index] - self._key(text_id, 0)
+            yield (
+                self._port_names[port_index],
+                table.frame_ids[table.offsets[index] : table.offsets[index + 1]],
+            )
+
+    def entries(self) -> Iterable[AdjacencyEntry]:
+        for kind, table in self._tables.items():
+            for index, key in enumerate(table.keys):
+                text_id, port_index = divmod(key, self._port_count)
+                yield (
+                    kind,
+                    text_id,
+                    self._port_names[port_index],
+                    table.frame_ids[table.offsets[index] : table.offsets[index + 1]],
+                )
+
+    def key_count(self) -> int:
+        return sum(len(table.keys) for table in self._tables.values())
+
+    def nbytes(self) -> int:
+        """Size of the arrays."""
+        return sum(
+            values.itemsize * len(values)
+            for table in self._tables.values()
+            for values in table
+        )
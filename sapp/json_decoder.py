@@ -0,0 +1,86 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+"""
+Decoding of the JSON lines produced by the analyses.
+
+Parsers decode through `json_decoder.loads`, which uses the fastest installed
+backend unless one is selected with `set_decoder` or the `SAPP_JSON_DECODER`
+environment variable. All backends raise a `ValueError` on invalid input. Note
+that `orjson` rejects `NaN`/`Infinity` and integers that do not fit in 64 bits,
+which the standard library accepts.
+"""
+
+import importlib
+import json
+import logging
+import os
+from enum import Enum
+from typing import Any, Callable, List, Optional, Union
+
+log: logging.Logger = logging.getLogger("sapp")
+
+ENVIRONMENT_VARIABLE = "SAPP_JSON_DECODER"
+
+
+class JSONDecoder(Enum):
+    STDLIB = "json"
+    ORJSON = "orjson"
+    UJSON = "ujson"
+
+
+# In order of preference.
+_PREFERENCE: List[JSONDecoder] = [
+    JSONDecoder.ORJSON,
+    JSONDecoder.UJSON,
+    JSONDecoder.STDLIB,
+]
+
+
+def _backend(decoder: JSONDecoder) -> Optional[Callable[[Union[str, bytes]], Any]]:
+    try:
+        return importlib.import_module(decoder.value).loads
+    except ImportError:
+        return None
+
+
+def available_decoders() -> List[JSONDecoder]:
+    return [decoder for decoder in _PREFERENCE if _backend(decoder) is not None]
+
+
+def _default_decoder() -> JSONDecoder:
+    name = os.environ.get(ENVIRONMENT_VARIABLE)
+    if name:
+        try:
+            decoder = JSONDecoder(name)
+        except ValueError:
+            log.warning(f"Ignoring unknown JSON decoder `{name}`")
+        else:
+            if _backend(decoder) is not None:
+                return decoder
+            log.warning(f"JSON decoder `{name}` is not installed")
+    return available_decoders()[0]
+
+
+_decoder: JSONDecoder = _default_decoder()
+loads: Callable[[Union[str, bytes]], Any] = _backend(_decoder) or json.loads
+
+
+def decoder() -> JSONDecoder:
+    return _decoder
+
+
+def set_decoder(decoder: JSONDecoder) -> None:
+    """Selects the backend of `loads`. The choice is also exported to the
+    environment, so that worker processes make the same choice."""
+    global _decoder, loads
+    backend = _backend(decoder)
+    if backend is None:
+        raise ValueError(f"JSON decoder `{decoder.value}` is not installed")
+    _decoder = decoder
+    loads = backend
+    os.environ[ENVIRONMENT_VARIABLE] = decoder.value
@@ -39,6 +39,7 @@ from pygments import highlight
 from pygments.formatters import TerminalFormatter
 from pygments.lexers import JsonLexer
 
+from . import json_decoder
 from .analysis_output import AnalysisOutput
 from .pipeline.base_parser import BaseParser
 
@@ -72,7 +73,7 @@ class LookupTable(NamedTuple):
 
     @classmethod
     def from_json(cls, value: str) -> "LookupTable":
-        version, file_index, entries = json.loads(value)
+        version, file_index, entries = json_decoder.loads(value)
         # JSON does not allow integers as object keys
         file_index = {int(index): filename for index, filename in file_index.items()}
         return cls(version=version, file_index=file_index, entries=entries)
@@ -99,11 +100,13 @@ class JSONDiagnostics:
         analysis_output: AnalysisOutput,
         parser_class: Type[BaseParser],
         table_path: str = DEFAULT_LOOKUP_TABLE_PATH,
+        processes: Optional[int] = None,
     ) -> None:
         self.analysis_output = analysis_output
         self.lookup_table_path = table_path
         self.lookup_table: Optional[LookupTable] = None
         self.parser_class = parser_class
+        self.processes = processes
 
     def load(self, force_generation: bool = False) -> None:
         self.lookup_table = self._get_lookup_table(force_generation)
@@ -188,7 +191,7 @@ class JSONDiagnostics:
         filename_to_id = {}
 
         entries = {}
-        with Pool(processes=None) as pool:
+        with Pool(processes=self.processes) as pool:
             for i, (filename, entries) in enumerate(
                 pool.imap_unordered(partial(_parse_file, self.parser_class), filenames)
             ):
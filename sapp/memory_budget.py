@@ -0,0 +1,73 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+"""A limit on the memory of the process, past which data kept in memory is
+spilled to disk.
+
+The resident set size of the process is read between batches of work rather
+than after every item, since reading it is a system call. Spilling starts once
+the RSS nears the limit, leaving room for the memory allocated until the next
+read.
+"""
+
+import logging
+from typing import Optional
+
+from .operating_system import get_rss_in_gb
+
+log: logging.Logger = logging.getLogger("sapp")
+
+# Share of the limit past which data is spilled.
+DEFAULT_SPILL_RATIO = 0.8
+DEFAULT_CHECK_INTERVAL = 10_000
+
+
+class MemoryBudget:
+    def __init__(
+        self,
+        limit_in_gb: float,
+        spill_ratio: float = DEFAULT_SPILL_RATIO,
+        check_interval: int = DEFAULT_CHECK_INTERVAL,
+        directory: Optional[str] = None,
+    ) -> None:
+        """
+        limit_in_gb: RSS the process should stay under.
+        spill_ratio: Share of the limit past which data is spilled to disk.
+        check_interval: Number of calls to `should_spill` between two reads of
+        the RSS.
+        directory: Where spilled data is written. Defaults to the system's
+        temporary directory.
+        """
+        self.limit_in_gb = limit_in_gb
+        self.spill_ratio = spill_ratio
+        self.check_interval = check_interval
+        self.directory = directory
+        self._calls = 0
+        self._warned = False
+
+    def is_nearing(self) -> bool:
+        """Reads the RSS and returns whether it is past the spill ratio of the
+        limit."""
+        rss = get_rss_in_gb()
+        if rss < self.limit_in_gb * self.spill_ratio:
+            return False
+        if not self._warned:
+            log.warning(
+                f"RSS of {rss:.2f} GB is nearing the memory budget of "
+                f"{self.limit_in_gb:.2f} GB, spilling to disk"
+            )
+            self._warned = True
+        return True
+
+    def should_spill(self) -> bool:
+        """Cheap enough to call for every item: only reads the RSS once every
+        `check_interval` calls."""
+        self._calls += 1
+        if self._calls < self.check_interval:
+            return False
+        self._calls = 0
+        return self.is_nearing()
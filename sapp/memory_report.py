@@ -0,0 +1,104 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+"""Approximate memory used by the data passed between pipeline steps.
+
+Measuring every object of a large trace graph would take about as long as
+building it. Sizes are instead estimated from the containers themselves and a
+sample of their items, so reports are cheap enough to compute after every step.
+Strings are not counted in items, since they are mostly shared through the
+`StringPool`, which is reported separately. Objects referenced by several items
+are counted for each of them.
+"""
+
+import sys
+from dataclasses import dataclass
+from enum import Enum
+from itertools import islice
+from typing import Collection, Dict, Iterable, Mapping
+
+SAMPLE_SIZE = 64
+
+
+@dataclass(frozen=True)
+class MemoryUsage:
+    count: int
+    bytes: int
+
+    def __add__(self, other: "MemoryUsage") -> "MemoryUsage":
+        return MemoryUsage(self.count + other.count, self.bytes + other.bytes)
+
+
+# Usage of each part of a structure, by name.
+MemoryReport = Dict[str, MemoryUsage]
+
+
+def _item_size(item: object, depth: int = 2) -> int:
+    # Models and enum members are shared by all records.
+    if isinstance(item, (str, type, Enum)):
+        return 0
+    size = sys.getsizeof(item)
+    if depth == 0:
+        return size
+    if isinstance(item, Mapping):
+        for key, value in item.items():
+            size += _item_size(key, depth - 1) + _item_size(value, depth - 1)
+    elif isinstance(item, (tuple, list, set, frozenset)):
+        for value in item:
+            size += _item_size(value, depth - 1)
+    else:
+        for slot in getattr(type(item), "__slots__", ()):
+            size += _item_size(getattr(item, slot, None), depth - 1)
+    return size
+
+
+def sampled_size(items: Iterable[object], count: int) -> int:
+    """Estimates the size of `count` items from the first few of them."""
+    sample = list(islice(items, SAMPLE_SIZE))
+    if not sample:
+        return 0
+    return count * sum(_item_size(item) for item in sample) // len(sample)
+
+
+def collection_usage(collection: Collection[object]) -> MemoryUsage:
+    """Usage of a list, set or dictionary and of its items (or values)."""
+    items = collection.values() if isinstance(collection, Mapping) else collection
+    return MemoryUsage(
+        len(collection),
+        sys.getsizeof(collection) + sampled_size(items, len(collection)),
+    )
+
+
+def strings_usage(strings: Collection[str]) -> MemoryUsage:
+    """Usage of a collection of distinct strings, estimated from evenly spaced
+    ones."""
+    step = max(len(strings) // SAMPLE_SIZE, 1)
+    sample = list(islice(strings, 0, None, step))
+    average = sum(sys.getsizeof(string) for string in sample) // max(len(sample), 1)
+    return MemoryUsage(len(strings), sys.getsizeof(strings) + len(strings) * average)
+
+
+def merge_reports(reports: Iterable[MemoryReport]) -> MemoryReport:
+    merged: MemoryReport = {}
+    for report in reports:
+        for name, usage in report.items():
+            merged[name] = merged.get(name, MemoryUsage(0, 0)) + usage
+    return merged
+
+
+def format_report(report: MemoryReport) -> str:
+    """Non empty parts of the report from the largest to the smallest."""
+    total = sum((usage for usage in report.values()), MemoryUsage(0, 0))
+    parts = sorted(report.items(), key=lambda item: item[1].bytes, reverse=True)
+    return ", ".join(
+        [f"total {total.bytes / 2**20:.1f} MB"]
+        + [
+            f"{name} {usage.bytes / 2**20:.1f} MB ({usage.count})"
+            for name, usage in parts
+            if usage.count
+        ]
+    )
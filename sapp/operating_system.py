@@ -9,13 +9,29 @@
 Operating system-related utilities.
 """
 
+import sys
+
 try:
     import psutil
 except ImportError:
     psutil = None
 
+try:
+    import resource
+except ImportError:
+    # Not available on Windows.
+    resource = None
+
 
 def get_rss_in_gb() -> float:
     if psutil is None:
         return 0
     return psutil.Process().memory_info().rss / (1000**3)
+
+
+def get_peak_rss_in_mb() -> float:
+    if resource is None:
+        return 0
+    # `ru_maxrss` is in kilobytes on Linux and in bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024**2 if sys.platform == "darwin" else 1024)
@@ -5,16 +5,22 @@
 
 # pyre-strict
 
+import contextlib
+import json
 import logging
 import sys
 import time
 from abc import ABCMeta, abstractmethod
-from dataclasses import dataclass
+from collections import defaultdict
+from dataclasses import dataclass, field
 from enum import Enum
 from pathlib import Path
 from typing import (
     Any,
+    Callable,
     cast,
+    Collection,
+    DefaultDict,
     Dict,
     Generic,
     Iterable,
@@ -23,14 +29,27 @@ from typing import (
     Optional,
     Set,
     Tuple,
+    TYPE_CHECKING,
     TypeVar,
     Union,
 )
 
 from ..analysis_output import Metadata
+from ..memory_report import (
+    collection_usage,
+    format_report,
+    MemoryReport,
+    MemoryUsage,
+    merge_reports,
+)
 from ..metrics_logger import MetricsLogger, NoOpMetricsLogger, ScopedMetricsLogger
 from ..models import Run, SourceLocation, TraceKind
 from ..operating_system import get_rss_in_gb
+from .string_pool import StringPool
+
+if TYPE_CHECKING:
+    from .checkpoint import Checkpoints
+    from .step_profiler import StepProfiler
 
 if sys.version_info >= (3, 8):
     from typing import Literal
@@ -127,10 +146,10 @@ class ParseTraceFeature(NamedTuple):
             locations=list(map(SourceLocation.from_typed_dict, j.get("locations", []))),
         )
 
-    def interned(self) -> "ParseTraceFeature":
+    def interned(self, pool: Optional[StringPool] = None) -> "ParseTraceFeature":
         "Return self, but with certain strings interned"
         return ParseTraceFeature(
-            name=sys.intern(self.name),
+            name=_intern_function(pool)(self.name),
             locations=self.locations,
         )
 
@@ -180,8 +199,21 @@ def flatten_features(features: Iterable[Dict[str, Any]]) -> List[str]:
     return ret
 
 
-def intern_leaves(leaves: Iterable[ParseLeaf]) -> List[ParseLeaf]:
-    return list(map(lambda p: (sys.intern(p[0]), p[1]), leaves))
+def _intern_function(pool: Optional[StringPool]) -> Callable[[str], str]:
+    return sys.intern if pool is None else pool.intern
+
+
+def intern_leaves(
+    leaves: Iterable[ParseLeaf], pool: Optional[StringPool] = None
+) -> List[ParseLeaf]:
+    intern = _intern_function(pool)
+    return [(intern(kind), distance) for kind, distance in leaves]
+
+
+def intern_features(
+    features: Iterable[ParseTraceFeature], pool: Optional[StringPool] = None
+) -> List[ParseTraceFeature]:
+    return [feature.interned(pool) for feature in features]
 
 
 class ParseConditionTuple(NamedTuple):
@@ -198,19 +230,20 @@ class ParseConditionTuple(NamedTuple):
     titos: Iterable[SourceLocation]
     annotations: Iterable[ParseTraceAnnotation]
 
-    def interned(self) -> "ParseConditionTuple":
+    def interned(self, pool: Optional[StringPool] = None) -> "ParseConditionTuple":
         "Return self, but with certain strings interned"
+        intern = _intern_function(pool)
         return ParseConditionTuple(
             type=self.type,
-            caller=sys.intern(self.caller),
-            caller_port=sys.intern(self.caller_port),
-            filename=sys.intern(self.filename),
-            callee=sys.intern(self.callee),
-            callee_port=sys.intern(self.callee_port),
+            caller=intern(self.caller),
+            caller_port=intern(self.caller_port),
+            filename=intern(self.filename),
+            callee=intern(self.callee),
+            callee_port=intern(self.callee_port),
             callee_location=self.callee_location,
-            leaves=intern_leaves(self.leaves),
+            leaves=intern_leaves(self.leaves, pool),
             type_interval=self.type_interval,
-            features=list(map(ParseTraceFeature.interned, self.features)),
+            features=intern_features(self.features, pool),
             titos=self.titos,
             annotations=self.annotations,
         )
@@ -227,15 +260,16 @@ class ParseIssueConditionTuple(NamedTuple):
     annotations: Iterable[ParseTraceAnnotation]
     root_port: Optional[str] = None
 
-    def interned(self) -> "ParseIssueConditionTuple":
+    def interned(self, pool: Optional[StringPool] = None) -> "ParseIssueConditionTuple":
         "Return self, but with certain strings interned"
+        intern = _intern_function(pool)
         return ParseIssueConditionTuple(
-            callee=sys.intern(self.callee),
-            port=sys.intern(self.port),
+            callee=intern(self.callee),
+            port=intern(self.port),
             location=self.location,
-            leaves=intern_leaves(self.leaves),
+            leaves=intern_leaves(self.leaves, pool),
             titos=self.titos,
-            features=list(map(ParseTraceFeature.interned, self.features)),
+            features=intern_features(self.features, pool),
             type_interval=self.type_interval,
             annotations=self.annotations,
             root_port=self.root_port,
@@ -259,27 +293,27 @@ class ParseIssueTuple(NamedTuple):
     callable_line: Optional[int]
     fix_info: Optional[Dict[str, Any]]
 
-    def interned(self) -> "ParseIssueTuple":
+    def interned(self, pool: Optional[StringPool] = None) -> "ParseIssueTuple":
+        intern = _intern_function(pool)
         return ParseIssueTuple(
             code=self.code,
             message=self.message,
-            callable=sys.intern(self.callable),
+            callable=intern(self.callable),
             handle=self.handle,
-            filename=sys.intern(self.filename),
+            filename=intern(self.filename),
             callable_line=self.callable_line,
             line=self.line,
             start=self.start,
             end=self.end,
-            preconditions=list(
-                map(ParseIssueConditionTuple.interned, self.preconditions)
-            ),
-            postconditions=list(
-                map(ParseIssueConditionTuple.interned, self.postconditions)
-            ),
+            preconditions=[
+                condition.interned(pool) for condition in self.preconditions
+            ],
+            postconditions=[
+                condition.interned(pool) for condition in self.postconditions
+            ],
             initial_sources=self.initial_sources,
             final_sinks=self.final_sinks,
-            # pyrefly: ignore
-            features=list(map(sys.intern, self.features)),
+            features=list(map(intern, self.features)),
             fix_info=self.fix_info,
         )
 
@@ -290,6 +324,18 @@ class ParseIssueTuple(NamedTuple):
 FrameKey = Tuple[str, str]  # (caller, caller_port)
 
 
+class FramesStore(Enum):
+    """Where parsed pre/postconditions are kept until the model generator
+    looks them up."""
+
+    MEMORY = "memory"
+    # In memory, with the numbers of each frame packed into an array.
+    COMPACT = "compact"
+    DISK = "disk"
+    # Only index where the models are and parse them when they are looked up.
+    LAZY = "lazy"
+
+
 @dataclass
 class Frames:
     _frames: Dict[FrameKey, List[ParseConditionTuple]]
@@ -317,6 +363,12 @@ class Frames:
         self._assert_not_disposed()
         return sum(len(frames) for frames in self._frames.values())
 
+    def memory_usage(self) -> MemoryUsage:
+        """Approximate memory used by the frames kept in memory."""
+        if self._disposed:
+            return MemoryUsage(0, 0)
+        return MemoryUsage(self.frame_count(), collection_usage(self._frames).bytes)
+
     def dispose(self) -> None:
         self._assert_not_disposed()
         self._disposed = True
@@ -327,11 +379,54 @@ class Frames:
             raise Exception("dispose has already been called")
 
 
+class FramesBuilder:
+    """Collects frames while parsing and produces the `Frames` holding them."""
+
+    def __init__(
+        self, string_pool: Optional[StringPool] = None, interned: bool = False
+    ) -> None:
+        """
+        string_pool: If given, strings of the frames are interned in the pool.
+        interned: Whether the strings of added frames are in the pool already,
+        e.g. when they are decoded from a parse batch. Such frames are kept
+        as they are.
+        """
+        self._frames: DefaultDict[FrameKey, List[ParseConditionTuple]] = defaultdict(
+            list
+        )
+        self._string_pool = string_pool
+        self._interned = interned
+
+    def add(self, frame: ParseConditionTuple) -> None:
+        if self._string_pool is not None and not self._interned:
+            frame = frame.interned(self._string_pool)
+        self._frames[(frame.caller, frame.caller_port)].append(frame)
+
+    def build(self) -> Frames:
+        return Frames(self._frames)
+
+
 @dataclass
 class IssuesAndFrames:
-    issues: List[ParseIssueTuple]
+    # A list, unless issues are spilled to disk under a memory budget.
+    issues: Collection[ParseIssueTuple]
     preconditions: Frames
     postconditions: Frames
+    # Strings of the parsed issues and frames, shared with the trace graph.
+    string_pool: StringPool = field(default_factory=StringPool)
+
+    def memory_report(self) -> MemoryReport:
+        issues_usage = getattr(self.issues, "memory_usage", None)
+        return {
+            "issues": (
+                issues_usage()
+                if issues_usage is not None
+                else collection_usage(self.issues)
+            ),
+            "preconditions": self.preconditions.memory_usage(),
+            "postconditions": self.postconditions.memory_usage(),
+            "string_pool": self.string_pool.memory_usage(),
+        }
 
 
 @dataclass
@@ -382,9 +477,54 @@ class PipelineStep(Generic[T_in, T_out], metaclass=ABCMeta):
         raise NotImplementedError("PipelineStep.run is abstract")
 
 
+def memory_report(output: object) -> Optional[MemoryReport]:
+    """Report of the output of a step, if it can tell its memory usage. Reports
+    of the graphs of a list are merged."""
+    report = getattr(output, "memory_report", None)
+    if report is not None:
+        return report()
+    if isinstance(output, list):
+        reports = [
+            item.memory_report() for item in output if hasattr(item, "memory_report")
+        ]
+        if reports:
+            return merge_reports(reports)
+    return None
+
+
 class Pipeline:
-    def __init__(self, steps: List[PipelineStep[Any, Any]]) -> None:
+    """Runs steps one after the other, each on the whole output of the
+    previous one.
+
+    Steps do not exchange batches through queues. Trace generation looks up
+    frames of any callable, so it cannot start before parsing is done, and
+    trimming needs the complete graph. Work overlaps within steps instead:
+    the parallel parser consumes parsed ranges while workers parse the next
+    ones, compressed files are decompressed ahead on a thread, and the
+    database saver can write batches on a thread while it builds the next
+    ones.
+    """
+
+    def __init__(
+        self,
+        steps: List[PipelineStep[Any, Any]],
+        checkpoints: Optional["Checkpoints"] = None,
+        resume_from: Optional[str] = None,
+        profiler: Optional["StepProfiler"] = None,
+    ) -> None:
+        """
+        checkpoints: If given, the output of each step but the last is saved,
+        unless the step is not selected by `checkpoints` or returned its input.
+        resume_from: Name of the step to start from, with the output of the
+        previous step loaded from `checkpoints` instead of the first input. If
+        that output was not saved, the pipeline starts from the latest saved
+        output before it instead.
+        profiler: If given, profiles each step.
+        """
         self.steps: List[PipelineStep[Any, Any]] = steps
+        self.checkpoints = checkpoints
+        self.resume_from = resume_from
+        self.profiler = profiler
 
     def run(
         self,
@@ -396,18 +536,64 @@ class Pipeline:
             summary = Summary()
         if metrics_logger is None:
             metrics_logger = NoOpMetricsLogger()
+        step_names = [step.__class__.__name__ for step in self.steps]
+        checkpoints = self.checkpoints
+        resume_from = self.resume_from
         next_input = first_input
+        first_step = 0
+        if resume_from is not None:
+            if resume_from not in step_names:
+                raise ValueError(
+                    f"Cannot resume from {resume_from}, steps are: "
+                    f"{', '.join(step_names)}"
+                )
+            first_step = step_names.index(resume_from)
+            if first_step > 0:
+                if checkpoints is None:
+                    raise ValueError("Resuming requires checkpoints")
+                first_step, next_input, summary = checkpoints.load_latest(
+                    step_names[:first_step]
+                )
         timing = []
-        for step in self.steps:
-            step_name = step.__class__.__name__
+        for index in range(first_step, len(self.steps)):
+            step = self.steps[index]
+            step_name = step_names[index]
+            step_input = next_input
             with metrics_logger.log_timing(
                 key=f"Processing:{step_name}"
             ) as scoped_metrics_logger:
                 start_perf_counter = time.perf_counter()
-                next_input, summary = step.run(
-                    next_input, summary, scoped_metrics_logger
+                profile = (
+                    self.profiler.profile(index, step_name)
+                    if self.profiler is not None
+                    else contextlib.nullcontext()
                 )
+                with profile:
+                    next_input, summary = step.run(
+                        next_input, summary, scoped_metrics_logger
+                    )
                 scoped_metrics_logger.add_data("rss_in_gb", f"{get_rss_in_gb():.3}")
+                report = memory_report(next_input)
+                if report is not None:
+                    log.info("Memory after %s: %s", step_name, format_report(report))
+                    scoped_metrics_logger.add_data(
+                        "memory_report",
+                        json.dumps(
+                            {
+                                name: {"count": usage.count, "bytes": usage.bytes}
+                                for name, usage in report.items()
+                            }
+                        ),
+                    )
+                if checkpoints is not None and index < len(self.steps) - 1:
+                    if next_input is not step_input and checkpoints.should_save(
+                        step_name
+                    ):
+                        checkpoints.save(step_names[: index + 1], next_input, summary)
+                    else:
+                        # Resuming after this step starts from an earlier
+                        # checkpoint instead.
+                        checkpoints.discard(step_names[: index + 1])
                 timing.append((step_name, time.perf_counter() - start_perf_counter))
         log.info(
             "Step timing: %s",
@@ -424,5 +610,10 @@ class PipelineBuilder(Generic[T_in]):
         self.steps.append(step)
         return cast(PipelineBuilder[T_out], self)
 
-    def build(self) -> Pipeline:
-        return Pipeline(self.steps)
+    def build(
+        self,
+        checkpoints: Optional["Checkpoints"] = None,
+        resume_from: Optional[str] = None,
+        profiler: Optional["StepProfiler"] = None,
+    ) -> Pipeline:
+        return Pipeline(self.steps, checkpoints, resume_from, profiler)
@@ -10,6 +10,7 @@ from typing import List, Optional, Set, Tuple
 
 from ..metrics_logger import ScopedMetricsLogger
 from . import IssuesAndFrames, PipelineStep, Summary
+from .spilling import replace_issues
 
 log: logging.Logger = logging.getLogger("sapp")
 
@@ -31,7 +32,8 @@ class AddFeatures(PipelineStep[IssuesAndFrames, IssuesAndFrames]):
     ) -> Tuple[IssuesAndFrames, Summary]:
         if len(self.features) > 0:
             log.info("Attaching provided features")
-            input.issues = [
-                issue.with_added_features(self.features) for issue in input.issues
-            ]
+            input.issues = replace_issues(
+                input.issues,
+                (issue.with_added_features(self.features) for issue in input.issues),
+            )
         return input, summary
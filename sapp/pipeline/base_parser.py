@@ -11,18 +11,22 @@ from __future__ import annotations
 
 import json
 import logging
+import os
 import pprint
-from collections import defaultdict
 from collections.abc import Callable
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import (
     Any,
+    ClassVar,
     Dict,
     Generator,
+    IO,
     Iterable,
+    Iterator,
     List,
     NamedTuple,
+    Sequence,
     Set,
     TextIO,
     Tuple,
@@ -33,6 +37,7 @@ from typing import (
 import xxhash
 
 from ..analysis_output import AnalysisOutput, Metadata
+from ..memory_budget import MemoryBudget
 from ..metrics_logger import (
     NoOpMetricsLogger,
     NoOpScopedMetricsLogger,
@@ -40,6 +45,8 @@ from ..metrics_logger import (
 )
 from . import (
     Frames,
+    FramesBuilder,
+    FramesStore,
     IssuesAndFrames,
     Optional,
     ParseConditionTuple,
@@ -48,11 +55,20 @@ from . import (
     PipelineStep,
     Summary,
 )
+from .compact_frames import CompactFramesBuilder
+from .disk_frames import DiskFramesBuilder
+from .linemap import JSONLinemap, Linemap
+from .spilling import SpillingFramesBuilder, SpillingIssues
+from .string_pool import StringPool
 
 log: logging.Logger = logging.getLogger("sapp")
 
 T = TypeVar("T")
 
+# Number of issues filtered at once by `BaseParser.parse_analysis_output`, for
+# parsers that do not filter issues themselves.
+_FILTER_BATCH_SIZE = 10_000
+
 
 # The callable's json output can be found at the given sharded file and offset.
 # Used for debugging.
@@ -62,6 +78,195 @@ class EntryPosition(NamedTuple):
     offset: int
 
 
+class FileRange(NamedTuple):
+    """Byte range [start, end) of a json-lines file. Ranges produced by
+    `split_file_ranges` always start at the beginning of a line."""
+
+    path: str
+    start: int
+    end: int
+
+
+@dataclass(frozen=True)
+class IssueFilter:
+    """Issue filters applied by parsers before an issue is fully parsed, so
+    that filtered out issues cost neither decoding nor memory nor IPC. The
+    fields mirror the `WarningCodeFilter`, `IssueCallableFilter` and
+    `IssueHandleFilter` steps, and the check against the issues of a previous
+    run done by `BaseParser.parse_analysis_output`. `None` keeps everything."""
+
+    codes_to_keep: Optional[frozenset[int]] = None
+    callables_to_keep: Optional[frozenset[str]] = None
+    handles_to_keep: Optional[frozenset[str]] = None
+    # Issues with these handles, possibly after mapping their line with the
+    # linemap, are not new and are dropped.
+    previous_handles: frozenset[str] = frozenset()
+    # Decoded JSON linemaps are accepted as well.
+    linemap: Optional[Union[Linemap, Dict[str, Any]]] = field(
+        default=None, compare=False
+    )
+
+    def __post_init__(self) -> None:
+        if isinstance(self.linemap, dict):
+            object.__setattr__(self, "linemap", JSONLinemap(self.linemap))
+
+    def keeps(
+        self, code: int, callable: str, handle: str, filename: str, line: int
+    ) -> bool:
+        if not self._keeps_fields(code, callable, handle):
+            return False
+        return not self.is_existing_issue(handle, filename, line, code)
+
+    def _keeps_fields(self, code: int, callable: str, handle: str) -> bool:
+        if self.codes_to_keep is not None and code not in self.codes_to_keep:
+            return False
+        if (
+            self.callables_to_keep is not None
+            and callable not in self.callables_to_keep
+        ):
+            return False
+        return self.handles_to_keep is None or handle in self.handles_to_keep
+
+    def keeps_issue(self, issue: ParseIssueTuple) -> bool:
+        return self.keeps(
+            issue.code, issue.callable, issue.handle, issue.filename, issue.line
+        )
+
+    def kept_issues(self, issues: Iterable[ParseIssueTuple]) -> List[ParseIssueTuple]:
+        """Batched `keeps_issue`."""
+        candidates = [
+            issue
+            for issue in issues
+            if self._keeps_fields(issue.code, issue.callable, issue.handle)
+        ]
+        existing = self.existing_issues(
+            [
+                (issue.handle, issue.filename, issue.line, issue.code)
+                for issue in candidates
+            ]
+        )
+        return [issue for issue, old in zip(candidates, existing) if not old]
+
+    def is_existing_issue(
+        self, handle: str, filename: str, line: int, code: int
+    ) -> bool:
+        return self.existing_issues([(handle, filename, line, code)])[0]
+
+    def existing_issues(
+        self, issues: Sequence[Tuple[str, str, int, int]]
+    ) -> List[bool]:
+        """Whether each (handle, filename, line, code) was in the previous
+        run, possibly on another line. Issues are looked up file by file, and
+        the handle of each old location is only computed once."""
+        previous_handles = self.previous_handles
+        existing = [handle in previous_handles for handle, _, _, _ in issues]
+        linemap = self.linemap
+        if linemap is None or not previous_handles:
+            return existing
+        assert isinstance(linemap, Linemap)
+
+        # Once this works, we should remove the "relative" line from the handle
+        # and use the absolute one to avoid having to map both the start of the
+        # method and the line in the method.
+        old_handle_exists: Dict[Tuple[str, int, int], bool] = {}
+        for index in sorted(
+            (index for index, known in enumerate(existing) if not known),
+            key=lambda index: issues[index][1],
+        ):
+            _, filename, line, code = issues[index]
+            # Consider all possible old lines
+            for old_line in linemap.old_lines(filename, line):
+                key = (filename, old_line, code)
+                exists = old_handle_exists.get(key)
+                if exists is None:
+                    exists = old_handle_exists[key] = (
+                        BaseParser.compute_diff_handle(filename, old_line, code)
+                        in previous_handles
+                    )
+                if exists:
+                    existing[index] = True
+                    break
+        return existing
+
+    def merge(self, other: IssueFilter) -> IssueFilter:
+        """Returns a filter keeping the issues kept by both filters."""
+
+        def intersect(
+            left: Optional[frozenset[T]], right: Optional[frozenset[T]]
+        ) -> Optional[frozenset[T]]:
+            if left is None or right is None:
+                return left if right is None else right
+            return left & right
+
+        return IssueFilter(
+            codes_to_keep=intersect(self.codes_to_keep, other.codes_to_keep),
+            callables_to_keep=intersect(
+                self.callables_to_keep, other.callables_to_keep
+            ),
+            handles_to_keep=intersect(self.handles_to_keep, other.handles_to_keep),
+            previous_handles=self.previous_handles | other.previous_handles,
+            linemap=other.linemap if other.linemap is not None else self.linemap,
+        )
+
+    def fingerprint(self) -> str:
+        """Digest of the filter, identifying the issues it keeps."""
+        hash = xxhash.xxh3_128()
+        hash.update(
+            json.dumps(
+                [
+                    sorted(values) if values is not None else None
+                    for values in (
+                        self.codes_to_keep,
+                        self.callables_to_keep,
+                        self.handles_to_keep,
+                        self.previous_handles,
+                    )
+                ]
+                # pyre-ignore[16]: Linemaps are converted in `__post_init__`.
+                + [None if self.linemap is None else self.linemap.fingerprint()],
+                sort_keys=True,
+            ).encode()
+        )
+        return hash.hexdigest()
+
+
+def split_file_ranges(path: str, max_range_bytes: int) -> List[FileRange]:
+    """Splits a json-lines file into consecutive ranges of roughly
+    `max_range_bytes` bytes each, moving every boundary forward to the start of
+    the next line so that no line is split across ranges."""
+    size = os.path.getsize(path)
+    boundaries = [0]
+    with open(path, "rb") as handle:
+        for approximate in range(max_range_bytes, size, max_range_bytes):
+            if approximate <= boundaries[-1]:
+                continue
+            # Seek one byte back so a boundary that already falls on the start
+            # of a line is kept as is.
+            handle.seek(approximate - 1)
+            handle.readline()
+            boundary = handle.tell()
+            if boundary >= size:
+                break
+            boundaries.append(boundary)
+    boundaries.append(size)
+    return [
+        FileRange(path=path, start=start, end=end)
+        for start, end in zip(boundaries, boundaries[1:])
+    ]
+
+
+def read_line_range(handle: IO[bytes], start: int, end: int) -> Iterator[str]:
+    """Yields the decoded lines starting within [start, end) of a binary handle."""
+    handle.seek(start)
+    offset = start
+    while offset < end:
+        line = handle.readline()
+        if not line:
+            return
+        offset += len(line)
+        yield line.decode()
+
+
 def log_trace_keyerror(
     func: Callable[..., T],
 ) -> Callable[..., T | tuple[list[object], dict[object, object]]]:
@@ -106,13 +311,56 @@ class BaseParser(PipelineStep[AnalysisOutput, IssuesAndFrames]):
     for the Processor.
     """
 
-    def __init__(self, repo_dirs: Optional[Set[str]] = None) -> None:
+    # Whether `parse_file_range` is implemented, i.e. whether a single file can
+    # be split into line-aligned byte ranges that are parsed independently.
+    SUPPORTS_FILE_RANGES: ClassVar[bool] = False
+    # Whether `parse_issues_and_collect_frames` implements `FramesStore.LAZY`.
+    SUPPORTS_LAZY_FRAMES: ClassVar[bool] = False
+    # Whether the parser applies `issue_filter` itself while parsing issues.
+    # Otherwise, issues are filtered once they are parsed.
+    SUPPORTS_ISSUE_FILTER: ClassVar[bool] = False
+    # Whether parsed entries have their strings in `string_pool` already, so
+    # that they are not interned again.
+    INTERNS_ENTRIES: ClassVar[bool] = False
+    # Part of the parse cache key. Bump whenever the entries produced for the
+    # same input change.
+    CACHE_VERSION: ClassVar[int] = 1
+
+    def __init__(
+        self,
+        repo_dirs: Optional[Set[str]] = None,
+        frames_store: FramesStore = FramesStore.MEMORY,
+        issue_filter: Optional[IssueFilter] = None,
+        memory_budget: Optional[MemoryBudget] = None,
+    ) -> None:
         """
         repo_dirs: Possible absolute paths analyzed during the run. This is used
         to relativize paths in the input. These paths are NOT guaranteed to exist
         on the current machine disk!
+        frames_store: Where the parsed pre/postconditions are kept.
+        issue_filter: Issues to drop while parsing.
+        memory_budget: If given, parsed issues and frames kept in memory are
+        spilled to disk once the budget is nearly used up.
         """
+        if frames_store == FramesStore.LAZY and not self.SUPPORTS_LAZY_FRAMES:
+            raise ValueError(
+                f"`{type(self).__name__}` does not support lazy frames loading"
+            )
         self.repo_dirs: Set[str] = repo_dirs or set()
+        self.frames_store: FramesStore = frames_store
+        self.issue_filter: Optional[IssueFilter] = issue_filter
+        self.memory_budget: Optional[MemoryBudget] = memory_budget
+        # Interns the strings of parsed entries, replaced on each
+        # `parse_analysis_output`.
+        self.string_pool: StringPool = StringPool()
+
+    def _keeps_issue(
+        self, code: int, callable: str, handle: str, filename: str, line: int
+    ) -> bool:
+        issue_filter = self.issue_filter
+        return issue_filter is None or issue_filter.keeps(
+            code, callable, handle, filename, line
+        )
 
     def initialize(self, metadata: Optional[Metadata]) -> None:
         return
@@ -134,6 +382,13 @@ class BaseParser(PipelineStep[AnalysisOutput, IssuesAndFrames]):
     ) -> Iterable[Union[ParseIssueTuple, ParseConditionTuple]]:
         raise NotImplementedError("Abstract method called!")
 
+    def parse_file_range(
+        self, file_range: FileRange
+    ) -> Iterable[Union[ParseIssueTuple, ParseConditionTuple]]:
+        """Parses the entries of the lines starting within the given byte range.
+        Any header of the file is skipped (and validated) by the implementation."""
+        raise NotImplementedError("parse_file_range not implemented")
+
     def parse_issues_and_collect_frames(
         self, input: AnalysisOutput
     ) -> Generator[ParseIssueTuple, None, ParsedFrames]:
@@ -144,21 +399,16 @@ class BaseParser(PipelineStep[AnalysisOutput, IssuesAndFrames]):
         Can be overridden instead of `parse` to provide more efficent
         `Frames` implementations
         """
-        preconditions: defaultdict[tuple[str, str], list[ParseConditionTuple]] = (
-            defaultdict(list)
-        )
-        postconditions: defaultdict[tuple[str, str], list[ParseConditionTuple]] = (
-            defaultdict(list)
-        )
+        preconditions = self._frames_builder()
+        postconditions = self._frames_builder()
         for e in self.parse(input):
             if isinstance(e, ParseIssueTuple):
                 yield e
             elif isinstance(e, ParseConditionTuple):
-                key = (e.caller, e.caller_port)
                 if e.type == ParseType.PRECONDITION:
-                    preconditions[key].append(e)
+                    preconditions.add(e)
                 elif e.type == ParseType.POSTCONDITION:
-                    postconditions[key].append(e)
+                    postconditions.add(e)
                 else:
                     # pyrefly: ignore [missing-attribute]
                     raise TypeError(f"Unexpected frame type: {type(e.kind)}")
@@ -166,10 +416,20 @@ class BaseParser(PipelineStep[AnalysisOutput, IssuesAndFrames]):
                 raise TypeError(f"Unexpected parsed entry type: {type(e)}")
 
         return self.ParsedFrames(  # noqa intionally returning a value from a generator
-            preconditions=Frames(preconditions),
-            postconditions=Frames(postconditions),
+            preconditions=preconditions.build(),
+            postconditions=postconditions.build(),
         )
 
+    def _frames_builder(self) -> FramesBuilder:
+        if self.frames_store == FramesStore.DISK:
+            return DiskFramesBuilder(string_pool=self.string_pool)
+        interned = self.INTERNS_ENTRIES
+        if self.frames_store == FramesStore.COMPACT:
+            return CompactFramesBuilder(self.string_pool, interned)
+        if self.memory_budget is not None:
+            return SpillingFramesBuilder(self.memory_budget, self.string_pool, interned)
+        return FramesBuilder(self.string_pool, interned)
+
     def parse_analysis_output(
         self,
         inputfile: AnalysisOutput,
@@ -192,37 +452,68 @@ class BaseParser(PipelineStep[AnalysisOutput, IssuesAndFrames]):
         if scoped_metrics_logger is None:
             scoped_metrics_logger = NoOpScopedMetricsLogger(NoOpMetricsLogger())
 
-        issues: List[ParseIssueTuple] = []
-        previous_handles: Set[str] = set()
+        string_pool = self.string_pool = StringPool()
+        issues: Union[List[ParseIssueTuple], SpillingIssues] = (
+            SpillingIssues(self.memory_budget, string_pool)
+            if self.memory_budget is not None
+            else []
+        )
 
         # If we have a mapfile, create the map.
         if linemapfile:
             log.info("Parsing linemap file")
-            with open(linemapfile, "r") as f:
-                linemap = json.load(f)
+            linemap = Linemap.load(linemapfile)
         else:
             linemap = None
 
-        # Save entry info from the parent analysis, if there is one.
+        # Save entry info from the parent analysis, if there is one. Issues that
+        # were in the previous analysis are dropped, since they are not new.
+        issue_filter = self.issue_filter
         if previous_issue_handles:
             log.info("Parsing previous issue handles")
             previous_handles = BaseParser.parse_handles_file(previous_issue_handles)
+            previous_filter = IssueFilter(
+                previous_handles=frozenset(previous_handles), linemap=linemap
+            )
+            self.issue_filter = (
+                issue_filter.merge(previous_filter) if issue_filter else previous_filter
+            )
+        # Parsers that do not filter issues themselves get them filtered here.
+        post_filter = None if self.SUPPORTS_ISSUE_FILTER else self.issue_filter
 
         log.info("Parsing analysis output...")
-        parser_generator = self.parse_issues_and_collect_frames(inputfile)
-        parsed_issue_count = 0
-        while True:
-            try:
-                issue = next(parser_generator)
+        try:
+            parser_generator = self.parse_issues_and_collect_frames(inputfile)
+            parsed_issue_count = 0
+            interned = self.INTERNS_ENTRIES
+            # Without filtering in the parser, issues are filtered in batches.
+            unfiltered: List[ParseIssueTuple] = []
+            while True:
+                try:
+                    issue = next(parser_generator)
+                except StopIteration as e:
+                    parsed_frames = e.value
+                    break
                 parsed_issue_count += 1
-                # We are only interested in issues that weren't in the previous
-                # analysis.
+                if post_filter is None:
+                    # pyrefly: ignore [bad-argument-type]
+                    issues.append(issue if interned else issue.interned(string_pool))
+                    continue
                 # pyrefly: ignore [bad-argument-type]
-                if not self._is_existing_issue(linemap, previous_handles, issue):
-                    issues.append(issue.interned())
-            except StopIteration as e:
-                parsed_frames = e.value
-                break
+                unfiltered.append(issue)
+                if len(unfiltered) >= _FILTER_BATCH_SIZE:
+                    issues.extend(
+                        issue if interned else issue.interned(string_pool)
+                        for issue in post_filter.kept_issues(unfiltered)
+                    )
+                    unfiltered = []
+            if post_filter is not None and unfiltered:
+                issues.extend(
+                    issue if interned else issue.interned(string_pool)
+                    for issue in post_filter.kept_issues(unfiltered)
+                )
+        finally:
+            self.issue_filter = issue_filter
 
         preconditions = parsed_frames.preconditions
         postconditions = parsed_frames.postconditions
@@ -239,39 +530,15 @@ class BaseParser(PipelineStep[AnalysisOutput, IssuesAndFrames]):
             str(preconditions.frame_count() + postconditions.frame_count()),
         )
         scoped_metrics_logger.add_data("new_issues", str(len(issues)))
+        log.info(f"Interned {len(string_pool)} distinct strings")
 
         return IssuesAndFrames(
             issues=issues,
             preconditions=preconditions,
             postconditions=postconditions,
+            string_pool=string_pool,
         )
 
-    def _is_existing_issue(
-        self,
-        linemap: Dict[str, Any],
-        old_handles: Set[str],
-        new_issue: ParseIssueTuple,
-    ) -> bool:
-        if new_issue.handle in old_handles:
-            return True
-        if not linemap:
-            return False
-        filename = new_issue.filename
-        old_map = linemap.get(filename, {})
-        old_lines = old_map.get(str(new_issue.line), [])
-        # Once this works, we should remove the "relative" line from the handle
-        # and use the absolute one to avoid having to map both the start of the
-        # method and the line in the method.
-
-        # Consider all possible old lines
-        for old_line in old_lines:
-            old_handle = BaseParser.compute_diff_handle(
-                filename, old_line, new_issue.code
-            )
-            if old_handle in old_handles:
-                return True
-        return False
-
     def run(
         self,
         input: AnalysisOutput,
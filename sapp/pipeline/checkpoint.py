@@ -0,0 +1,112 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+"""Outputs of pipeline steps saved to disk, so that a failed run can resume
+from the step that failed instead of starting over.
+
+A checkpoint holds the output of a step together with the summary, pickled at
+once so that objects shared between them, like the ids of runs, are still shared
+once loaded. Outputs that cannot be pickled, like frames kept in files that are
+deleted once parsing is done, are not checkpointed. State kept by the steps
+themselves is not saved either.
+
+Outputs can be large, so only the outputs of selected steps may be saved, and
+outputs that a step passed on unchanged are not saved again. A run then resumes
+from the latest checkpoint before the step it resumes from, and runs the steps
+in between again.
+"""
+
+import logging
+import os
+import pickle
+from typing import Any, Collection, List, NamedTuple, Optional, Tuple
+
+from ..db_support import DBID
+from . import Summary
+
+log: logging.Logger = logging.getLogger("sapp")
+
+
+class Checkpoint(NamedTuple):
+    # Names of the steps run to produce the output.
+    steps: List[str]
+    output: Any
+    summary: Summary
+    # Ids created after resuming must not collide with the ids in the output.
+    next_dbid: int
+
+
+class Checkpoints:
+    def __init__(self, directory: str, steps: Optional[Collection[str]] = None) -> None:
+        """
+        steps: Names of the steps whose outputs are saved. Defaults to all of
+        them.
+        """
+        self.directory = directory
+        self.steps = steps
+
+    def _path(self, steps: List[str]) -> str:
+        return os.path.join(self.directory, f"{len(steps):02d}-{steps[-1]}.pickle")
+
+    def should_save(self, step: str) -> bool:
+        return self.steps is None or step in self.steps
+
+    def save(self, steps: List[str], output: Any, summary: Summary) -> bool:
+        """Saves the output of the last of the steps. Returns whether it could
+        be pickled."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(steps)
+        temporary_path = f"{path}.tmp"
+        try:
+            with open(temporary_path, "wb") as file:
+                pickle.dump(
+                    Checkpoint(steps, output, summary, DBID.next_id),
+                    file,
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                )
+        except (pickle.PicklingError, TypeError, AttributeError) as error:
+            log.warning("Cannot checkpoint the output of %s: %s", steps[-1], error)
+            os.remove(temporary_path)
+            self.discard(steps)
+            return False
+        # A checkpoint interrupted while being written is never loaded.
+        os.replace(temporary_path, path)
+        log.info("Saved checkpoint %s", path)
+        return True
+
+    def discard(self, steps: List[str]) -> None:
+        """Removes the output of the last of the steps saved by a previous run,
+        so that it is not resumed from."""
+        try:
+            os.remove(self._path(steps))
+        except FileNotFoundError:
+            pass
+
+    def load_latest(self, steps: List[str]) -> Tuple[int, Any, Summary]:
+        """Loads the output of the last of the steps that has a checkpoint, and
+        the summary. Returns the number of steps that produced the output."""
+        for count in range(len(steps), 0, -1):
+            if os.path.exists(self._path(steps[:count])):
+                output, summary = self.load(steps[:count])
+                return count, output, summary
+        raise ValueError(f"No checkpoint of {steps[-1]} in {self.directory}")
+
+    def load(self, steps: List[str]) -> Tuple[Any, Summary]:
+        """Loads the output of the last of the steps, and the summary."""
+        path = self._path(steps)
+        if not os.path.exists(path):
+            raise ValueError(f"No checkpoint of {steps[-1]} in {self.directory}")
+        with open(path, "rb") as file:
+            checkpoint = pickle.load(file)
+        if checkpoint.steps != steps:
+            raise ValueError(
+                f"Checkpoint {path} was saved after steps "
+                f"{', '.join(checkpoint.steps)}, not {', '.join(steps)}"
+            )
+        DBID.next_id = max(DBID.next_id, checkpoint.next_dbid)
+        log.info("Loaded checkpoint %s", path)
+        return checkpoint.output, checkpoint.summary
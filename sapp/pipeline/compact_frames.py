@@ -0,0 +1,278 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+"""`Frames` kept in memory in a packed representation.
+
+A `ParseConditionTuple` is a tree of small Python objects: lists of leaf tuples,
+`SourceLocation`s for the callee location and every tito, and a
+`ParseTraceFeature` with its own list of locations per feature. Each of these
+costs a few dozen bytes of object headers on top of the values it holds.
+
+`CompactCondition` keeps the strings of a condition, which are shared through
+the `StringPool`, and packs all of its numbers (locations, type interval, leaf
+distances) into a single array of machine integers. Conditions are unpacked
+back into `ParseConditionTuple`s when the model generator looks them up.
+"""
+
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from ..memory_report import collection_usage, MemoryUsage
+from . import (
+    FrameKey,
+    Frames,
+    FramesBuilder,
+    ParseConditionTuple,
+    ParseTraceAnnotation,
+    ParseTraceFeature,
+    ParseType,
+    ParseTypeInterval,
+    SourceLocation,
+)
+from .string_pool import StringPool
+
+# Layout of `CompactCondition._numbers`: the callee location, the type
+# interval (see below), the leaf count followed by the distance of each leaf,
+# the tito count followed by the titos, and, for each feature, its location
+# count followed by its locations. Locations take three consecutive integers.
+_CALLEE_LOCATION = 0
+_TYPE_INTERVAL = 3
+_LEAVES = 6
+
+# Values of the type interval's first integer.
+_NO_TYPE_INTERVAL = 0
+_TYPE_INTERVAL_NOT_PRESERVING = 1
+_TYPE_INTERVAL_PRESERVING = 2
+
+_INT32_MIN: int = -(2**31)
+_INT32_MAX: int = 2**31 - 1
+
+# Number of keys whose unpacked frames are kept. The model generator looks up
+# the frames of callees shared by many traces over and over.
+DEFAULT_CACHE_SIZE = 1024
+
+
+def _extend_locations(numbers: List[int], locations: Iterable[SourceLocation]) -> None:
+    count_index = len(numbers)
+    numbers.append(0)
+    for location in locations:
+        numbers.append(location.line_no)
+        numbers.append(location.begin_column)
+        numbers.append(location.end_column)
+    numbers[count_index] = (len(numbers) - count_index - 1) // 3
+
+
+def _locations(numbers: List[int], index: int) -> List[SourceLocation]:
+    count = numbers[index]
+    if count == 0:
+        return []
+    return [
+        SourceLocation(numbers[i], numbers[i + 1], numbers[i + 2])
+        for i in range(index + 1, index + 1 + 3 * count, 3)
+    ]
+
+
+def _packed(numbers: List[int]) -> "array[int]":
+    if all(_INT32_MIN <= number <= _INT32_MAX for number in numbers):
+        return array("i", numbers)
+    return array("q", numbers)
+
+
+class CompactCondition:
+    """A `ParseConditionTuple` whose numbers are packed into an array."""
+
+    __slots__ = (
+        "type",
+        "caller",
+        "caller_port",
+        "filename",
+        "callee",
+        "callee_port",
+        "_leaf_kinds",
+        "_feature_names",
+        "_numbers",
+        "_annotations",
+    )
+
+    def __init__(self, condition: ParseConditionTuple) -> None:
+        """Raises a `TypeError` or `OverflowError` if a number of the condition
+        cannot be packed."""
+        self.type: ParseType = condition.type
+        self.caller: str = condition.caller
+        self.caller_port: str = condition.caller_port
+        self.filename: str = condition.filename
+        self.callee: str = condition.callee
+        self.callee_port: str = condition.callee_port
+
+        location = condition.callee_location
+        numbers = [location.line_no, location.begin_column, location.end_column]
+
+        type_interval = condition.type_interval
+        if type_interval is None:
+            numbers.extend((_NO_TYPE_INTERVAL, 0, 0))
+        else:
+            numbers.append(
+                _TYPE_INTERVAL_PRESERVING
+                if type_interval.preserves_type_context
+                else _TYPE_INTERVAL_NOT_PRESERVING
+            )
+            numbers.append(type_interval.start)
+            numbers.append(type_interval.finish)
+
+        leaf_kinds = []
+        numbers.append(len(condition.leaves))
+        for kind, distance in condition.leaves:
+            leaf_kinds.append(kind)
+            numbers.append(distance)
+        self._leaf_kinds: Tuple[str, ...] = tuple(leaf_kinds)
+
+        _extend_locations(numbers, condition.titos)
+        self._feature_names: Tuple[str, ...] = tuple(
+            feature.name for feature in condition.features
+        )
+        for feature in condition.features:
+            _extend_locations(numbers, feature.locations)
+
+        self._numbers: "array[int]" = _packed(numbers)
+        annotations = condition.annotations
+        self._annotations: Optional[Iterable[ParseTraceAnnotation]] = (
+            annotations if annotations else None
+        )
+
+    def unpack(self) -> ParseConditionTuple:
+        numbers = self._numbers.tolist()
+        type_interval_kind = numbers[_TYPE_INTERVAL]
+        type_interval = (
+            None
+            if type_interval_kind == _NO_TYPE_INTERVAL
+            else ParseTypeInterval(
+                numbers[_TYPE_INTERVAL + 1],
+                numbers[_TYPE_INTERVAL + 2],
+                type_interval_kind == _TYPE_INTERVAL_PRESERVING,
+            )
+        )
+
+        index = _LEAVES + 1
+        leaves = list(zip(self._leaf_kinds, numbers[index:]))
+        index += len(leaves)
+
+        titos = _locations(numbers, index)
+        index += 1 + 3 * len(titos)
+
+        features = []
+        for name in self._feature_names:
+            locations = _locations(numbers, index)
+            index += 1 + 3 * len(locations)
+            features.append(ParseTraceFeature(name, locations))
+
+        # Positional arguments, since keyword arguments are slow to construct
+        # named tuples with.
+        return ParseConditionTuple(
+            self.type,
+            self.caller,
+            self.caller_port,
+            self.filename,
+            self.callee,
+            self.callee_port,
+            SourceLocation(*numbers[_CALLEE_LOCATION:_TYPE_INTERVAL]),
+            leaves,
+            type_interval,
+            features,
+            titos,
+            [] if self._annotations is None else self._annotations,
+        )
+
+
+StoredCondition = Union[CompactCondition, ParseConditionTuple]
+
+
+def _unpack(condition: StoredCondition) -> ParseConditionTuple:
+    if isinstance(condition, CompactCondition):
+        return condition.unpack()
+    return condition
+
+
+class CompactFrames(Frames):
+    def __init__(
+        self,
+        frames: Dict[FrameKey, List[StoredCondition]],
+        cache_size: int = DEFAULT_CACHE_SIZE,
+    ) -> None:
+        super().__init__({})
+        self._compact_frames = frames
+        # Unpacked frames of the keys looked up last.
+        self._cache: "OrderedDict[FrameKey, List[ParseConditionTuple]]" = OrderedDict()
+        self._cache_size = cache_size
+
+    def frames_from_caller(
+        self, caller: str, caller_port: str
+    ) -> List[ParseConditionTuple]:
+        self._assert_not_disposed()
+        key = (caller, caller_port)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+        stored = self._compact_frames.get(key)
+        if stored is None:
+            return []
+        frames = list(map(_unpack, stored))
+        self._cache[key] = frames
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return frames
+
+    def all_frames(self) -> Iterable[ParseConditionTuple]:
+        self._assert_not_disposed()
+        for frames in self._compact_frames.values():
+            yield from map(_unpack, frames)
+
+    def key_count(self) -> int:
+        self._assert_not_disposed()
+        return len(self._compact_frames)
+
+    def frame_count(self) -> int:
+        self._assert_not_disposed()
+        return sum(len(frames) for frames in self._compact_frames.values())
+
+    def memory_usage(self) -> MemoryUsage:
+        if self._disposed:
+            return MemoryUsage(0, 0)
+        return MemoryUsage(
+            self.frame_count(),
+            collection_usage(self._compact_frames).bytes
+            + collection_usage(self._cache).bytes,
+        )
+
+    def dispose(self) -> None:
+        super().dispose()
+        self._compact_frames = {}
+        self._cache.clear()
+
+
+class CompactFramesBuilder(FramesBuilder):
+    def __init__(
+        self, string_pool: Optional[StringPool] = None, interned: bool = False
+    ) -> None:
+        super().__init__(string_pool, interned)
+        self._compact_frames: Dict[FrameKey, List[StoredCondition]] = {}
+
+    def add(self, frame: ParseConditionTuple) -> None:
+        if self._string_pool is not None and not self._interned:
+            frame = frame.interned(self._string_pool)
+        try:
+            stored: StoredCondition = CompactCondition(frame)
+        except (TypeError, OverflowError):
+            # Numbers that do not fit into 64 bits, or missing ones.
+            stored = frame
+        self._compact_frames.setdefault((frame.caller, frame.caller_port), []).append(
+            stored
+        )
+
+    def build(self) -> Frames:
+        return CompactFrames(self._compact_frames)
@@ -21,6 +21,7 @@ from ..bulk_saver import BulkSaver
 from ..db import DB
 from ..db_support import DBID, dbid_resolution_context
 from ..decorators import log_time
+from ..memory_budget import MemoryBudget
 from ..metrics_logger import ScopedMetricsLogger
 from ..models import (
     ClassTypeInterval,
@@ -54,6 +55,8 @@ class DatabaseSaver(PipelineStep[List[TraceGraph], RunSummary], Generic[TRun]):
         dry_run: bool = False,
         extra_saving_classes: Optional[List[Type[object]]] = None,
         info_path: Optional[str] = None,
+        background_writes: bool = False,
+        memory_budget: Optional[MemoryBudget] = None,
     ) -> None:
         self.dbname: str = database.dbname
         self.database = database
@@ -65,6 +68,8 @@ class DatabaseSaver(PipelineStep[List[TraceGraph], RunSummary], Generic[TRun]):
         self.dry_run = dry_run
         self.summary: Summary
         self.info_path = info_path
+        self.background_writes = background_writes
+        self.memory_budget = memory_budget
 
     @log_time
     # pyrefly: ignore [bad-override]
@@ -80,6 +85,8 @@ class DatabaseSaver(PipelineStep[List[TraceGraph], RunSummary], Generic[TRun]):
             bulk_saver = self.BULK_SAVER_CLASS(
                 self.primary_key_generator,
                 extra_saving_classes=self.extra_saving_classes,
+                background_writes=self.background_writes,
+                memory_budget=self.memory_budget,
             )
             self._prep_save(graph, bulk_saver)
             with dbid_resolution_context():
@@ -112,20 +119,19 @@ class DatabaseSaver(PipelineStep[List[TraceGraph], RunSummary], Generic[TRun]):
     ) -> RunSummary:
         """Saves bulk saver's info into the databases in bulk."""
 
-        trace_frames = bulk_saver.get_items_to_add(TraceFrame)
         log.info(
             "Saving %d issues, %d trace frames, %d trace annotations, "
-            + "%d trace frame leaf assocs, %d class type intervals",
-            len(bulk_saver.get_items_to_add(Issue)),
-            len(bulk_saver.get_items_to_add(TraceFrame)),
-            len(bulk_saver.get_items_to_add(TraceFrameAnnotation)),
-            len(bulk_saver.get_items_to_add(TraceFrameLeafAssoc)),
-            len(bulk_saver.get_items_to_add(ClassTypeInterval)),
+            + "up to %d trace frame leaf assocs, %d class type intervals",
+            bulk_saver.get_item_count(Issue),
+            bulk_saver.get_item_count(TraceFrame),
+            bulk_saver.get_item_count(TraceFrameAnnotation),
+            bulk_saver.get_item_count(TraceFrameLeafAssoc),
+            bulk_saver.get_item_count(ClassTypeInterval),
         )
 
         num_pre = 0
         num_post = 0
-        for frame in trace_frames:
+        for frame in bulk_saver.iter_items_to_add(TraceFrame):
             if frame.kind == TraceKind.precondition:
                 num_pre += 1
             elif frame.kind == TraceKind.postcondition:
@@ -0,0 +1,203 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+"""`Frames` stored on disk rather than in memory.
+
+Frames are appended to a record file as they are parsed. Each record points to
+the previous record with the same (caller, caller_port), so that all the frames
+of a key can be found by following a chain starting at its last record. Once
+parsing is done, the chain heads are written into an open addressing hash table
+that is memory mapped, alongside the record file, for lookups. Only the hash
+table and the record file are resident, and only to the extent the operating
+system caches them.
+"""
+
+import logging
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from typing import Dict, IO, Iterable, List, Optional, Tuple
+
+import xxhash
+
+from . import FrameKey, Frames, FramesBuilder, ParseConditionTuple
+from .parse_batch import decode_entries, encode_entries
+from .string_pool import StringPool
+
+log: logging.Logger = logging.getLogger("sapp")
+
+# Record header: offset of the previous record of the same key plus one (zero
+# if there is none), and the length of the encoded frame.
+_RECORD_HEADER = struct.Struct("<QI")
+# Index slot: key hash and offset of the last record of the key plus one (zero
+# for empty slots).
+_INDEX_SLOT = struct.Struct("<QQ")
+
+_RECORDS_FILE = "frames.records"
+_INDEX_FILE = "frames.index"
+
+
+def _key_hash(caller: str, caller_port: str) -> int:
+    return xxhash.xxh64_intdigest(f"{caller}\0{caller_port}".encode())
+
+
+def _frame_key(frame: ParseConditionTuple) -> FrameKey:
+    return (frame.caller, frame.caller_port)
+
+
+class DiskFrames(Frames):
+    def __init__(
+        self,
+        directory: str,
+        key_count: int,
+        frame_count: int,
+        string_pool: Optional[StringPool] = None,
+    ) -> None:
+        super().__init__({})
+        self._string_pool = string_pool
+        self._directory = directory
+        self._key_count = key_count
+        self._frame_count = frame_count
+        self._records_file = open(os.path.join(directory, _RECORDS_FILE), "rb")
+        self._index_file = open(os.path.join(directory, _INDEX_FILE), "rb")
+        self._records: Optional[mmap.mmap] = self._map(self._records_file)
+        self._index: Optional[mmap.mmap] = self._map(self._index_file)
+        self._slot_mask: int = (
+            len(self._index) // _INDEX_SLOT.size - 1 if self._index else 0
+        )
+
+    @staticmethod
+    def _map(handle: IO[bytes]) -> Optional[mmap.mmap]:
+        if os.fstat(handle.fileno()).st_size == 0:
+            # Empty files cannot be mapped.
+            return None
+        return mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _decode(self, offset: int) -> Tuple[int, ParseConditionTuple]:
+        records = self._records
+        assert records is not None
+        previous, length = _RECORD_HEADER.unpack_from(records, offset)
+        start = offset + _RECORD_HEADER.size
+        (frame,) = decode_entries(records[start : start + length], self._string_pool)
+        # pyre-ignore[7]: Only conditions are written to the record file.
+        return previous, frame
+
+    def _last_record(self, key_hash: int) -> int:
+        """Returns the offset of the last record of the key plus one, or zero."""
+        index = self._index
+        if index is None:
+            return 0
+        slot = key_hash & self._slot_mask
+        while True:
+            slot_hash, last = _INDEX_SLOT.unpack_from(index, slot * _INDEX_SLOT.size)
+            if last == 0 or slot_hash == key_hash:
+                return last
+            slot = (slot + 1) & self._slot_mask
+
+    def frames_from_caller(
+        self, caller: str, caller_port: str
+    ) -> List[ParseConditionTuple]:
+        self._assert_not_disposed()
+        frames = []
+        record = self._last_record(_key_hash(caller, caller_port))
+        while record != 0:
+            record, frame = self._decode(record - 1)
+            # Keys with colliding hashes share a chain.
+            if frame.caller == caller and frame.caller_port == caller_port:
+                frames.append(frame)
+        frames.reverse()
+        return frames
+
+    def all_frames(self) -> Iterable[ParseConditionTuple]:
+        """Yields all frames in the order they were added."""
+        self._assert_not_disposed()
+        records = self._records
+        if records is None:
+            return
+        offset = 0
+        while offset < len(records):
+            _, length = _RECORD_HEADER.unpack_from(records, offset)
+            _, frame = self._decode(offset)
+            yield frame
+            offset += _RECORD_HEADER.size + length
+
+    def key_count(self) -> int:
+        self._assert_not_disposed()
+        return self._key_count
+
+    def frame_count(self) -> int:
+        self._assert_not_disposed()
+        return self._frame_count
+
+    def dispose(self) -> None:
+        super().dispose()
+        for mapping in (self._records, self._index):
+            if mapping is not None:
+                mapping.close()
+        self._records = None
+        self._index = None
+        self._records_file.close()
+        self._index_file.close()
+        shutil.rmtree(self._directory, ignore_errors=True)
+
+
+class DiskFramesBuilder(FramesBuilder):
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        string_pool: Optional[StringPool] = None,
+    ) -> None:
+        """
+        directory: Where the temporary frame files are created. Defaults to the
+        system's temporary directory. The files are removed on `dispose`.
+        string_pool: If given, strings of frames read back are interned in the
+        pool.
+        """
+        super().__init__()
+        self._string_pool = string_pool
+        self._directory: str = tempfile.mkdtemp(prefix="sapp-frames-", dir=directory)
+        self._records = open(os.path.join(self._directory, _RECORDS_FILE), "wb")
+        # Key hash to the offset of its last record plus one.
+        self._chains: Dict[int, int] = {}
+        self._frame_count = 0
+
+    def add(self, frame: ParseConditionTuple) -> None:
+        key_hash = _key_hash(*_frame_key(frame))
+        previous = self._chains.get(key_hash, 0)
+        data, _ = encode_entries([frame])
+        offset = self._records.tell()
+        self._records.write(_RECORD_HEADER.pack(previous, len(data)))
+        self._records.write(data)
+        self._chains[key_hash] = offset + 1
+        self._frame_count += 1
+
+    def build(self) -> Frames:
+        self._records.close()
+
+        capacity = 1
+        while capacity < 2 * len(self._chains):
+            capacity *= 2
+        mask = capacity - 1
+        index = bytearray(capacity * _INDEX_SLOT.size if self._chains else 0)
+        for key_hash, last in self._chains.items():
+            slot = key_hash & mask
+            while _INDEX_SLOT.unpack_from(index, slot * _INDEX_SLOT.size)[1] != 0:
+                slot = (slot + 1) & mask
+            _INDEX_SLOT.pack_into(index, slot * _INDEX_SLOT.size, key_hash, last)
+        with open(os.path.join(self._directory, _INDEX_FILE), "wb") as handle:
+            handle.write(index)
+
+        # Distinct keys may share a hash, in which case this slightly
+        # underestimates the key count.
+        key_count = len(self._chains)
+        self._chains = {}
+        log.info(f"Stored {self._frame_count} frames on disk in {self._directory}")
+        return DiskFrames(
+            self._directory, key_count, self._frame_count, self._string_pool
+        )
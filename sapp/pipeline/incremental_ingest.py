@@ -0,0 +1,733 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+"""Ingest of an analysis output that only processes the shards that changed
+since a previous run.
+
+A shard manifest records the content fingerprint of each shard of the last
+ingested analysis output, along with the id of the run it was saved as. When
+ingesting the next output:
+
+1. The parser fingerprints every shard. Issues of shards whose fingerprint did
+   not change are dropped, and only their handles are kept. Models of all
+   shards are still parsed, since traces of changed issues can run through any
+   of them. Unchanged shards are served from the parse cache, if there is one.
+2. `ReuseUnchangedShards` copies the issue instances of the dropped handles
+   from the previous run into the trace graph, together with their traces
+   (followed through trace frames by caller and port), instead of generating
+   them again from the parsed frames. Trace frames that the model generator
+   already produced for the same caller and port are shared.
+3. `SaveShardManifest` writes the manifest of the new run once it is saved.
+
+Runs are still complete: the new run holds all of its issues and frames.
+"""
+
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+import xxhash
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..db import DB
+from ..metrics_logger import ScopedMetricsLogger
+from ..models import (
+    DBID,
+    Issue,
+    IssueDBID,
+    IssueInstance,
+    IssueInstanceFixInfo,
+    IssueInstanceSharedTextAssoc,
+    IssueInstanceTraceFrameAssoc,
+    IssueStatus,
+    LeafMapping,
+    Run,
+    RunStatus,
+    RunSummary,
+    SharedText,
+    SharedTextKind,
+    TraceFrame,
+    TraceFrameAnnotation,
+    TraceFrameAnnotationTraceFrameAssoc,
+    TraceFrameLeafAssoc,
+    TraceKind,
+)
+from ..trace_graph import TraceGraph
+from . import ParseConditionTuple, ParseIssueTuple, PipelineStep, Summary
+
+log: logging.Logger = logging.getLogger("sapp")
+
+MANIFEST_VERSION = 1
+
+_READ_CHUNK_BYTES = 1024 * 1024
+# Number of ids per `IN` clause when reading the previous run.
+_QUERY_BATCH_SIZE = 500
+
+T = TypeVar("T")
+
+
+def _batches(values: Iterable[T]) -> Iterator[List[T]]:
+    batch = []
+    for value in values:
+        batch.append(value)
+        if len(batch) >= _QUERY_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _optional_id(id: Optional[DBID]) -> Optional[int]:
+    # Null id columns are read as unset ids.
+    return None if id is None else id.resolved()
+
+
+def shard_key(path: str) -> str:
+    """Shards are identified by their file name, since each ingest reads the
+    analysis output from a different directory."""
+    return os.path.basename(path)
+
+
+def fingerprint_shard(path: str) -> str:
+    hash = xxhash.xxh3_128()
+    with open(path, "rb") as handle:
+        while chunk := handle.read(_READ_CHUNK_BYTES):
+            hash.update(chunk)
+    return hash.hexdigest()
+
+
+@dataclass
+class ShardManifest:
+    run_id: Optional[int] = None
+    # Shard key -> fingerprint.
+    shards: Dict[str, str] = field(default_factory=dict)
+
+    @staticmethod
+    def load(path: str) -> "ShardManifest":
+        with open(path) as handle:
+            manifest = json.load(handle)
+        if manifest.get("version") != MANIFEST_VERSION:
+            raise ValueError(
+                f"`{path}` is not a version {MANIFEST_VERSION} shard manifest"
+            )
+        return ShardManifest(run_id=manifest["run_id"], shards=manifest["shards"])
+
+    def write(self, path: str) -> None:
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as handle:
+            json.dump(
+                {
+                    "version": MANIFEST_VERSION,
+                    "run_id": self.run_id,
+                    "shards": self.shards,
+                },
+                handle,
+                indent=2,
+                sort_keys=True,
+            )
+        os.replace(temporary, path)
+
+
+class IncrementalIngest:
+    """State shared by the parser and the steps reusing the previous run."""
+
+    def __init__(
+        self, manifest_path: str, previous_run_id: Optional[int] = None
+    ) -> None:
+        """
+        manifest_path: Shard manifest of the previous ingest, if it exists. The
+        manifest of this ingest is written to the same path.
+        previous_run_id: Run to reuse issues from. Defaults to the run of the
+        previous manifest.
+        """
+        self.manifest_path = manifest_path
+        previous = (
+            ShardManifest.load(manifest_path)
+            if os.path.exists(manifest_path)
+            else ShardManifest()
+        )
+        self.previous_run_id: Optional[int] = (
+            previous_run_id if previous_run_id is not None else previous.run_id
+        )
+        # Without a run to copy issues from, every shard is processed.
+        self.previous_shards: Dict[str, str] = (
+            previous.shards if self.previous_run_id is not None else {}
+        )
+        self.manifest: ShardManifest = ShardManifest()
+        self.unchanged_shards: Set[str] = set()
+        # Handles of the issues of unchanged shards.
+        self.reused_handles: Set[str] = set()
+
+    def add_shard(self, path: str) -> bool:
+        """Fingerprints a shard of the analysis output. Returns whether its
+        issues are reused from the previous run."""
+        key = shard_key(path)
+        fingerprint = fingerprint_shard(path)
+        self.manifest.shards[key] = fingerprint
+        unchanged = self.previous_shards.get(key) == fingerprint
+        if unchanged:
+            self.unchanged_shards.add(key)
+        return unchanged
+
+    def filter_entries(
+        self,
+        path: str,
+        entries: Iterable[Union[ParseConditionTuple, ParseIssueTuple]],
+    ) -> Iterable[Union[ParseConditionTuple, ParseIssueTuple]]:
+        """Drops the issues of unchanged shards, recording their handles."""
+        if shard_key(path) not in self.unchanged_shards:
+            yield from entries
+            return
+        for entry in entries:
+            if isinstance(entry, ParseIssueTuple):
+                self.reused_handles.add(entry.handle)
+            else:
+                yield entry
+
+
+@dataclass
+class _PreviousFrame:
+    id: int
+    kind: TraceKind
+    caller_id: int
+    caller_port: str
+    callee_id: int
+    callee_port: str
+    frame: TraceFrame
+
+
+class ReuseUnchangedShards(PipelineStep[TraceGraph, TraceGraph]):
+    """Copies the issues of unchanged shards, with their traces, from the
+    previous run into the trace graph."""
+
+    def __init__(self, database: DB, incremental: IncrementalIngest) -> None:
+        super().__init__()
+        self.database = database
+        self.incremental = incremental
+        self.graph: TraceGraph
+        self.current_run: Run
+        # Shared text id in the previous run -> shared text in the graph.
+        self._shared_texts: Dict[int, SharedText] = {}
+        # Local id of a shared text in the graph -> id in the previous run.
+        self._previous_text_ids: Dict[int, int] = {}
+        # Frame id in the previous run -> frame in the graph.
+        self._frames: Dict[int, TraceFrame] = {}
+
+    def run(
+        self,
+        input: TraceGraph,
+        summary: Summary,
+        scoped_metrics_logger: ScopedMetricsLogger,
+    ) -> Tuple[TraceGraph, Summary]:
+        previous_run_id = self.incremental.previous_run_id
+        handles = self.incremental.reused_handles - {
+            issue.handle for issue in input.get_issues()
+        }
+        if previous_run_id is None or not handles:
+            return input, summary
+        runs = summary.runs
+        assert runs is not None and len(runs) == 1, "Expected a single run"
+        self.graph = input
+        self.current_run = runs[0]
+        self._shared_texts = {}
+        self._previous_text_ids = {}
+        self._frames = {}
+
+        log.info(
+            f"Reusing {len(handles)} issues of "
+            f"{len(self.incremental.unchanged_shards)} unchanged shards "
+            f"from run {previous_run_id}"
+        )
+        with self.database.make_session() as session:
+            previous_run = session.execute(
+                select(Run.status).where(Run.id == previous_run_id)
+            ).one_or_none()
+            if previous_run is None or previous_run.status != RunStatus.finished:
+                raise ValueError(
+                    f"Run {previous_run_id} is not a finished run to reuse issues from"
+                )
+            instance_count = self._copy_instances(session, previous_run_id, handles)
+
+        if instance_count < len(handles):
+            log.warning(
+                f"{len(handles) - instance_count} reused issues are missing "
+                f"from run {previous_run_id}"
+            )
+        log.info(
+            f"Reused {instance_count} issue instances and {len(self._frames)} "
+            "trace frames"
+        )
+        scoped_metrics_logger.add_data("reused_issues", str(instance_count))
+        scoped_metrics_logger.add_data("reused_trace_frames", str(len(self._frames)))
+        return input, summary
+
+    def _add_shared_text(self, id: int, kind: SharedTextKind, contents: str) -> None:
+        shared_text = self.graph.get_or_add_shared_text(kind, contents)
+        self._shared_texts[id] = shared_text
+        self._previous_text_ids[shared_text.id.local_id] = id
+
+    def _load_shared_texts(self, session: Session, ids: Iterable[int]) -> None:
+        missing = {id for id in ids if id not in self._shared_texts}
+        for batch in _batches(missing):
+            for id, kind, contents in session.execute(
+                select(SharedText.id, SharedText.kind, SharedText.contents).where(
+                    SharedText.id.in_(batch)
+                )
+            ):
+                self._add_shared_text(int(id), kind, contents)
+
+    def _load_callables(self, session: Session, names: Iterable[str]) -> None:
+        for batch in _batches(names):
+            for id, contents in session.execute(
+                select(SharedText.id, SharedText.contents)
+                .where(SharedText.kind == SharedTextKind.callable)
+                .where(SharedText.contents.in_(batch))
+            ):
+                self._add_shared_text(int(id), SharedTextKind.callable, contents)
+
+    def _copy_instances(
+        self, session: Session, previous_run_id: int, handles: Set[str]
+    ) -> int:
+        instances: Dict[int, IssueInstance] = {}
+        rows = []
+        for batch in _batches(handles):
+            rows.extend(
+                session.execute(
+                    select(IssueInstance, Issue.handle, Issue.code)
+                    .join(Issue, Issue.id == IssueInstance.issue_id)
+                    .where(IssueInstance.run_id == previous_run_id)
+                    .where(Issue.handle.in_(batch))
+                )
+            )
+        self._load_shared_texts(
+            session,
+            [
+                int(id)
+                for previous, _handle, _code in rows
+                for id in (
+                    int(previous.callable_id),
+                    int(previous.filename_id),
+                    _optional_id(previous.message_id),
+                )
+                if id is not None
+            ],
+        )
+        fix_infos = self._load_fix_infos(
+            session,
+            [
+                id
+                for previous, _handle, _code in rows
+                if (id := _optional_id(previous.fix_info_id)) is not None
+            ],
+        )
+
+        for previous, handle, code in rows:
+            callable = self._shared_texts[int(previous.callable_id)]
+            instance_id = DBID()
+            issue: Issue = Issue.Record(
+                id=IssueDBID(),
+                code=code,
+                handle=handle,
+                callable_id=callable.id,
+                status=IssueStatus.uncategorized,
+                detected_time=int(self.current_run.date.timestamp()),
+                first_instance_id=instance_id,
+                update_time=0,
+                triage_duration=0,
+            )
+            self.graph.add_issue(issue)
+
+            fix_info_id = _optional_id(previous.fix_info_id)
+            fix_info = None if fix_info_id is None else fix_infos.get(fix_info_id)
+            instance: IssueInstance = IssueInstance.Record(
+                id=instance_id,
+                issue_id=issue.id,
+                location=previous.location,
+                filename_id=self._shared_texts[int(previous.filename_id)].id,
+                callable_id=callable.id,
+                run_id=self.current_run.id,
+                fix_info_id=None if fix_info is None else fix_info.id,
+                message_id=(
+                    None
+                    if (message_id := _optional_id(previous.message_id)) is None
+                    else self._shared_texts[message_id].id
+                ),
+                rank=previous.rank,
+                min_trace_length_to_sources=previous.min_trace_length_to_sources,
+                min_trace_length_to_sinks=previous.min_trace_length_to_sinks,
+                callable_count=previous.callable_count,
+                # Issues of unchanged shards are never new.
+                archive_if_new_issue=False,
+            )
+            if fix_info is not None:
+                self.graph.add_issue_instance_fix_info(instance, fix_info)
+            self.graph.add_issue_instance(instance)
+            instances[int(previous.id)] = instance
+
+        self._copy_instance_shared_texts(session, instances)
+        self._copy_instance_traces(session, previous_run_id, instances)
+        return len(instances)
+
+    def _load_fix_infos(
+        self, session: Session, ids: Sequence[int]
+    ) -> Dict[int, IssueInstanceFixInfo]:
+        fix_infos = {}
+        for batch in _batches(ids):
+            for id, fix_info in session.execute(
+                select(IssueInstanceFixInfo.id, IssueInstanceFixInfo.fix_info).where(
+                    IssueInstanceFixInfo.id.in_(batch)
+                )
+            ):
+                fix_infos[int(id)] = IssueInstanceFixInfo.Record(
+                    id=DBID(), fix_info=fix_info
+                )
+        return fix_infos
+
+    def _copy_instance_shared_texts(
+        self, session: Session, instances: Dict[int, IssueInstance]
+    ) -> None:
+        assocs = []
+        for batch in _batches(instances):
+            assocs.extend(
+                session.execute(
+                    select(
+                        IssueInstanceSharedTextAssoc.issue_instance_id,
+                        IssueInstanceSharedTextAssoc.shared_text_id,
+                    ).where(IssueInstanceSharedTextAssoc.issue_instance_id.in_(batch))
+                )
+            )
+        self._load_shared_texts(session, [int(text_id) for _, text_id in assocs])
+        for instance_id, text_id in assocs:
+            self.graph.add_issue_instance_shared_text_assoc(
+                instances[int(instance_id)], self._shared_texts[int(text_id)]
+            )
+
+    def _copy_instance_traces(
+        self,
+        session: Session,
+        previous_run_id: int,
+        instances: Dict[int, IssueInstance],
+    ) -> None:
+        assocs = []
+        for batch in _batches(instances):
+            assocs.extend(
+                session.execute(
+                    select(
+                        IssueInstanceTraceFrameAssoc.issue_instance_id,
+                        IssueInstanceTraceFrameAssoc.trace_frame_id,
+                    ).where(IssueInstanceTraceFrameAssoc.issue_instance_id.in_(batch))
+                )
+            )
+
+        # The first frames of a trace belong to their issue instance, so they
+        # are always copied. Frames further down are shared by caller and port.
+        first_frames = self._copy_frames(
+            session,
+            self._load_frames(
+                session, TraceFrame.id, [int(frame_id) for _, frame_id in assocs]
+            ),
+        )
+        for instance_id, frame_id in assocs:
+            frame = self._frames.get(int(frame_id))
+            if frame is not None:
+                self.graph.add_issue_instance_trace_frame_assoc(
+                    instances[int(instance_id)], frame
+                )
+
+        visited_keys: Set[Tuple[TraceKind, int, str]] = set()
+        next_keys = self._callee_keys(session, first_frames.values(), visited_keys)
+        while next_keys:
+            keys = next_keys
+            # Frames generated from the parsed models for the same caller and
+            # port are used instead of the previous ones, but their callees
+            # may only have frames in the previous run.
+            generated = {key for key in keys if self._graph_has_frames(*key)}
+            followed: List[TraceFrame] = [
+                frame
+                for kind, caller_id, caller_port in generated
+                for frame in self.graph.get_trace_frames_from_caller(
+                    kind,
+                    self._shared_texts[caller_id].id,
+                    caller_port,
+                    self.current_run.id,
+                )
+            ]
+            frames = [
+                frame
+                for frame in self._load_frames(
+                    session,
+                    TraceFrame.caller_id,
+                    {caller_id for kind, caller_id, _ in keys - generated},
+                    previous_run_id,
+                )
+                if (frame.kind, frame.caller_id, frame.caller_port) in keys - generated
+            ]
+            followed.extend(self._copy_frames(session, frames).values())
+            next_keys = self._callee_keys(session, followed, visited_keys)
+
+    def _graph_has_frames(self, kind: TraceKind, caller_id: int, port: str) -> bool:
+        caller = self._shared_texts.get(caller_id)
+        return caller is not None and self.graph.has_trace_frames_with_caller(
+            kind, caller.id, port, self.current_run.id
+        )
+
+    def _callee_keys(
+        self,
+        session: Session,
+        frames: Iterable[TraceFrame],
+        visited_keys: Set[Tuple[TraceKind, int, str]],
+    ) -> Set[Tuple[TraceKind, int, str]]:
+        """Returns the keys of the previous run's frames that follow the given
+        frames of the graph, and that were not visited yet."""
+        frames = list(frames)
+        self._load_callables(
+            session,
+            {
+                self.graph.get_text(frame.callee_id)
+                for frame in frames
+                if frame.callee_id.local_id not in self._previous_text_ids
+            },
+        )
+        keys = set()
+        for frame in frames:
+            callee_id = self._previous_text_ids.get(frame.callee_id.local_id)
+            if callee_id is None:
+                # The callee does not exist in the previous run.
+                continue
+            key = (frame.kind, callee_id, frame.callee_port)
+            if key not in visited_keys:
+                visited_keys.add(key)
+                keys.add(key)
+        return keys
+
+    def _load_frames(
+        self,
+        session: Session,
+        column: object,
+        ids: Iterable[int],
+        previous_run_id: Optional[int] = None,
+    ) -> List[_PreviousFrame]:
+        frames = []
+        for batch in _batches(ids):
+            # pyre-ignore[16]: `column` is a column of `TraceFrame`.
+            query = select(TraceFrame).where(column.in_(batch))
+            if previous_run_id is not None:
+                query = query.where(TraceFrame.run_id == previous_run_id)
+            for (frame,) in session.execute(query):
+                frames.append(
+                    _PreviousFrame(
+                        id=int(frame.id),
+                        kind=frame.kind,
+                        caller_id=int(frame.caller_id),
+                        caller_port=frame.caller_port,
+                        callee_id=int(frame.callee_id),
+                        callee_port=frame.callee_port,
+                        frame=frame,
+                    )
+                )
+        # Frames are copied in a deterministic order.
+        frames.sort(key=lambda frame: frame.id)
+        return frames
+
+    def _copy_frames(
+        self, session: Session, previous_frames: List[_PreviousFrame]
+    ) -> Dict[int, TraceFrame]:
+        """Copies frames and their annotations. Returns the copied frames,
+        including the subtrace roots of their annotations, by previous id."""
+        previous_frames = [
+            previous for previous in previous_frames if previous.id not in self._frames
+        ]
+        if not previous_frames:
+            return {}
+        frame_ids = [previous.id for previous in previous_frames]
+        leaf_assocs = []
+        annotations = []
+        for batch in _batches(frame_ids):
+            leaf_assocs.extend(
+                session.execute(
+                    select(
+                        TraceFrameLeafAssoc.trace_frame_id,
+                        TraceFrameLeafAssoc.leaf_id,
+                        TraceFrameLeafAssoc.trace_length,
+                    ).where(TraceFrameLeafAssoc.trace_frame_id.in_(batch))
+                )
+            )
+            annotations.extend(
+                session.execute(
+                    select(TraceFrameAnnotation).where(
+                        TraceFrameAnnotation.trace_frame_id.in_(batch)
+                    )
+                ).scalars()
+            )
+        self._load_shared_texts(
+            session,
+            [
+                id
+                for previous in previous_frames
+                for id in (
+                    previous.caller_id,
+                    previous.callee_id,
+                    int(previous.frame.filename_id),
+                )
+            ]
+            + [int(leaf_id) for _, leaf_id, _ in leaf_assocs]
+            + [
+                id
+                for annotation in annotations
+                if (id := _optional_id(annotation.leaf_id)) is not None
+            ],
+        )
+
+        leaves: Dict[int, List[Tuple[SharedText, Optional[int]]]] = {}
+        for frame_id, leaf_id, trace_length in leaf_assocs:
+            leaves.setdefault(int(frame_id), []).append(
+                (self._shared_texts[int(leaf_id)], trace_length)
+            )
+
+        copied = {}
+        for previous in previous_frames:
+            frame = self._copy_frame(previous, leaves.get(previous.id, []))
+            self._frames[previous.id] = frame
+            copied[previous.id] = frame
+        copied.update(self._copy_annotations(session, annotations))
+        return copied
+
+    def _copy_frame(
+        self,
+        previous: _PreviousFrame,
+        leaves: List[Tuple[SharedText, Optional[int]]],
+    ) -> TraceFrame:
+        leaf_kind = (
+            SharedTextKind.source
+            if previous.kind is TraceKind.postcondition
+            else SharedTextKind.sink
+        )
+        leaf_mapping = {
+            LeafMapping(
+                caller_leaf=self.graph.get_transform_normalized_caller_kind_id(leaf),
+                callee_leaf=self.graph.get_transformed_callee_kind_id(leaf),
+                raw_kind=leaf.id.local_id,
+            )
+            for leaf, _ in leaves
+            if leaf.kind == leaf_kind
+        }
+        frame = previous.frame
+        trace_frame: TraceFrame = TraceFrame.Record(
+            extra_fields=["leaf_mapping"],
+            id=DBID(),
+            kind=previous.kind,
+            caller_id=self._shared_texts[previous.caller_id].id,
+            caller_port=previous.caller_port,
+            callee_id=self._shared_texts[previous.callee_id].id,
+            callee_port=previous.callee_port,
+            callee_location=frame.callee_location,
+            filename_id=self._shared_texts[int(frame.filename_id)].id,
+            titos=frame.titos,
+            run_id=self.current_run.id,
+            preserves_type_context=frame.preserves_type_context,
+            type_interval_lower=frame.type_interval_lower,
+            type_interval_upper=frame.type_interval_upper,
+            leaf_mapping=leaf_mapping,
+            reachability=frame.reachability,
+        )
+        for leaf, trace_length in leaves:
+            self.graph.add_trace_frame_leaf_assoc(trace_frame, leaf, trace_length)
+        self.graph.add_trace_frame(trace_frame)
+        return trace_frame
+
+    def _copy_annotations(
+        self, session: Session, annotations: List[TraceFrameAnnotation]
+    ) -> Dict[int, TraceFrame]:
+        copied = {}
+        for previous in annotations:
+            annotation = TraceFrameAnnotation.Record(
+                id=DBID(),
+                trace_frame_id=self._frames[int(previous.trace_frame_id)].id,
+                location=previous.location,
+                kind=previous.kind,
+                message=previous.message,
+                leaf_id=(
+                    None
+                    if (leaf_id := _optional_id(previous.leaf_id)) is None
+                    else self._shared_texts[leaf_id].id
+                ),
+                link=previous.link,
+                trace_key=previous.trace_key,
+            )
+            self.graph.add_trace_annotation(annotation)
+            copied[int(previous.id)] = annotation
+
+        subtraces = []
+        for batch in _batches(copied):
+            subtraces.extend(
+                session.execute(
+                    select(
+                        TraceFrameAnnotationTraceFrameAssoc.trace_frame_annotation_id,
+                        TraceFrameAnnotationTraceFrameAssoc.trace_frame_id,
+                    ).where(
+                        TraceFrameAnnotationTraceFrameAssoc.trace_frame_annotation_id.in_(
+                            batch
+                        )
+                    )
+                )
+            )
+        # Subtrace roots belong to their annotation, like the first frames of
+        # issues.
+        subtrace_roots = self._copy_frames(
+            session,
+            self._load_frames(
+                session, TraceFrame.id, [int(frame_id) for _, frame_id in subtraces]
+            ),
+        )
+        for annotation_id, frame_id in subtraces:
+            frame = self._frames.get(int(frame_id))
+            if frame is not None:
+                self.graph.add_trace_frame_annotation_trace_frame_assoc(
+                    copied[int(annotation_id)], frame
+                )
+        return subtrace_roots
+
+
+class SaveShardManifest(PipelineStep[List[RunSummary], List[RunSummary]]):
+    """Records the shards of the saved run, for the next incremental ingest."""
+
+    def __init__(self, incremental: IncrementalIngest) -> None:
+        super().__init__()
+        self.incremental = incremental
+
+    def run(
+        self,
+        input: List[RunSummary],
+        summary: Summary,
+        scoped_metrics_logger: ScopedMetricsLogger,
+    ) -> Tuple[List[RunSummary], Summary]:
+        run_ids = [run_summary.id for run_summary in input if run_summary.id]
+        if len(run_ids) != 1:
+            log.info("No run was saved, not updating the shard manifest")
+            return input, summary
+        manifest = self.incremental.manifest
+        manifest.run_id = run_ids[0]
+        manifest.write(self.incremental.manifest_path)
+        log.info(
+            f"Wrote the manifest of {len(manifest.shards)} shards to "
+            f"`{self.incremental.manifest_path}`"
+        )
+        return input, summary
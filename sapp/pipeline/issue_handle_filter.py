@@ -9,6 +9,7 @@ from typing import Set, Tuple
 
 from ..metrics_logger import ScopedMetricsLogger
 from . import IssuesAndFrames, ParseIssueTuple, PipelineStep, Summary
+from .spilling import replace_issues
 
 
 class IssueHandleFilter(PipelineStep[IssuesAndFrames, IssuesAndFrames]):
@@ -27,7 +28,8 @@ class IssueHandleFilter(PipelineStep[IssuesAndFrames, IssuesAndFrames]):
         summary: Summary,
         scoped_metrics_logger: ScopedMetricsLogger,
     ) -> Tuple[IssuesAndFrames, Summary]:
-        input.issues = [
-            issue for issue in input.issues if self._should_keep_issue(issue)
-        ]
+        input.issues = replace_issues(
+            input.issues,
+            (issue for issue in input.issues if self._should_keep_issue(issue)),
+        )
         return input, summary
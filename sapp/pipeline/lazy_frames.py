@@ -0,0 +1,203 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+"""`Frames` that are parsed on demand.
+
+Most models in an analysis output are never reached from an issue. Instead of
+parsing every model upfront, parsers can record where the models of each caller
+and port are located and only parse them once the model generator asks for
+frames of that caller and port.
+"""
+
+import logging
+import os
+from collections import defaultdict, OrderedDict
+from typing import Any, Callable, Dict, IO, Iterable, List, Optional, Set, Tuple
+
+from .. import json_decoder
+from ..memory_report import collection_usage, MemoryUsage
+from . import Frames, ParseConditionTuple, ParseType
+from .string_pool import StringPool
+
+log: logging.Logger = logging.getLogger("sapp")
+
+ParsedModel = Dict[Tuple[ParseType, str], List[ParseConditionTuple]]
+# Index in the paths of the index and offset of a line holding a model.
+ModelPosition = Tuple[int, int]
+
+DEFAULT_CACHE_SIZE = 1024
+
+
+class ModelIndex:
+    """Locations of the model entries of each caller and port, shared by the
+    lazy preconditions and postconditions of an analysis output."""
+
+    def __init__(
+        self,
+        paths: List[str],
+        positions: Dict[Tuple[str, str], List[ModelPosition]],
+        parse_model: Callable[[Dict[str, Any]], Iterable[ParseConditionTuple]],
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        string_pool: Optional[StringPool] = None,
+    ) -> None:
+        """
+        paths: Files containing the models.
+        positions: Caller and caller port to the (index in `paths`, byte
+        offset) of the lines holding models of the caller with that port.
+        parse_model: Parses the `data` of a model entry into conditions.
+        cache_size: Number of parsed lines kept in memory. The model generator
+        asks for each port of a caller separately, and a line holds all of
+        them.
+        string_pool: If given, strings of parsed conditions are interned in the
+        pool.
+        """
+        self._paths = paths
+        self._positions = positions
+        self._parse_model = parse_model
+        self._cache: "OrderedDict[ModelPosition, ParsedModel]" = OrderedDict()
+        self._cache_size = cache_size
+        self._string_pool = string_pool
+        self._handles: Dict[int, IO[bytes]] = {}
+        # Forked processes share the offsets of inherited handles, so each
+        # process opens its own.
+        self._handles_pid: int = os.getpid()
+        # Statistics on the lines parsed at least once.
+        self._counted: Set[ModelPosition] = set()
+        self.parsed_keys: Dict[ParseType, int] = defaultdict(int)
+        self.parsed_frames: Dict[ParseType, int] = defaultdict(int)
+
+    def frames(
+        self, type: ParseType, caller: str, caller_port: str
+    ) -> List[ParseConditionTuple]:
+        positions = self._positions.get((caller, caller_port))
+        if positions is None:
+            return []
+        if len(positions) == 1:
+            return self.model(positions[0]).get((type, caller_port), [])
+        frames = []
+        for position in positions:
+            frames.extend(self.model(position).get((type, caller_port), []))
+        return frames
+
+    def all_positions(self) -> Iterable[ModelPosition]:
+        # A line is listed under each port of its caller.
+        return dict.fromkeys(
+            position for positions in self._positions.values() for position in positions
+        ).keys()
+
+    def model(self, position: ModelPosition) -> ParsedModel:
+        cached = self._cache.get(position)
+        if cached is not None:
+            self._cache.move_to_end(position)
+            return cached
+
+        model: ParsedModel = {}
+        for condition in self._parse_model(self._read(position)):
+            if self._string_pool is not None:
+                condition = condition.interned(self._string_pool)
+            model.setdefault((condition.type, condition.caller_port), []).append(
+                condition
+            )
+        if position not in self._counted:
+            self._counted.add(position)
+            for (type, _), frames in model.items():
+                self.parsed_keys[type] += 1
+                self.parsed_frames[type] += len(frames)
+
+        self._cache[position] = model
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return model
+
+    def _read(self, position: ModelPosition) -> Dict[str, Any]:
+        if self._handles_pid != os.getpid():
+            self._handles = {}
+            self._handles_pid = os.getpid()
+        path_index, offset = position
+        handle = self._handles.get(path_index)
+        if handle is None:
+            handle = open(self._paths[path_index], "rb")
+            self._handles[path_index] = handle
+        handle.seek(offset)
+        return json_decoder.loads(handle.readline())["data"]
+
+    def memory_usage(self, type: ParseType) -> MemoryUsage:
+        """Usage of the cached frames of the type, and of half of the
+        positions, which both types share."""
+        cached = [
+            frames
+            for model in self._cache.values()
+            for (frame_type, _), frames in model.items()
+            if frame_type == type
+        ]
+        return MemoryUsage(
+            sum(len(frames) for frames in cached),
+            collection_usage(cached).bytes
+            + collection_usage(self._positions).bytes // 2,
+        )
+
+    def close(self) -> None:
+        for handle in self._handles.values():
+            handle.close()
+        self._handles = {}
+        self._cache.clear()
+        self._counted = set()
+
+
+class LazyFrames(Frames):
+    """Frames of one type, parsed when first looked up.
+
+    `key_count` and `frame_count` only account for the frames parsed so far.
+    """
+
+    def __init__(self, index: ModelIndex, type: ParseType) -> None:
+        super().__init__({})
+        self._index: Optional[ModelIndex] = index
+        self._type = type
+
+    def frames_from_caller(
+        self, caller: str, caller_port: str
+    ) -> List[ParseConditionTuple]:
+        self._assert_not_disposed()
+        index = self._index
+        assert index is not None
+        return index.frames(self._type, caller, caller_port)
+
+    def all_frames(self) -> Iterable[ParseConditionTuple]:
+        self._assert_not_disposed()
+        index = self._index
+        assert index is not None
+        for position in index.all_positions():
+            for (type, _), frames in index.model(position).items():
+                if type == self._type:
+                    yield from frames
+
+    def key_count(self) -> int:
+        self._assert_not_disposed()
+        index = self._index
+        assert index is not None
+        return index.parsed_keys[self._type]
+
+    def frame_count(self) -> int:
+        self._assert_not_disposed()
+        index = self._index
+        assert index is not None
+        return index.parsed_frames[self._type]
+
+    def memory_usage(self) -> MemoryUsage:
+        index = self._index
+        if index is None:
+            return MemoryUsage(0, 0)
+        return index.memory_usage(self._type)
+
+    def dispose(self) -> None:
+        super().dispose()
+        index = self._index
+        assert index is not None
+        # The index is shared, closing it twice is harmless.
+        index.close()
+        self._index = None
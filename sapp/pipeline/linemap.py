@@ -0,0 +1,203 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+"""Maps of new line numbers to old line numbers, per file.
+
+Differential runs use a linemap to recognize issues that only moved. The JSON
+form, `{filename: {new_line: [old_line, ...]}}`, has to be decoded in full into
+nested dictionaries before the first lookup, which takes minutes and gigabytes
+for large diffs.
+
+The binary form produced by `convert` is memory mapped instead. It holds, for
+each file, the sorted array of its new lines, and for each new line the range of
+its old lines in a shared array:
+
+    header
+    file_line_offsets: uint32[file_count + 1], index of the first new line of
+        each file in `new_lines`
+    new_lines: uint32[line_count], sorted within each file
+    old_line_offsets: uint32[line_count + 1], index of the first old line of
+        each new line in `old_lines`
+    old_lines: uint32[old_line_count]
+    filenames, sorted and separated by NUL bytes
+
+Integers are in the byte order of the machine that wrote the file. Opening a
+binary linemap only decodes the filenames, and lookups are binary searches.
+"""
+
+import json
+import mmap
+import struct
+import sys
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, IO, List, Optional, Sequence, Tuple
+
+import xxhash
+
+from .. import json_decoder
+
+MAGIC = b"SAPPLMAP"
+VERSION = 1
+
+# Magic, version, byte order (0 for little endian, 1 for big endian), file
+# count, line count, old line count, and the size of the filenames in bytes.
+_HEADER = struct.Struct("=8sIIIIII")
+_NAME_SEPARATOR = b"\0"
+
+
+def _uint32_array(values: Sequence[int] = ()) -> "array[int]":
+    values = array("I", values)
+    assert values.itemsize == 4
+    return values
+
+
+class Linemap(ABC):
+    @abstractmethod
+    def old_lines(self, filename: str, line: int) -> Sequence[int]:
+        """Lines in the old version of the file that `line` comes from."""
+        ...
+
+    @abstractmethod
+    def fingerprint(self) -> str:
+        """Digest of the mapping."""
+        ...
+
+    @staticmethod
+    def load(path: str) -> "Linemap":
+        """Opens a linemap in either form."""
+        with open(path, "rb") as handle:
+            is_binary = handle.read(len(MAGIC)) == MAGIC
+        if is_binary:
+            return BinaryLinemap(path)
+        with open(path, "rb") as handle:
+            return JSONLinemap(json_decoder.loads(handle.read()))
+
+
+class JSONLinemap(Linemap):
+    def __init__(self, linemap: Dict[str, Dict[str, List[int]]]) -> None:
+        self.linemap = linemap
+
+    def old_lines(self, filename: str, line: int) -> Sequence[int]:
+        return self.linemap.get(filename, {}).get(str(line), [])
+
+    def fingerprint(self) -> str:
+        return xxhash.xxh3_128_hexdigest(
+            json.dumps(self.linemap, sort_keys=True).encode()
+        )
+
+
+class BinaryLinemap(Linemap):
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._fingerprint: Optional[str] = None
+        with open(path, "rb") as handle:
+            self._map: mmap.mmap = mmap.mmap(
+                handle.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        (
+            magic,
+            version,
+            byte_order,
+            file_count,
+            line_count,
+            old_line_count,
+            names_size,
+        ) = _HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"`{path}` is not a version {VERSION} binary linemap")
+        if byte_order != (sys.byteorder == "big"):
+            raise ValueError(
+                f"`{path}` was written on a machine with a different byte order"
+            )
+
+        integers = memoryview(self._map)[_HEADER.size :].cast("B")
+        sections = []
+        start = 0
+        for size in (file_count + 1, line_count, line_count + 1, old_line_count):
+            sections.append(integers[start : start + 4 * size].cast("I"))
+            start += 4 * size
+        (
+            self._file_line_offsets,
+            self._new_lines,
+            self._old_line_offsets,
+            self._old_lines,
+        ) = sections
+        names = bytes(integers[start : start + names_size])
+        self._files: Dict[str, int] = {
+            name.decode(): index
+            for index, name in enumerate(names.split(_NAME_SEPARATOR))
+            if file_count
+        }
+
+    def old_lines(self, filename: str, line: int) -> Sequence[int]:
+        index = self._files.get(filename)
+        if index is None:
+            return []
+        start = self._file_line_offsets[index]
+        end = self._file_line_offsets[index + 1]
+        position = bisect_left(self._new_lines, line, start, end)
+        if position == end or self._new_lines[position] != line:
+            return []
+        return self._old_lines[
+            self._old_line_offsets[position] : self._old_line_offsets[position + 1]
+        ].tolist()
+
+    def fingerprint(self) -> str:
+        if self._fingerprint is None:
+            self._fingerprint = xxhash.xxh3_128_hexdigest(self._map)
+        return self._fingerprint
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Workers map the file themselves.
+        return {"path": self.path}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(state["path"])
+
+
+def write_binary(linemap: Dict[str, Dict[str, List[int]]], output: IO[bytes]) -> None:
+    file_line_offsets = _uint32_array([0])
+    new_lines = _uint32_array()
+    old_line_offsets = _uint32_array([0])
+    old_lines = _uint32_array()
+    names = []
+    for filename in sorted(linemap):
+        lines: List[Tuple[int, List[int]]] = sorted(
+            (int(line), old) for line, old in linemap[filename].items()
+        )
+        for line, old in lines:
+            new_lines.append(line)
+            old_lines.extend(old)
+            old_line_offsets.append(len(old_lines))
+        file_line_offsets.append(len(new_lines))
+        names.append(filename.encode())
+
+    encoded_names = _NAME_SEPARATOR.join(names)
+    output.write(
+        _HEADER.pack(
+            MAGIC,
+            VERSION,
+            sys.byteorder == "big",
+            len(names),
+            len(new_lines),
+            len(old_lines),
+            len(encoded_names),
+        )
+    )
+    for integers in (file_line_offsets, new_lines, old_line_offsets, old_lines):
+        integers.tofile(output)
+    output.write(encoded_names)
+
+
+def convert(json_path: str, binary_path: str) -> None:
+    """Writes the binary form of a JSON linemap."""
+    with open(json_path, "rb") as handle:
+        linemap = json_decoder.loads(handle.read())
+    with open(binary_path, "wb") as output:
+        write_binary(linemap, output)
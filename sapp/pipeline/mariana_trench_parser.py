@@ -5,30 +5,17 @@
 
 # pyre-strict
 
-import json
 import logging
 import sys
-from typing import (
-    Any,
-    Dict,
-    IO,
-    Iterable,
-    List,
-    NamedTuple,
-    Optional,
-    Set,
-    Tuple,
-    Type,
-    TypeVar,
-    Union,
-)
+from typing import Any, Dict, IO, Iterable, List, Optional, Set, Tuple, Union
 
 from ordered_set import OrderedSet
 
-from .. import pipeline as sapp
+from .. import json_decoder, pipeline as sapp
 from ..analysis_output import AnalysisOutput, Metadata, Rule
+from ..memory_budget import MemoryBudget
 from . import mariana_trench_parser_objects as mariana_trench
-from .base_parser import BaseParser
+from .base_parser import BaseParser, FileRange, IssueFilter, read_line_range
 
 if sys.version_info >= (3, 8):
     from typing import Literal
@@ -39,172 +26,91 @@ else:
 log: logging.Logger = logging.getLogger()
 
 
-class ConditionLeaf(NamedTuple):
-    kind: str
-    distance: int
-
-    @staticmethod
-    def from_kind(kind: mariana_trench.Kind) -> "ConditionLeaf":
-        return ConditionLeaf(kind=kind.name, distance=kind.distance)
-
-    def to_sapp(self) -> Tuple[str, int]:
-        return (self.kind, self.distance)
-
-
-class ConditionCall(NamedTuple):
-    """Represents a caller/callee in a [pre|post]Condition"""
-
-    method: mariana_trench.Method
-    port: mariana_trench.Port
-    position: mariana_trench.Position
-
-    @staticmethod
-    def from_call_info(call_info: mariana_trench.CallInfo) -> "ConditionCall":
-        if call_info.method is None:
-            raise sapp.ParseError(
-                f"Cannot construct a ConditionCall without a valid method {call_info}"
-            )
-        return ConditionCall(call_info.method, call_info.port, call_info.position)
-
-    @staticmethod
-    def from_origin(
-        origin: mariana_trench.Origin, call_info: mariana_trench.CallInfo
-    ) -> "ConditionCall":
-        return ConditionCall(
-            method=origin.callee_name,
-            port=origin.callee_port,
-            position=call_info.position,
-        )
-
-
-class Condition(NamedTuple):
-    caller: ConditionCall
-    callee: ConditionCall
-    leaves: List[ConditionLeaf]
-    local_positions: mariana_trench.LocalPositions
-    features: mariana_trench.Features
-    extra_traces: OrderedSet[mariana_trench.ExtraTrace]
-    type_interval: Optional[mariana_trench.TypeInterval]
-
-    def convert_to_sapp(
-        self, kind: Literal[sapp.ParseType.PRECONDITION, sapp.ParseType.POSTCONDITION]
-    ) -> sapp.ParseConditionTuple:
-        return sapp.ParseConditionTuple(
-            type=kind,
-            caller=self.caller.method.name,
-            caller_port=self.caller.port.value,
-            filename=self.caller.position.path,
-            callee=self.callee.method.name,
-            callee_port=self.callee.port.value,
-            callee_location=self.callee.position.to_sapp(),
-            type_interval=(
-                self.type_interval.to_sapp() if self.type_interval else None
-            ),
-            features=self.features.to_sapp_as_parsetracefeature(),
-            titos=self.local_positions.to_sapp(),
-            leaves=[leaf.to_sapp() for leaf in self.leaves],
-            annotations=[extra_trace.to_sapp() for extra_trace in self.extra_traces],
-        )
-
-
-ConditionType = TypeVar("ConditionType", bound="Condition", covariant=True)
-
-
-class Precondition(Condition):
-    def to_sapp(self) -> sapp.ParseConditionTuple:
-        return super().convert_to_sapp(sapp.ParseType.PRECONDITION)
-
-
-class Postcondition(Condition):
-    def to_sapp(self) -> sapp.ParseConditionTuple:
-        return super().convert_to_sapp(sapp.ParseType.POSTCONDITION)
-
-
-class Propagation(Condition):
-    def to_sapp(self) -> sapp.ParseConditionTuple:
-        return super().convert_to_sapp(sapp.ParseType.PRECONDITION)
-
-
-class IssueCondition(NamedTuple):
-    callee: ConditionCall
-    leaves: List[ConditionLeaf]
-    local_positions: mariana_trench.LocalPositions
-    features: mariana_trench.Features
-    extra_traces: OrderedSet[mariana_trench.ExtraTrace]
-    type_interval: Optional[mariana_trench.TypeInterval]
-
-    def to_sapp(self) -> sapp.ParseIssueConditionTuple:
-        return sapp.ParseIssueConditionTuple(
-            callee=self.callee.method.name,
-            port=self.callee.port.value,
-            location=self.callee.position.to_sapp(),
-            leaves=[leaf.to_sapp() for leaf in self.leaves],
-            titos=self.local_positions.to_sapp(),
-            features=self.features.to_sapp_as_parsetracefeature(),
-            type_interval=(
-                self.type_interval.to_sapp() if self.type_interval else None
-            ),
-            annotations=[extra_trace.to_sapp() for extra_trace in self.extra_traces],
-        )
-
-
-class Leaf(NamedTuple):
-    method: mariana_trench.Method
-    kind: str
-    distance: int
-
-    def to_sapp(self) -> sapp.ParseIssueLeaf:
-        return (self.method.name, self.kind, self.distance)
-
-
-class Issue(NamedTuple):
-    code: int
-    message: str
-    callable: mariana_trench.Method
-    callee: mariana_trench.IssueCallee
-    sink_index: str
-    callable_position: mariana_trench.Position
-    issue_position: mariana_trench.Position
-    preconditions: List[IssueCondition]
-    postconditions: List[IssueCondition]
-    initial_sources: OrderedSet[Leaf]
-    final_sinks: OrderedSet[Leaf]
-    features: mariana_trench.Features
-
-    def to_sapp(self, parser: "Parser") -> sapp.ParseIssueTuple:
-        return sapp.ParseIssueTuple(
-            code=self.code,
-            message=self.message,
-            callable=self.callable.name,
-            handle=Parser.get_master_handle(
-                self.callable.name,
-                self.callee,
-                self.sink_index,
-                self.code,
-                self.callable_position.line,
-                self.issue_position.line,
-            ),
-            filename=self.callable_position.path,
-            callable_line=self.callable_position.line,
-            line=self.issue_position.line,
-            start=self.issue_position.start,
-            end=self.issue_position.end,
-            preconditions=[
-                precondition.to_sapp() for precondition in self.preconditions
-            ],
-            postconditions=[
-                postcondition.to_sapp() for postcondition in self.postconditions
-            ],
-            initial_sources=OrderedSet(leaf.to_sapp() for leaf in self.initial_sources),
-            final_sinks=OrderedSet(leaf.to_sapp() for leaf in self.final_sinks),
-            features=self.features.to_sapp(),
-            fix_info=None,
+ConditionParseType = Literal[sapp.ParseType.PRECONDITION, sapp.ParseType.POSTCONDITION]
+
+
+def _leaf(kind: mariana_trench.Kind) -> Tuple[str, int]:
+    return (kind.name, kind.distance)
+
+
+def _type_interval(
+    interval: Optional[mariana_trench.TypeInterval],
+) -> Optional[sapp.ParseTypeInterval]:
+    return interval.to_sapp() if interval else None
+
+
+def _condition(
+    parse_type: ConditionParseType,
+    caller: mariana_trench.Method,
+    caller_port: mariana_trench.Port,
+    caller_position: mariana_trench.Position,
+    callee: mariana_trench.Method,
+    callee_port: mariana_trench.Port,
+    callee_position: mariana_trench.Position,
+    leaves: List[Tuple[str, int]],
+    local_positions: mariana_trench.LocalPositions,
+    features: mariana_trench.Features,
+    extra_traces: Iterable[mariana_trench.ExtraTrace],
+    interval: Optional[mariana_trench.TypeInterval],
+) -> sapp.ParseConditionTuple:
+    return sapp.ParseConditionTuple(
+        type=parse_type,
+        caller=caller.name,
+        caller_port=caller_port.value,
+        filename=caller_position.path,
+        callee=callee.name,
+        callee_port=callee_port.value,
+        callee_location=callee_position.to_sapp(),
+        type_interval=_type_interval(interval),
+        features=features.to_sapp_as_parsetracefeature(),
+        titos=local_positions.to_sapp(),
+        leaves=leaves,
+        annotations=[extra_trace.to_sapp() for extra_trace in extra_traces],
+    )
+
+
+def _issue_condition(
+    callee: mariana_trench.Method,
+    callee_port: mariana_trench.Port,
+    callee_position: mariana_trench.Position,
+    leaves: List[Tuple[str, int]],
+    local_positions: mariana_trench.LocalPositions,
+    features: mariana_trench.Features,
+    extra_traces: Iterable[mariana_trench.ExtraTrace],
+    interval: Optional[mariana_trench.TypeInterval],
+) -> sapp.ParseIssueConditionTuple:
+    return sapp.ParseIssueConditionTuple(
+        callee=callee.name,
+        port=callee_port.value,
+        location=callee_position.to_sapp(),
+        leaves=leaves,
+        titos=local_positions.to_sapp(),
+        features=features.to_sapp_as_parsetracefeature(),
+        type_interval=_type_interval(interval),
+        annotations=[extra_trace.to_sapp() for extra_trace in extra_traces],
+    )
+
+
+def _call_info_method(call_info: mariana_trench.CallInfo) -> mariana_trench.Method:
+    if call_info.method is None:
+        raise sapp.ParseError(
+            f"Cannot construct a condition call without a valid method {call_info}"
         )
+    return call_info.method
 
 
 class Parser(BaseParser):
-    def __init__(self, repo_dirs: Optional[Set[str]] = None) -> None:
-        super().__init__(repo_dirs)
+    SUPPORTS_FILE_RANGES = True
+    SUPPORTS_ISSUE_FILTER = True
+
+    def __init__(
+        self,
+        repo_dirs: Optional[Set[str]] = None,
+        frames_store: sapp.FramesStore = sapp.FramesStore.MEMORY,
+        issue_filter: Optional[IssueFilter] = None,
+        memory_budget: Optional[MemoryBudget] = None,
+    ) -> None:
+        super().__init__(repo_dirs, frames_store, issue_filter, memory_budget)
         self._rules: Dict[int, Rule] = {}
         self._initialized: bool = False
 
@@ -246,23 +152,33 @@ class Parser(BaseParser):
     def parse_handle(
         self, handle: IO[str]
     ) -> Iterable[Union[sapp.ParseConditionTuple, sapp.ParseIssueTuple]]:
-        for line in handle.readlines():
-            if line.startswith("//"):
-                continue
-            model = json.loads(line)
-
-            # Note: Non method models include field models. We don't process those
-            # since traces show methods only.
-            if "method" in model.keys():
-                yield from self._parse_issues(model)
-                for precondition in self._parse_preconditions(model):
-                    yield precondition.to_sapp()
-                for effect_precondition in self._parse_effect_preconditions(model):
-                    yield effect_precondition.to_sapp()
-                for postcondition in self._parse_postconditions(model):
-                    yield postcondition.to_sapp()
-                for propagation in self._parse_propagations(model):
-                    yield propagation.to_sapp()
+        # Models are decoded one line at a time, so that only a single model is
+        # held in memory at any point.
+        for line in handle:
+            yield from self._parse_line(line)
+
+    def parse_file_range(
+        self, file_range: FileRange
+    ) -> Iterable[Union[sapp.ParseConditionTuple, sapp.ParseIssueTuple]]:
+        with open(file_range.path, "rb") as handle:
+            for line in read_line_range(handle, file_range.start, file_range.end):
+                yield from self._parse_line(line)
+
+    def _parse_line(
+        self, line: str
+    ) -> Iterable[Union[sapp.ParseConditionTuple, sapp.ParseIssueTuple]]:
+        if line.startswith("//"):
+            return
+        model = json_decoder.loads(line)
+
+        # Note: Non method models include field models. We don't process those
+        # since traces show methods only.
+        if "method" in model.keys():
+            yield from self._parse_issues(model)
+            yield from self._parse_preconditions(model)
+            yield from self._parse_effect_preconditions(model)
+            yield from self._parse_postconditions(model)
+            yield from self._parse_propagations(model)
 
     def _parse_issues(self, model: Dict[str, Any]) -> Iterable[sapp.ParseIssueTuple]:
         for issue in model.get("issues", []):
@@ -275,8 +191,24 @@ class Parser(BaseParser):
             issue_position = mariana_trench.Position.from_json(
                 issue["position"], callable
             )
-            features = mariana_trench.Features.from_json(issue)
+            handle = Parser.get_master_handle(
+                callable.name,
+                mariana_trench.IssueCallee.from_json(issue),
+                issue["sink_index"],
+                code,
+                callable_position.line,
+                issue_position.line,
+            )
+            if not self._keeps_issue(
+                code,
+                callable.name,
+                handle,
+                callable_position.path,
+                issue_position.line,
+            ):
+                continue
 
+            features = mariana_trench.Features.from_json(issue)
             (preconditions, final_sinks) = self._parse_issue_conditions(
                 issue, callable, callable_position, "sink"
             )
@@ -284,20 +216,23 @@ class Parser(BaseParser):
                 issue, callable, callable_position, "source"
             )
 
-            yield Issue(
+            yield sapp.ParseIssueTuple(
                 code=code,
                 message=f"{rule.name}: {rule.description}",
-                callable=callable,
-                callee=mariana_trench.IssueCallee.from_json(issue),
-                sink_index=issue["sink_index"],
-                callable_position=callable_position,
-                issue_position=issue_position,
+                callable=callable.name,
+                handle=handle,
+                filename=callable_position.path,
+                callable_line=callable_position.line,
+                line=issue_position.line,
+                start=issue_position.start,
+                end=issue_position.end,
                 preconditions=preconditions,
                 postconditions=postconditions,
                 initial_sources=initial_sources,
                 final_sinks=final_sinks,
-                features=features,
-            ).to_sapp(self)
+                features=features.to_sapp(),
+                fix_info=None,
+            )
 
     def _parse_issue_conditions(
         self,
@@ -305,7 +240,7 @@ class Parser(BaseParser):
         callable: mariana_trench.Method,
         callable_position: mariana_trench.Position,
         frame_type: str,
-    ) -> Tuple[List[IssueCondition], OrderedSet[Leaf]]:
+    ) -> Tuple[List[sapp.ParseIssueConditionTuple], OrderedSet[sapp.ParseIssueLeaf]]:
         condition_taints = issue[f"{frame_type}s"]
 
         conditions = []
@@ -333,11 +268,7 @@ class Parser(BaseParser):
                 for kind in kinds:
                     for origin in kind.origins:
                         issue_leaves.add(
-                            Leaf(
-                                method=origin.callee_name,
-                                kind=kind.name,
-                                distance=kind.distance,
-                            )
+                            (origin.callee_name.name, kind.name, kind.distance)
                         )
 
             if call_info.is_declaration():
@@ -348,78 +279,86 @@ class Parser(BaseParser):
             if call_info.is_origin():
                 for interval, kinds in kinds_by_interval.items():
                     for kind in kinds:
-                        condition_leaves = [ConditionLeaf.from_kind(kind)]
+                        condition_leaves = [_leaf(kind)]
                         for origin in kind.origins:
                             conditions.append(
-                                IssueCondition(
-                                    callee=ConditionCall.from_origin(origin, call_info),
+                                _issue_condition(
+                                    callee=origin.callee_name,
+                                    callee_port=origin.callee_port,
+                                    callee_position=call_info.position,
                                     leaves=condition_leaves,
                                     local_positions=local_positions,
                                     features=features,
                                     extra_traces=OrderedSet(kind.extra_traces),
-                                    type_interval=interval,
+                                    interval=interval,
                                 )
                             )
             else:
                 for interval, kinds in kinds_by_interval.items():
-                    condition_leaves = []
                     extra_traces = OrderedSet()
                     for kind in kinds:
-                        condition_leaves.append(ConditionLeaf.from_kind(kind))
                         extra_traces.update(kind.extra_traces)
                     conditions.append(
-                        IssueCondition(
-                            callee=ConditionCall.from_call_info(call_info),
-                            leaves=condition_leaves,
+                        _issue_condition(
+                            callee=_call_info_method(call_info),
+                            callee_port=call_info.port,
+                            callee_position=call_info.position,
+                            leaves=[_leaf(kind) for kind in kinds],
                             local_positions=local_positions,
                             features=features,
                             extra_traces=extra_traces,
-                            type_interval=interval,
+                            interval=interval,
                         )
                     )
 
         return conditions, issue_leaves
 
-    def _parse_preconditions(self, model: Dict[str, Any]) -> Iterable[Precondition]:
+    def _parse_preconditions(
+        self, model: Dict[str, Any]
+    ) -> Iterable[sapp.ParseConditionTuple]:
         return self._parse_condition(
             model,
             condition_model_key="sinks",
             port_key="port",
             leaf_model_key="taint",
             frame_type="sink",
-            condition_class=Precondition,
+            parse_type=sapp.ParseType.PRECONDITION,
         )
 
     def _parse_effect_preconditions(
         self, model: Dict[str, Any]
-    ) -> Iterable[Precondition]:
+    ) -> Iterable[sapp.ParseConditionTuple]:
         return self._parse_condition(
             model,
             condition_model_key="effect_sinks",
             port_key="port",
             leaf_model_key="taint",
             frame_type="sink",
-            condition_class=Precondition,
+            parse_type=sapp.ParseType.PRECONDITION,
         )
 
-    def _parse_postconditions(self, model: Dict[str, Any]) -> Iterable[Postcondition]:
+    def _parse_postconditions(
+        self, model: Dict[str, Any]
+    ) -> Iterable[sapp.ParseConditionTuple]:
         return self._parse_condition(
             model,
             condition_model_key="generations",
             port_key="port",
             leaf_model_key="taint",
             frame_type="source",
-            condition_class=Postcondition,
+            parse_type=sapp.ParseType.POSTCONDITION,
         )
 
-    def _parse_propagations(self, model: Dict[str, Any]) -> Iterable[Propagation]:
+    def _parse_propagations(
+        self, model: Dict[str, Any]
+    ) -> Iterable[sapp.ParseConditionTuple]:
         return self._parse_condition(
             model,
             condition_model_key="propagation",
             port_key="input",
             leaf_model_key="output",
             frame_type="sink",
-            condition_class=Propagation,
+            parse_type=sapp.ParseType.PRECONDITION,
         )
 
     def _parse_condition(
@@ -429,19 +368,15 @@ class Parser(BaseParser):
         port_key: str,
         leaf_model_key: str,
         frame_type: str,
-        condition_class: Type[ConditionType],
-    ) -> Iterable[ConditionType]:
+        parse_type: ConditionParseType,
+    ) -> Iterable[sapp.ParseConditionTuple]:
         caller_method = mariana_trench.Method.from_json(model["method"])
         caller_position = mariana_trench.Position.from_json(
             model["position"], caller_method
         )
 
         for leaf_model in model.get(condition_model_key, []):
-            caller = ConditionCall(
-                method=caller_method,
-                port=mariana_trench.Port.from_json(leaf_model[port_key]),
-                position=caller_position,
-            )
+            caller_port = mariana_trench.Port.from_json(leaf_model[port_key])
             for leaf_taint in leaf_model[leaf_model_key]:
                 call_info_json = leaf_taint["call_info"]
                 call_info = mariana_trench.CallInfo.from_json(
@@ -472,38 +407,56 @@ class Parser(BaseParser):
 
                 if call_info.is_origin():
                     for interval, kinds in kinds_by_interval.items():
-                        condition_by_callee = {}
+                        # Leaves and extra traces, grouped by origin.
+                        leaves_by_callee: Dict[
+                            Tuple[mariana_trench.Method, mariana_trench.Port],
+                            Tuple[
+                                List[Tuple[str, int]],
+                                OrderedSet[mariana_trench.ExtraTrace],
+                            ],
+                        ] = {}
                         for kind in kinds:
                             for origin in kind.origins:
-                                callee = ConditionCall.from_origin(origin, call_info)
-                                condition = condition_by_callee.get(
-                                    callee,
-                                    condition_class(
-                                        caller=caller,
-                                        callee=callee,
-                                        leaves=[],
-                                        local_positions=local_positions,
-                                        features=local_features,
-                                        extra_traces=OrderedSet(),
-                                        type_interval=interval,
-                                    ),
+                                leaves, extra_traces = leaves_by_callee.setdefault(
+                                    (origin.callee_name, origin.callee_port),
+                                    ([], OrderedSet()),
                                 )
-                                condition.leaves.append(ConditionLeaf.from_kind(kind))
-                                condition.extra_traces.update(kind.extra_traces)
-                                condition_by_callee[callee] = condition
-                        for condition in condition_by_callee.values():
-                            yield condition
+                                leaves.append(_leaf(kind))
+                                extra_traces.update(kind.extra_traces)
+                        for (callee, callee_port), (
+                            leaves,
+                            extra_traces,
+                        ) in leaves_by_callee.items():
+                            yield _condition(
+                                parse_type,
+                                caller=caller_method,
+                                caller_port=caller_port,
+                                caller_position=caller_position,
+                                callee=callee,
+                                callee_port=callee_port,
+                                callee_position=call_info.position,
+                                leaves=leaves,
+                                local_positions=local_positions,
+                                features=local_features,
+                                extra_traces=extra_traces,
+                                interval=interval,
+                            )
                 else:
                     for interval, kinds in kinds_by_interval.items():
                         extra_traces = OrderedSet()
                         for kind in kinds:
                             extra_traces.update(kind.extra_traces)
-                        yield condition_class(
-                            caller=caller,
-                            callee=ConditionCall.from_call_info(call_info),
-                            leaves=[ConditionLeaf.from_kind(kind) for kind in kinds],
+                        yield _condition(
+                            parse_type,
+                            caller=caller_method,
+                            caller_port=caller_port,
+                            caller_position=caller_position,
+                            callee=_call_info_method(call_info),
+                            callee_port=call_info.port,
+                            callee_position=call_info.position,
+                            leaves=[_leaf(kind) for kind in kinds],
                             local_positions=local_positions,
                             features=local_features,
                             extra_traces=extra_traces,
-                            type_interval=interval,
+                            interval=interval,
                         )
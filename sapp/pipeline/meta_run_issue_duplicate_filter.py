@@ -16,6 +16,7 @@ from ..db import DB
 from ..metrics_logger import ScopedMetricsLogger
 from ..models import IssueInstance, MetaRunIssueInstanceIndex, Run, RunStatus
 from . import Any, Dict, IssuesAndFrames, ParseIssueTuple, PipelineStep, Summary, Union
+from .spilling import replace_issues
 
 LOG: logging.Logger = logging.getLogger("sapp")
 
@@ -109,11 +110,14 @@ class MetaRunIssueDuplicateFilter(PipelineStep[IssuesAndFrames, IssuesAndFrames]
         )
 
         with self.database.make_session() as session:
-            input.issues = [
-                issue
-                for issue in input.issues
-                if self._should_keep_issue(session, issue)
-            ]
+            input.issues = replace_issues(
+                input.issues,
+                (
+                    issue
+                    for issue in input.issues
+                    if self._should_keep_issue(session, issue)
+                ),
+            )
 
         LOG.info(
             "Removed %d issues existing in meta run %d (out of %d issues)",
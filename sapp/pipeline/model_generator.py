@@ -8,7 +8,10 @@
 import datetime
 import json
 import logging
+import multiprocessing
+import zlib
 from collections import defaultdict
+from dataclasses import dataclass
 from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
 
 from pyre_extensions import none_throws
@@ -50,6 +53,7 @@ from . import (
     PipelineStep,
     Summary,
 )
+from .spilling import SpillingIssues
 
 log: logging.Logger = logging.getLogger("sapp")
 
@@ -76,6 +80,45 @@ def bound_trace_length(depth: Any) -> Optional[int]:
 MAX_TYPE_INTERVAL: int = (2**31) - 1
 
 
+@dataclass
+class ExplorationStatistics:
+    """Counts of the frames `_generate_transitive_trace_frames` reached with
+    leaves, by whether traces from their callee were already explored with
+    all, some or none of these leaves."""
+
+    explored: int = 0
+    partially_explored: int = 0
+    unexplored: int = 0
+
+    def add(self, other: "ExplorationStatistics") -> None:
+        self.explored += other.explored
+        self.partially_explored += other.partially_explored
+        self.unexplored += other.unexplored
+
+    def hit_rate(self) -> float:
+        total = self.explored + self.partially_explored + self.unexplored
+        return self.explored / total if total else 0.0
+
+
+# Partitions of the issues and the state shared by the forked workers of
+# `ModelGenerator._generate_issues_in_parallel`.
+_worker_state: Optional[
+    Tuple["ModelGenerator", List[Run], Dict[str, int], List[List[ParseIssueTuple]]]
+] = None
+
+PartitionResult = Tuple[
+    TraceGraph,
+    Dict[TraceKind, Set[Tuple[str, str]]],
+    Set[Tuple[str, str, int]],
+    ExplorationStatistics,
+]
+
+
+def _generate_partition(index: int) -> PartitionResult:
+    generator, runs, callables, partitions = none_throws(_worker_state)
+    return generator._generate_issues(runs, partitions[index], callables)
+
+
 def bound_type_interval_limit(i: Any) -> Optional[int]:
     # avoid writing bad interval numbers
     return bound_int(i, MAX_TYPE_INTERVAL)
@@ -88,24 +131,35 @@ class ModelGenerator(PipelineStep[IssuesAndFrames, TraceGraph]):
         meta_run_identifier: Optional[int] = None,
         archive_issue_instances_of_new_issues: bool = True,
         skip_traces: bool = False,
+        processes: int = 1,
     ) -> None:
+        """
+        processes: Number of processes generating the traces of issues. Issues
+        are partitioned by callable, and the graphs of the partitions are merged
+        in the main process.
+        """
         super().__init__()
         self.summary: Summary
         self.graph: TraceGraph
-        self.visited_frames: Dict[int, Set[int]] = {}  # frame id -> leaf ids
+        # (kind, run id, callee id, callee port) -> mask of the leaf kinds that
+        # traces from the callee were already explored with. Issues reaching the
+        # same callee only explore its traces with the leaves not seen before.
+        self.explored_callees: Dict[Tuple[TraceKind, int, int, str], int] = {}
+        self.exploration_statistics: ExplorationStatistics = ExplorationStatistics()
         self.record_meta_run_issue_instances: bool = record_meta_run_issue_instances
         self.meta_run_identifier: Optional[int] = meta_run_identifier
         self.archive_issue_instances_of_new_issues = (
             archive_issue_instances_of_new_issues
         )
         self.skip_traces: bool = skip_traces
+        self.processes: int = processes
         self.trace_entries: Dict[TraceKind, Frames] = {}
         self.generated_annotation_traces: Set[
             Tuple[str, str, TraceKind, Optional[str], DBID]
         ] = set()
         # Active _generate_transitive_trace_frames queue, if any.
         self._transitive_queue: Optional[
-            List[Tuple[Union[str, TraceKind], TraceFrame, Set[int]]]
+            List[Tuple[Union[str, TraceKind], TraceFrame, int]]
         ] = None
 
     def run(
@@ -117,6 +171,8 @@ class ModelGenerator(PipelineStep[IssuesAndFrames, TraceGraph]):
         result = self._run_inner(input, summary, scoped_metrics_logger)
 
         log.info("Freeing parsed issues and frames")
+        if isinstance(input.issues, SpillingIssues):
+            input.issues.dispose()
         input.issues = []
         input.preconditions.dispose()
         input.postconditions.dispose()
@@ -141,7 +197,7 @@ class ModelGenerator(PipelineStep[IssuesAndFrames, TraceGraph]):
         )  # Dict[TraceKind, Set[Tuple[str, str]]]
         self.summary.big_tito = set()  # Set[Tuple[str, str, int]]
 
-        self.graph = TraceGraph()
+        self.graph = TraceGraph(input.string_pool)
 
         runs = self._create_empty_runs(status=RunStatus.incomplete)
         self.summary.runs = runs
@@ -149,9 +205,23 @@ class ModelGenerator(PipelineStep[IssuesAndFrames, TraceGraph]):
         callables = self._compute_callables_count(input.issues)
 
         log.info("Generating issues and traces")
-        for entry in input.issues:
-            for run in runs:
-                self._generate_issue(run, entry, callables)
+        if self.processes > 1 and len(input.issues) > 1:
+            self._generate_issues_in_parallel(runs, input.issues, callables)
+        else:
+            for entry in input.issues:
+                for run in runs:
+                    self._generate_issue(run, entry, callables)
+
+        statistics = self.exploration_statistics
+        log.info(
+            f"Reached {statistics.explored} explored, "
+            f"{statistics.partially_explored} partially explored and "
+            f"{statistics.unexplored} unexplored callees "
+            f"(hit rate {statistics.hit_rate():.2%})"
+        )
+        scoped_metrics_logger.add_data(
+            "explored_callee_hit_rate", f"{statistics.hit_rate():.3}"
+        )
 
         if self.summary.store_unused_models:
             for (
@@ -162,8 +232,87 @@ class ModelGenerator(PipelineStep[IssuesAndFrames, TraceGraph]):
                     for run in runs:
                         self._generate_trace_frame(trace_kind, run, entry)
 
+        self.graph.compact()
         return self.graph, self.summary
 
+    def _generate_issues_in_parallel(
+        self,
+        runs: List[Run],
+        issues: Iterable[ParseIssueTuple],
+        callables: Dict[str, int],
+    ) -> None:
+        if "fork" not in multiprocessing.get_all_start_methods():
+            log.warning("Cannot fork workers, generating issues in the main process")
+            for entry in issues:
+                for run in runs:
+                    self._generate_issue(run, entry, callables)
+            return
+
+        # Issues of a callable usually share their traces, so they are generated
+        # by the same worker.
+        partitions: List[List[ParseIssueTuple]] = [[] for _ in range(self.processes)]
+        for entry in issues:
+            index = zlib.crc32(entry.callable.encode()) % self.processes
+            partitions[index].append(entry)
+        partitions = [partition for partition in partitions if partition]
+        log.info(
+            f"Generating issues in {len(partitions)} partitions with "
+            f"{self.processes} processes"
+        )
+
+        # Workers are forked, so that they inherit the parsed frames.
+        global _worker_state
+        _worker_state = (self, runs, callables, partitions)
+        try:
+            with multiprocessing.get_context("fork").Pool(
+                processes=min(self.processes, len(partitions))
+            ) as pool:
+                results = pool.map(_generate_partition, range(len(partitions)))
+        finally:
+            _worker_state = None
+
+        # Merged in partition order, so that the graph does not depend on
+        # scheduling.
+        missing_traces = none_throws(self.summary.missing_traces)
+        big_tito = none_throws(self.summary.big_tito)
+        for (
+            graph,
+            partition_missing_traces,
+            partition_big_tito,
+            partition_statistics,
+        ) in results:
+            self.graph.merge(graph, [run.id for run in runs])
+            for kind, keys in partition_missing_traces.items():
+                missing_traces[kind].update(keys)
+            big_tito.update(partition_big_tito)
+            self.exploration_statistics.add(partition_statistics)
+        # Callees of the workers are not explored in this process.
+        self.explored_callees = {}
+        self.generated_annotation_traces = set()
+
+    def _generate_issues(
+        self,
+        runs: List[Run],
+        issues: List[ParseIssueTuple],
+        callables: Dict[str, int],
+    ) -> PartitionResult:
+        """Generates the issues of a partition into a new graph."""
+        self.graph = TraceGraph()
+        self.explored_callees = {}
+        self.exploration_statistics = ExplorationStatistics()
+        self.generated_annotation_traces = set()
+        self.summary.missing_traces = defaultdict(set)
+        self.summary.big_tito = set()
+        for entry in issues:
+            for run in runs:
+                self._generate_issue(run, entry, callables)
+        return (
+            self.graph,
+            dict(none_throws(self.summary.missing_traces)),
+            none_throws(self.summary.big_tito),
+            self.exploration_statistics,
+        )
+
     def _compute_callables_count(
         self, issues: Iterable[ParseIssueTuple]
     ) -> Dict[str, int]:
@@ -386,51 +535,57 @@ class ModelGenerator(PipelineStep[IssuesAndFrames, TraceGraph]):
             annotations=callinfo.annotations,
             features=callinfo.features,
         )
-        caller_leaf_ids = set()
-        callee_leaf_ids = set()
-        for leaf_map in call_tf.leaf_mapping:
-            caller_leaf_ids.add(leaf_map.caller_leaf)
-            callee_leaf_ids.add(leaf_map.callee_leaf)
-        self._generate_transitive_trace_frames(run, call_tf, callee_leaf_ids)
+        caller_leaf_ids = {leaf_map.caller_leaf for leaf_map in call_tf.leaf_mapping}
+        self._generate_transitive_trace_frames(
+            run, call_tf, self.graph.leaf_mapping_masks(call_tf).callee_kinds
+        )
         return call_tf, caller_leaf_ids
 
     def _generate_transitive_trace_frames(
-        self, run: Run, start_frame: TraceFrame, outgoing_leaf_ids: Set[int]
-    ) -> List[TraceFrame]:
+        self, run: Run, start_frame: TraceFrame, outgoing_leaves: int
+    ) -> None:
         """Generates all trace frames reachable from start_frame, provided they contain
-        a leaf_id from the initial set of leaf_ids. Also applies tito transforms
-        in reverse, meaning it strips off local transforms from leaf kinds when
-        necessary.
-
-        Returns the TraceFrames associated this starting frame (generated or found existing)
+        a leaf kind from the initial mask of leaf kinds (see
+        `TraceGraph.leaf_kind_bit`). Also applies tito transforms in reverse,
+        meaning it strips off local transforms from leaf kinds when necessary.
         """
-        returned_frames = []
         if self.skip_traces:
-            return returned_frames
+            return
 
         kind = start_frame.kind
-        queue: List[Tuple[Union[str, TraceKind], TraceFrame, Set[int]]] = [
-            (kind, start_frame, outgoing_leaf_ids)
+        queue: List[Tuple[Union[str, TraceKind], TraceFrame, int]] = [
+            (kind, start_frame, outgoing_leaves)
         ]
         prev_queue = self._transitive_queue
         self._transitive_queue = queue
         try:
             while len(queue) > 0:
                 item_kind, frame, outgoing_leaves = queue.pop()
-                if len(outgoing_leaves) == 0:
+                if outgoing_leaves == 0:
                     continue
 
-                returned_frames.append(frame)
-
-                frame_id = frame.id.local_id
-                if frame_id in self.visited_frames:
-                    outgoing_leaves = outgoing_leaves - self.visited_frames[frame_id]
-                    if len(outgoing_leaves) == 0:
-                        continue
-                    else:
-                        self.visited_frames[frame_id].update(outgoing_leaves)
+                # Frames are generated for each run, so callees are explored
+                # for each run as well.
+                # pyre-fixme[6]: Expected `TraceKind` but got `str`.
+                callee_key: Tuple[TraceKind, int, int, str] = (
+                    item_kind,
+                    run.id.local_id,
+                    frame.callee_id.local_id,
+                    frame.callee_port,
+                )
+                explored_leaves = self.explored_callees.get(callee_key)
+                if explored_leaves is None:
+                    self.exploration_statistics.unexplored += 1
+                    self.explored_callees[callee_key] = outgoing_leaves
                 else:
-                    self.visited_frames[frame_id] = outgoing_leaves
+                    outgoing_leaves &= ~explored_leaves
+                    if outgoing_leaves == 0:
+                        self.exploration_statistics.explored += 1
+                        continue
+                    self.exploration_statistics.partially_explored += 1
+                    self.explored_callees[callee_key] = (
+                        explored_leaves | outgoing_leaves
+                    )
 
                 next_frames = self._get_or_populate_trace_frames(
                     # pyre-fixme[6]: Expected `TraceKind` for 1st param but got `str`.
@@ -444,16 +599,13 @@ class ModelGenerator(PipelineStep[IssuesAndFrames, TraceGraph]):
                         (
                             item_kind,
                             frame,
-                            self.graph.compute_next_leaf_kinds(
-                                outgoing_leaves, frame.leaf_mapping
-                            ),
+                            self.graph.next_leaf_kinds_mask(outgoing_leaves, frame),
                         )
                         for frame in next_frames
                     ]
                 )
         finally:
             self._transitive_queue = prev_queue
-        return returned_frames
 
     def _get_or_populate_trace_frames(
         self, kind: TraceKind, run: Run, caller_id: DBID, caller_port: str
@@ -717,11 +869,11 @@ class ModelGenerator(PipelineStep[IssuesAndFrames, TraceGraph]):
             features,
         )
         if is_new:
-            leaf_ids = {leaf_map.callee_leaf for leaf_map in call_tf.leaf_mapping}
+            leaves = self.graph.leaf_mapping_masks(call_tf).callee_kinds
             if self._transitive_queue is not None:
-                self._transitive_queue.append((trace_kind, call_tf, leaf_ids))
+                self._transitive_queue.append((trace_kind, call_tf, leaves))
             else:
-                self._generate_transitive_trace_frames(run, call_tf, leaf_ids)
+                self._generate_transitive_trace_frames(run, call_tf, leaves)
         return call_tf
 
     def _get_shared_text(self, kind: SharedTextKind, name: str) -> SharedText:
@@ -7,59 +7,342 @@
 
 import logging
 import multiprocessing
-from typing import Iterable, List, Set, Tuple, Type, Union
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from multiprocessing.pool import AsyncResult
+from typing import (
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
 
 from ..analysis_output import AnalysisOutput, Metadata
+from ..compression import is_compressed, open_text
+from ..memory_budget import MemoryBudget
 from ..operating_system import get_rss_in_gb
-from . import ParseConditionTuple, ParseIssueTuple
-from .base_parser import BaseParser
+from . import FramesStore, ParseConditionTuple, ParseIssueTuple
+from .base_parser import BaseParser, FileRange, IssueFilter, split_file_ranges
+from .incremental_ingest import IncrementalIngest
+from .parse_batch import (
+    DEFAULT_MIN_SHARED_MEMORY_BYTES,
+    encode_entries,
+    Payload,
+    release,
+    share,
+    unpack,
+)
+from .parse_cache import ParseCache
 
 log: logging.Logger = logging.getLogger("sapp")
 logging.basicConfig(format="%(asctime)s [%(levelname)s] %(message)s")
 
 
+# Files larger than this are split into line-aligned byte ranges that are parsed
+# concurrently, if the parser supports it.
+DEFAULT_MAX_RANGE_BYTES: int = 256 * 1024 * 1024
+
+
+class ParseResult(NamedTuple):
+    file_range: FileRange
+    worker_id: int
+    parse_seconds: float
+    payload: Payload
+    cached: bool
+
+
+@dataclass
+class WorkerStatistics:
+    ranges: int = 0
+    cached_ranges: int = 0
+    entries: int = 0
+    parse_seconds: float = 0.0
+
+
+# Set in every worker by `initialize_worker`, so that a large filter is sent to
+# each worker once rather than with every range.
+_issue_filter: Optional[IssueFilter] = None
+
+
+def initialize_worker(issue_filter: Optional[IssueFilter]) -> None:
+    global _issue_filter
+    _issue_filter = issue_filter
+
+
+def _filter_issues(
+    entries: Iterable[Union[ParseConditionTuple, ParseIssueTuple]],
+    issue_filter: IssueFilter,
+) -> Iterable[Union[ParseConditionTuple, ParseIssueTuple]]:
+    for entry in entries:
+        if not isinstance(entry, ParseIssueTuple) or issue_filter.keeps_issue(entry):
+            yield entry
+
+
 # We are going to call this per process, so we need to pass in and return
 # serializable data. And as a single arg, as far as I can tell. Which is why the
 # args type looks so silly.
 def parse(
-    args: Tuple[Tuple[Type[BaseParser], Set[str], Metadata], str],
-) -> List[Union[ParseConditionTuple, ParseIssueTuple]]:
-    (base_parser, repo_dirs, metadata), path = args
+    args: Tuple[
+        Tuple[Type[BaseParser], Set[str], Metadata, Optional[str], Optional[str]],
+        FileRange,
+    ],
+    min_shared_memory_bytes: Optional[int] = DEFAULT_MIN_SHARED_MEMORY_BYTES,
+) -> ParseResult:
+    parser_args, file_range = args
+    base_parser, repo_dirs, metadata, cache_directory, issue_filter_fingerprint = (
+        parser_args
+    )
+
+    start = time.perf_counter()
+    cache = ParseCache(cache_directory) if cache_directory else None
+    key = (
+        ParseCache.key(
+            base_parser, repo_dirs, metadata, file_range, issue_filter_fingerprint
+        )
+        if cache
+        else None
+    )
+    cached = cache.get(key) if cache and key else None
+    if cached is None:
+        parser = base_parser(repo_dirs, issue_filter=_issue_filter)
+        parser.initialize(metadata)
+        if base_parser.SUPPORTS_FILE_RANGES and not is_compressed(file_range.path):
+            entries = parser.parse_file_range(file_range)
+            data, entry_count = _encode(base_parser, entries)
+        else:
+            with open_text(file_range.path, threaded=True) as handle:
+                data, entry_count = _encode(base_parser, parser.parse_handle(handle))
+        if cache and key:
+            cache.put(key, data, entry_count)
+    else:
+        data, entry_count = cached
 
-    parser = base_parser(repo_dirs)
-    parser.initialize(metadata)
+    return ParseResult(
+        file_range=file_range,
+        worker_id=os.getpid(),
+        parse_seconds=time.perf_counter() - start,
+        payload=share(data, entry_count, min_shared_memory_bytes),
+        cached=cached is not None,
+    )
 
-    with open(path) as handle:
-        return list(parser.parse_handle(handle))
+
+def _encode(
+    base_parser: Type[BaseParser],
+    entries: Iterable[Union[ParseConditionTuple, ParseIssueTuple]],
+) -> Tuple[bytes, int]:
+    # Issues that the parser did not filter itself are filtered here, so that
+    # they are at least not sent to the main process.
+    if _issue_filter is not None and not base_parser.SUPPORTS_ISSUE_FILTER:
+        entries = _filter_issues(entries, _issue_filter)
+    # Entries are sent back as a compact batch rather than pickled one by one.
+    return encode_entries(entries)
+
+
+def _release_results(results: Iterable[AsyncResult[ParseResult]]) -> None:
+    for result in results:
+        try:
+            payload = result.get().payload
+        except Exception:
+            # The worker failed, so it did not share anything.
+            continue
+        release(payload)
 
 
 class ParallelParser(BaseParser):
-    def __init__(self, parser_class: Type[BaseParser], repo_dirs: Set[str]) -> None:
-        super().__init__(repo_dirs)
+    SUPPORTS_ISSUE_FILTER = True
+    # Entries are decoded with `string_pool`.
+    INTERNS_ENTRIES = True
+
+    def __init__(
+        self,
+        parser_class: Type[BaseParser],
+        repo_dirs: Set[str],
+        processes: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+        max_range_bytes: Optional[int] = DEFAULT_MAX_RANGE_BYTES,
+        frames_store: FramesStore = FramesStore.MEMORY,
+        parse_cache_directory: Optional[str] = None,
+        issue_filter: Optional[IssueFilter] = None,
+        incremental: Optional[IncrementalIngest] = None,
+        memory_budget: Optional[MemoryBudget] = None,
+    ) -> None:
+        """
+        processes: Number of worker processes. Defaults to the number of cores.
+        max_in_flight: Maximum number of ranges being parsed or waiting to be
+        consumed at any time. This bounds the memory held by parsed results that
+        have not been consumed yet. Defaults to twice the number of processes.
+        max_range_bytes: Approximate size of the byte ranges a single file is
+        split into, for parsers that support it. None disables splitting.
+        frames_store: Where the parsed pre/postconditions are kept.
+        parse_cache_directory: If set, parse results are cached in this
+        directory and reused for unchanged inputs.
+        issue_filter: Issues dropped by the workers.
+        incremental: If set, issues of the files that did not change since the
+        previous ingest are dropped, to be reused from the previous run.
+        memory_budget: If given, issues and frames consumed from the workers
+        are spilled to disk once the budget is nearly used up. Only the memory
+        of the main process counts towards the budget.
+        """
+        super().__init__(repo_dirs, frames_store, issue_filter, memory_budget)
         self.parser: Type[BaseParser] = parser_class
+        self.processes: int = processes or os.cpu_count() or 1
+        self.max_in_flight: int = max_in_flight or 2 * self.processes
+        self.max_range_bytes: Optional[int] = max_range_bytes
+        self.parse_cache_directory: Optional[str] = parse_cache_directory
+        self.incremental: Optional[IncrementalIngest] = incremental
+
+    def _file_ranges(self, input: AnalysisOutput) -> List[FileRange]:
+        file_ranges = []
+        for path in input.file_names():
+            # Compressed files cannot be split, since lines cannot be found
+            # without decompressing the file up to them.
+            if (
+                self.parser.SUPPORTS_FILE_RANGES
+                and self.max_range_bytes
+                and not is_compressed(path)
+            ):
+                file_ranges.extend(split_file_ranges(path, self.max_range_bytes))
+            else:
+                file_ranges.append(
+                    FileRange(path=path, start=0, end=os.path.getsize(path))
+                )
+        return file_ranges
 
     def parse(
         self, input: AnalysisOutput
     ) -> Iterable[Union[ParseConditionTuple, ParseIssueTuple]]:
-        log.info("Parsing in parallel")
-        files = list(input.file_names())
+        file_ranges = self._file_ranges(input)
+        incremental = self.incremental
+        if incremental is not None:
+            unchanged = sum(incremental.add_shard(path) for path in input.file_names())
+            log.info(f"Reusing the issues of {unchanged} unchanged files")
 
-        # Pair up the arguments with each file.
-        num_files = len(files)
-        args = zip([(self.parser, self.repo_dirs, input.metadata)] * num_files, files)
+        # Pair up the arguments with each range.
+        num_ranges = len(file_ranges)
+        args = zip(
+            [
+                (
+                    self.parser,
+                    self.repo_dirs,
+                    input.metadata,
+                    self.parse_cache_directory,
+                    self.issue_filter.fingerprint() if self.issue_filter else None,
+                )
+            ]
+            * num_ranges,
+            file_ranges,
+        )
         initial_rss = get_rss_in_gb()
         log.info(f"RSS before parsing: {initial_rss:.2f} GB")
 
-        with multiprocessing.get_context("spawn").Pool(processes=None) as pool:
-            # pyrefly: ignore [bad-argument-type]
-            for idx, f in enumerate(pool.imap_unordered(parse, args)):
-                if idx % 10 == 0:
-                    cur = idx + 1
-                    pct = (cur / num_files) * 100
-                    log.info(f"{cur}/{num_files} ({pct:.2f}) files parsed")
-                yield from f
+        statistics: Dict[int, WorkerStatistics] = {}
+        start = time.perf_counter()
+        if self.processes == 1:
+            # Not worth spawning a worker, e.g. when only using the parse cache.
+            log.info("Parsing in the main process")
+            initialize_worker(self.issue_filter)
+            try:
+                for idx, arg in enumerate(args):
+                    # Entries are not sent to another process.
+                    result = parse(arg, min_shared_memory_bytes=None)
+                    yield from self._consume(result, idx, num_ranges, statistics)
+            finally:
+                initialize_worker(None)
+        else:
+            log.info(f"Parsing in parallel with {self.processes} processes")
+            yield from self._parse_in_pool(args, num_ranges, statistics)
 
+        self._log_worker_statistics(statistics, time.perf_counter() - start)
         rss_after = get_rss_in_gb()
         log.info(
             f"RSS after parsing: {rss_after:.2f} GB, change: {rss_after - initial_rss:.2f} GB"
         )
+
+    def _parse_in_pool(
+        self,
+        args: Iterable[
+            Tuple[
+                Tuple[
+                    Type[BaseParser], Set[str], Metadata, Optional[str], Optional[str]
+                ],
+                FileRange,
+            ]
+        ],
+        num_ranges: int,
+        statistics: Dict[int, WorkerStatistics],
+    ) -> Iterable[Union[ParseConditionTuple, ParseIssueTuple]]:
+        with multiprocessing.get_context("spawn").Pool(
+            processes=self.processes,
+            initializer=initialize_worker,
+            initargs=(self.issue_filter,),
+        ) as pool:
+            # Results are consumed in submission order, so that the output does
+            # not depend on scheduling. At most `max_in_flight` ranges are
+            # submitted and not yet consumed at any point.
+            pending: Deque[AsyncResult[ParseResult]] = deque()
+            idx = 0
+            try:
+                for arg in args:
+                    if len(pending) >= self.max_in_flight:
+                        yield from self._consume(
+                            pending.popleft().get(), idx, num_ranges, statistics
+                        )
+                        idx += 1
+                    pending.append(pool.apply_async(parse, (arg,)))
+                while pending:
+                    yield from self._consume(
+                        pending.popleft().get(), idx, num_ranges, statistics
+                    )
+                    idx += 1
+            finally:
+                # When parsing stops early, results that were not consumed may
+                # hold shared memory, which outlives the workers.
+                _release_results(pending)
+
+    def _consume(
+        self,
+        result: ParseResult,
+        idx: int,
+        num_ranges: int,
+        statistics: Dict[int, WorkerStatistics],
+    ) -> Iterable[Union[ParseConditionTuple, ParseIssueTuple]]:
+        worker = statistics.setdefault(result.worker_id, WorkerStatistics())
+        worker.ranges += 1
+        worker.cached_ranges += result.cached
+        worker.entries += result.payload.entry_count
+        worker.parse_seconds += result.parse_seconds
+        if idx % 10 == 0:
+            cur = idx + 1
+            pct = (cur / num_ranges) * 100
+            log.info(f"{cur}/{num_ranges} ({pct:.2f}) ranges parsed")
+        with unpack(result.payload, self.string_pool) as batch:
+            entries: Iterable[Union[ParseConditionTuple, ParseIssueTuple]] = batch
+            incremental = self.incremental
+            if incremental is not None:
+                entries = incremental.filter_entries(result.file_range.path, entries)
+            yield from entries
+
+    def _log_worker_statistics(
+        self, statistics: Dict[int, WorkerStatistics], wall_seconds: float
+    ) -> None:
+        total_entries = sum(worker.entries for worker in statistics.values())
+        log.info(
+            f"Parsed {total_entries} entries in {wall_seconds:.2f}s "
+            f"({total_entries / max(wall_seconds, 1e-9):.0f} entries/s) "
+            f"using {len(statistics)} workers"
+        )
+        for worker_id, worker in sorted(statistics.items()):
+            log.info(
+                f"Worker {worker_id}: {worker.ranges} ranges "
+                f"({worker.cached_ranges} cached), {worker.entries} "
+                f"entries in {worker.parse_seconds:.2f}s "
+                f"({worker.entries / max(worker.parse_seconds, 1e-9):.0f} entries/s)"
+            )
@@ -0,0 +1,548 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+"""Compact transport of parsed entries between parser workers and the main
+process.
+
+Pickling `ParseConditionTuple`s and `ParseIssueTuple`s one by one is slow and
+produces large payloads, since every string and every `SourceLocation` is
+serialized separately. Instead, a worker encodes a batch of entries into plain
+tuples of integers, with all strings stored once in a string table, and
+serializes the result with `marshal`, in chunks. Large payloads are handed over
+through shared memory rather than through the pool's pipe. The main process
+decodes entries lazily, a chunk at a time, while iterating over the batch. When decoding
+with a `StringPool`, the string table is interned once per batch, so decoded
+entries share their strings with all other batches.
+"""
+
+import logging
+import marshal
+import struct
+from multiprocessing import shared_memory
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from ordered_set import OrderedSet
+
+from ..iterutil import split_every
+from . import (
+    ParseConditionTuple,
+    ParseIssueConditionTuple,
+    ParseIssueLeaf,
+    ParseIssueTuple,
+    ParseLeaf,
+    ParseTraceAnnotation,
+    ParseTraceAnnotationSubtrace,
+    ParseTraceFeature,
+    ParseType,
+    ParseTypeInterval,
+    SourceLocation,
+)
+from .string_pool import StringPool
+
+log: logging.Logger = logging.getLogger("sapp")
+
+# Bump whenever the encoding changes.
+FORMAT_VERSION = 2
+
+# Version, number of entries and offset of the string table. Entries are
+# marshalled in chunks of `CHUNK_SIZE`, each preceded by its length, so that
+# they are decoded a chunk at a time. The string table comes last, since it is
+# only complete once all entries are encoded.
+_HEADER = struct.Struct("<IQQ")
+_CHUNK_HEADER = struct.Struct("<I")
+CHUNK_SIZE = 1000
+
+# Payloads smaller than this are returned inline, since setting up a shared
+# memory segment is not worth it.
+DEFAULT_MIN_SHARED_MEMORY_BYTES: int = 1024 * 1024
+
+_ISSUE = 0
+_PRECONDITION = 1
+_POSTCONDITION = 2
+
+# Parsers use different containers for some fields. We preserve them so that
+# decoded entries compare equal to the original ones.
+_LIST = 0
+_SET = 1
+_FROZENSET = 2
+_ORDERED_SET = 3
+
+_NONE = -1
+
+Entry = Union[ParseConditionTuple, ParseIssueTuple]
+Encoded = Tuple[Any, ...]
+
+
+class _StringTable:
+    def __init__(self) -> None:
+        self.strings: List[str] = []
+        self._indices: Dict[str, int] = {}
+
+    def index(self, string: str) -> int:
+        index = self._indices.get(string)
+        if index is None:
+            index = len(self.strings)
+            self._indices[string] = index
+            self.strings.append(string)
+        return index
+
+    def optional_index(self, string: Optional[str]) -> int:
+        return _NONE if string is None else self.index(string)
+
+
+def _container_kind(container: Iterable[object]) -> int:
+    if isinstance(container, OrderedSet):
+        return _ORDERED_SET
+    if isinstance(container, frozenset):
+        return _FROZENSET
+    if isinstance(container, set):
+        return _SET
+    return _LIST
+
+
+def _container(kind: int, items: Iterable[Any]) -> Iterable[Any]:
+    if kind == _ORDERED_SET:
+        return OrderedSet(items)
+    if kind == _FROZENSET:
+        return frozenset(items)
+    if kind == _SET:
+        return set(items)
+    return list(items)
+
+
+class _Encoder:
+    def __init__(self) -> None:
+        self.table = _StringTable()
+
+    def entry(self, entry: Entry) -> Encoded:
+        if isinstance(entry, ParseIssueTuple):
+            return self.issue(entry)
+        if isinstance(entry, ParseConditionTuple):
+            return self.condition(entry)
+        raise TypeError(f"Unexpected parsed entry type: {type(entry)}")
+
+    def locations(self, locations: Iterable[SourceLocation]) -> Encoded:
+        flat = []
+        for location in locations:
+            flat.extend(location)
+        return (_container_kind(locations), tuple(flat))
+
+    def leaves(self, leaves: Iterable[ParseLeaf]) -> Encoded:
+        flat = []
+        for kind, distance in leaves:
+            flat.append(self.table.index(kind))
+            flat.append(distance)
+        return tuple(flat)
+
+    def issue_leaves(self, leaves: Iterable[ParseIssueLeaf]) -> Encoded:
+        flat = []
+        for callable, kind, distance in leaves:
+            flat.append(self.table.optional_index(callable))
+            flat.append(self.table.index(kind))
+            flat.append(distance)
+        return (_container_kind(leaves), tuple(flat))
+
+    def features(self, features: Iterable[ParseTraceFeature]) -> Encoded:
+        return tuple(
+            (self.table.index(feature.name), self.locations(feature.locations))
+            for feature in features
+        )
+
+    def type_interval(self, type_interval: Optional[ParseTypeInterval]) -> Any:
+        return None if type_interval is None else tuple(type_interval)
+
+    def subtrace(self, subtrace: ParseTraceAnnotationSubtrace) -> Encoded:
+        return (
+            self.table.index(subtrace.callee),
+            self.table.index(subtrace.port),
+            tuple(subtrace.position),
+            self.features(subtrace.features),
+            self.annotations(subtrace.annotations),
+        )
+
+    def annotations(self, annotations: Iterable[ParseTraceAnnotation]) -> Encoded:
+        return (
+            _container_kind(annotations),
+            tuple(
+                (
+                    tuple(annotation.location),
+                    self.table.index(annotation.kind),
+                    self.table.index(annotation.msg),
+                    self.table.optional_index(annotation.leaf_kind),
+                    annotation.leaf_depth,
+                    self.type_interval(annotation.type_interval),
+                    self.table.optional_index(annotation.link),
+                    self.table.optional_index(annotation.trace_key),
+                    self.locations(annotation.titos),
+                    tuple(self.subtrace(subtrace) for subtrace in annotation.subtraces),
+                )
+                for annotation in annotations
+            ),
+        )
+
+    def condition(self, condition: ParseConditionTuple) -> Encoded:
+        index = self.table.index
+        return (
+            (
+                _PRECONDITION
+                if condition.type == ParseType.PRECONDITION
+                else _POSTCONDITION
+            ),
+            index(condition.caller),
+            index(condition.caller_port),
+            index(condition.filename),
+            index(condition.callee),
+            index(condition.callee_port),
+            tuple(condition.callee_location),
+            self.leaves(condition.leaves),
+            self.type_interval(condition.type_interval),
+            self.features(condition.features),
+            self.locations(condition.titos),
+            self.annotations(condition.annotations),
+        )
+
+    def issue_condition(self, condition: ParseIssueConditionTuple) -> Encoded:
+        return (
+            self.table.index(condition.callee),
+            self.table.index(condition.port),
+            tuple(condition.location),
+            self.leaves(condition.leaves),
+            self.locations(condition.titos),
+            self.features(condition.features),
+            self.type_interval(condition.type_interval),
+            self.annotations(condition.annotations),
+            self.table.optional_index(condition.root_port),
+        )
+
+    def issue(self, issue: ParseIssueTuple) -> Encoded:
+        index = self.table.index
+        return (
+            _ISSUE,
+            issue.code,
+            index(issue.message),
+            index(issue.callable),
+            index(issue.handle),
+            index(issue.filename),
+            issue.line,
+            issue.start,
+            issue.end,
+            tuple(map(self.issue_condition, issue.preconditions)),
+            tuple(map(self.issue_condition, issue.postconditions)),
+            self.issue_leaves(issue.initial_sources),
+            self.issue_leaves(issue.final_sinks),
+            tuple(map(index, issue.features)),
+            _NONE if issue.callable_line is None else issue.callable_line,
+            issue.fix_info,
+        )
+
+
+class _Decoder:
+    def __init__(self, strings: List[str]) -> None:
+        self.strings = strings
+
+    def optional_string(self, index: int) -> Optional[str]:
+        return None if index == _NONE else self.strings[index]
+
+    def entry(self, encoded: Encoded) -> Entry:
+        if encoded[0] == _ISSUE:
+            return self.issue(encoded)
+        return self.condition(encoded)
+
+    def locations(self, encoded: Encoded) -> Iterable[SourceLocation]:
+        kind, flat = encoded
+        return _container(
+            kind,
+            (
+                SourceLocation(flat[i], flat[i + 1], flat[i + 2])
+                for i in range(0, len(flat), 3)
+            ),
+        )
+
+    def leaves(self, flat: Encoded) -> List[ParseLeaf]:
+        strings = self.strings
+        return [(strings[flat[i]], flat[i + 1]) for i in range(0, len(flat), 2)]
+
+    def issue_leaves(self, encoded: Encoded) -> Iterable[ParseIssueLeaf]:
+        kind, flat = encoded
+        return _container(
+            kind,
+            (
+                (
+                    self.optional_string(flat[i]),
+                    self.strings[flat[i + 1]],
+                    flat[i + 2],
+                )
+                for i in range(0, len(flat), 3)
+            ),
+        )
+
+    def features(self, encoded: Encoded) -> List[ParseTraceFeature]:
+        return [
+            ParseTraceFeature(
+                name=self.strings[name],
+                # pyre-ignore[6]: Feature locations are always lists.
+                locations=self.locations(locations),
+            )
+            for name, locations in encoded
+        ]
+
+    def type_interval(self, encoded: Any) -> Optional[ParseTypeInterval]:
+        return None if encoded is None else ParseTypeInterval(*encoded)
+
+    def subtrace(self, encoded: Encoded) -> ParseTraceAnnotationSubtrace:
+        callee, port, position, features, annotations = encoded
+        return ParseTraceAnnotationSubtrace(
+            callee=self.strings[callee],
+            port=self.strings[port],
+            position=SourceLocation(*position),
+            features=self.features(features),
+            # pyre-ignore[6]: Subtrace annotations are always lists.
+            annotations=self.annotations(annotations),
+        )
+
+    def annotations(self, encoded: Encoded) -> Iterable[ParseTraceAnnotation]:
+        kind, annotations = encoded
+        return _container(
+            kind,
+            (
+                ParseTraceAnnotation(
+                    location=SourceLocation(*location),
+                    kind=self.strings[annotation_kind],
+                    msg=self.strings[msg],
+                    leaf_kind=self.optional_string(leaf_kind),
+                    leaf_depth=leaf_depth,
+                    type_interval=self.type_interval(type_interval),
+                    link=self.optional_string(link),
+                    trace_key=self.optional_string(trace_key),
+                    # pyre-ignore[6]: Annotation titos are always lists.
+                    titos=self.locations(titos),
+                    subtraces=[self.subtrace(subtrace) for subtrace in subtraces],
+                )
+                for (
+                    location,
+                    annotation_kind,
+                    msg,
+                    leaf_kind,
+                    leaf_depth,
+                    type_interval,
+                    link,
+                    trace_key,
+                    titos,
+                    subtraces,
+                ) in annotations
+            ),
+        )
+
+    def condition(self, encoded: Encoded) -> ParseConditionTuple:
+        strings = self.strings
+        return ParseConditionTuple(
+            type=(
+                ParseType.PRECONDITION
+                if encoded[0] == _PRECONDITION
+                else ParseType.POSTCONDITION
+            ),
+            caller=strings[encoded[1]],
+            caller_port=strings[encoded[2]],
+            filename=strings[encoded[3]],
+            callee=strings[encoded[4]],
+            callee_port=strings[encoded[5]],
+            callee_location=SourceLocation(*encoded[6]),
+            leaves=self.leaves(encoded[7]),
+            type_interval=self.type_interval(encoded[8]),
+            features=self.features(encoded[9]),
+            titos=self.locations(encoded[10]),
+            annotations=self.annotations(encoded[11]),
+        )
+
+    def issue_condition(self, encoded: Encoded) -> ParseIssueConditionTuple:
+        return ParseIssueConditionTuple(
+            callee=self.strings[encoded[0]],
+            port=self.strings[encoded[1]],
+            location=SourceLocation(*encoded[2]),
+            leaves=self.leaves(encoded[3]),
+            titos=self.locations(encoded[4]),
+            features=self.features(encoded[5]),
+            type_interval=self.type_interval(encoded[6]),
+            annotations=self.annotations(encoded[7]),
+            root_port=self.optional_string(encoded[8]),
+        )
+
+    def issue(self, encoded: Encoded) -> ParseIssueTuple:
+        strings = self.strings
+        return ParseIssueTuple(
+            code=encoded[1],
+            message=strings[encoded[2]],
+            callable=strings[encoded[3]],
+            handle=strings[encoded[4]],
+            filename=strings[encoded[5]],
+            line=encoded[6],
+            start=encoded[7],
+            end=encoded[8],
+            preconditions=[self.issue_condition(c) for c in encoded[9]],
+            postconditions=[self.issue_condition(c) for c in encoded[10]],
+            initial_sources=self.issue_leaves(encoded[11]),
+            final_sinks=self.issue_leaves(encoded[12]),
+            features=[strings[feature] for feature in encoded[13]],
+            callable_line=None if encoded[14] == _NONE else encoded[14],
+            fix_info=encoded[15],
+        )
+
+
+class ParseBatch:
+    """Encoded entries that are decoded lazily on iteration, one chunk at a
+    time. Batches read from shared memory must be closed to release it."""
+
+    def __init__(
+        self,
+        data: Union[bytes, memoryview],
+        string_pool: Optional[StringPool] = None,
+        segment: Optional[shared_memory.SharedMemory] = None,
+    ) -> None:
+        version, entry_count, strings_offset = _HEADER.unpack_from(data)
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported parse batch version `{version}`")
+        strings = marshal.loads(data[strings_offset:])
+        if string_pool is not None:
+            strings = list(map(string_pool.intern, strings))
+        self._decoder = _Decoder(strings)
+        self._data = data
+        self._entry_count: int = entry_count
+        self._strings_offset: int = strings_offset
+        self._segment = segment
+
+    def __len__(self) -> int:
+        return self._entry_count
+
+    def __iter__(self) -> Iterator[Entry]:
+        decode = self._decoder.entry
+        offset = _HEADER.size
+        while offset < self._strings_offset:
+            (length,) = _CHUNK_HEADER.unpack_from(self._data, offset)
+            offset += _CHUNK_HEADER.size
+            chunk = marshal.loads(self._data[offset : offset + length])
+            offset += length
+            for encoded in chunk:
+                yield decode(encoded)
+
+    def close(self) -> None:
+        segment = self._segment
+        if segment is None:
+            return
+        self._segment = None
+        data = self._data
+        if isinstance(data, memoryview):
+            data.release()
+        segment.close()
+        segment.unlink()
+
+    def __enter__(self) -> "ParseBatch":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+
+def encode_entries(entries: Iterable[Entry]) -> Tuple[bytes, int]:
+    """Returns the serialized entries and the number of entries."""
+    encoder = _Encoder()
+    parts = [b""]
+    offset = _HEADER.size
+    entry_count = 0
+    for chunk in split_every(CHUNK_SIZE, entries):
+        data = marshal.dumps([encoder.entry(entry) for entry in chunk])
+        parts.append(_CHUNK_HEADER.pack(len(data)))
+        parts.append(data)
+        offset += _CHUNK_HEADER.size + len(data)
+        entry_count += len(chunk)
+    parts.append(marshal.dumps(encoder.table.strings))
+    parts[0] = _HEADER.pack(FORMAT_VERSION, entry_count, offset)
+    return b"".join(parts), entry_count
+
+
+def decode_entries(
+    data: Union[bytes, memoryview], string_pool: Optional[StringPool] = None
+) -> ParseBatch:
+    return ParseBatch(data, string_pool)
+
+
+class Payload(NamedTuple):
+    """Serialized entries, either inline or in a named shared memory segment
+    that the receiver is responsible for releasing."""
+
+    entry_count: int
+    size: int
+    data: Optional[bytes]
+    shared_memory_name: Optional[str]
+
+
+def pack(
+    entries: Iterable[Entry],
+    min_shared_memory_bytes: Optional[int] = DEFAULT_MIN_SHARED_MEMORY_BYTES,
+) -> Payload:
+    """Encodes the entries, placing them in shared memory if the payload is at
+    least `min_shared_memory_bytes` large. None disables shared memory."""
+    data, entry_count = encode_entries(entries)
+    return share(data, entry_count, min_shared_memory_bytes)
+
+
+def share(
+    data: bytes,
+    entry_count: int,
+    min_shared_memory_bytes: Optional[int] = DEFAULT_MIN_SHARED_MEMORY_BYTES,
+) -> Payload:
+    """Same as `pack`, for entries that are already encoded."""
+    size = len(data)
+    if min_shared_memory_bytes is None or size < max(min_shared_memory_bytes, 1):
+        return Payload(entry_count, size, data, None)
+
+    try:
+        segment = shared_memory.SharedMemory(create=True, size=size)
+    except OSError:
+        log.warning("Unable to allocate shared memory, sending entries inline")
+        return Payload(entry_count, size, data, None)
+    segment.buf[:size] = data
+    name = segment.name
+    segment.close()
+    return Payload(entry_count, size, None, name)
+
+
+def unpack(payload: Payload, string_pool: Optional[StringPool] = None) -> ParseBatch:
+    """Decodes a payload produced by `pack`. The shared memory of the payload is
+    released when the batch is closed."""
+    if payload.shared_memory_name is None:
+        # pyre-ignore[6]: Inline payloads always have data.
+        return decode_entries(payload.data, string_pool)
+
+    segment = shared_memory.SharedMemory(name=payload.shared_memory_name)
+    try:
+        return ParseBatch(segment.buf[: payload.size], string_pool, segment)
+    except BaseException:
+        segment.close()
+        segment.unlink()
+        raise
+
+
+def release(payload: Payload) -> None:
+    """Releases the shared memory of a payload that is not unpacked."""
+    if payload.shared_memory_name is None:
+        return
+    try:
+        segment = shared_memory.SharedMemory(name=payload.shared_memory_name)
+    except FileNotFoundError:
+        return
+    segment.close()
+    segment.unlink()
@@ -0,0 +1,115 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+"""Local cache of parse results, so that ingesting the same analysis output
+again does not decode the same JSON again.
+
+Results are cached per parsed byte range. The key covers the content of the
+range, the first line of its file (which holds the header of some formats),
+the parser class and its `CACHE_VERSION`, the encoding of parse batches, the
+repository directories, the analysis metadata and the issue filter. Values are
+zstd compressed parse batches.
+"""
+
+import dataclasses
+import json
+import logging
+import os
+import struct
+import tempfile
+from typing import Optional, Set, Tuple, Type
+
+import xxhash
+import zstandard
+
+from ..analysis_output import Metadata
+from . import parse_batch
+from .base_parser import BaseParser, FileRange
+
+log: logging.Logger = logging.getLogger("sapp")
+
+_READ_CHUNK_BYTES = 1024 * 1024
+
+# Number of entries in the cached batch.
+_HEADER = struct.Struct("<Q")
+
+
+def _canonical(value: object) -> object:
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    return repr(value)
+
+
+class ParseCache:
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(
+        parser_class: Type[BaseParser],
+        repo_dirs: Set[str],
+        metadata: Optional[Metadata],
+        file_range: FileRange,
+        issue_filter_fingerprint: Optional[str] = None,
+    ) -> str:
+        hash = xxhash.xxh3_128()
+        configuration = {
+            "parser": f"{parser_class.__module__}.{parser_class.__qualname__}",
+            "parser_version": parser_class.CACHE_VERSION,
+            "batch_version": parse_batch.FORMAT_VERSION,
+            "repo_dirs": sorted(repo_dirs),
+            "metadata": dataclasses.asdict(metadata) if metadata else None,
+            "issue_filter": issue_filter_fingerprint,
+        }
+        hash.update(
+            json.dumps(configuration, sort_keys=True, default=_canonical).encode()
+        )
+        with open(file_range.path, "rb") as handle:
+            hash.update(handle.readline())
+            handle.seek(file_range.start)
+            remaining = file_range.end - file_range.start
+            while remaining > 0:
+                chunk = handle.read(min(remaining, _READ_CHUNK_BYTES))
+                if not chunk:
+                    break
+                hash.update(chunk)
+                remaining -= len(chunk)
+        return hash.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.zst")
+
+    def get(self, key: str) -> Optional[Tuple[bytes, int]]:
+        """Returns the serialized parse batch and its number of entries."""
+        try:
+            with open(self._path(key), "rb") as handle:
+                contents = handle.read()
+        except FileNotFoundError:
+            return None
+        try:
+            (entry_count,) = _HEADER.unpack_from(contents)
+            data = zstandard.decompress(contents[_HEADER.size :])
+        except (struct.error, zstandard.ZstdError):
+            log.warning(f"Ignoring corrupted parse cache entry `{key}`")
+            return None
+        return data, entry_count
+
+    def put(self, key: str, data: bytes, entry_count: int) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first, so that concurrent readers never see
+        # partial entries.
+        descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(descriptor, "wb") as handle:
+                handle.write(_HEADER.pack(entry_count))
+                handle.write(zstandard.compress(data))
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
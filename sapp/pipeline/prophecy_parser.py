@@ -17,10 +17,10 @@ SAPP's ParseIssueTuple/ParseConditionTuple types for ingestion into the SAPP
 database.
 """
 
-import json
 import logging
 from typing import Any, Dict, IO, Iterable, Optional, Set, Union
 
+from .. import json_decoder
 from ..analysis_output import AnalysisOutput, Metadata
 from . import (
     parse_trace_feature,
@@ -32,7 +32,7 @@ from . import (
     ParseTypeInterval,
     SourceLocation,
 )
-from .base_parser import BaseParser
+from .base_parser import BaseParser, FileRange, read_line_range
 
 log: logging.Logger = logging.getLogger("sapp")
 
@@ -44,6 +44,9 @@ class Parser(BaseParser):
     Each line has kind="issue" with traces in Fontainebleau-compatible format.
     """
 
+    SUPPORTS_FILE_RANGES = True
+    SUPPORTS_ISSUE_FILTER = True
+
     def parse(
         self, input: AnalysisOutput
     ) -> Iterable[Union[ParseConditionTuple, ParseIssueTuple]]:
@@ -56,6 +59,17 @@ class Parser(BaseParser):
         for entry, _position in self._parse(handle):
             yield from self._parse_by_type(entry)
 
+    def parse_file_range(
+        self, file_range: FileRange
+    ) -> Iterable[Union[ParseConditionTuple, ParseIssueTuple]]:
+        with open(file_range.path, "rb") as handle:
+            for line in read_line_range(handle, file_range.start, file_range.end):
+                line = line.strip()
+                if line:
+                    entry = json_decoder.loads(line)
+                    if entry:
+                        yield from self._parse_by_type(entry)
+
     def _parse(
         self, handle: IO[str]
     ) -> Iterable[tuple[Dict[str, Any], Dict[str, Any]]]:
@@ -64,7 +78,7 @@ class Parser(BaseParser):
         while line:
             line = line.strip()
             if line:
-                entry = json.loads(line)
+                entry = json_decoder.loads(line)
                 if entry:
                     position = {"shard": 0, "offset": offset}
                     yield entry, position
@@ -84,6 +98,17 @@ class Parser(BaseParser):
         position = json["position"]
         callable_name = json["callable"]
         filename = self._extract_filename(json["filename"])
+        handle = self.compute_master_handle(
+            callable=callable_name,
+            line=position["line"],
+            start=position["start"],
+            end=position["end"],
+            code=code,
+        )
+        if not self._keeps_issue(
+            code, callable_name, handle, filename, position["line"]
+        ):
+            return
 
         # Parse traces following Fontainebleau's format
         preconditions, final_sinks = self._parse_issue_traces(
@@ -113,13 +138,7 @@ class Parser(BaseParser):
             start=position["start"],
             end=position["end"],
             callable=callable_name,
-            handle=self.compute_master_handle(
-                callable=callable_name,
-                line=position["line"],
-                start=position["start"],
-                end=position["end"],
-                code=code,
-            ),
+            handle=handle,
             message=json["description"],
             filename=filename,
             preconditions=preconditions,
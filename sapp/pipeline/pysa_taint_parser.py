@@ -8,29 +8,33 @@
 """Parse Pysa/Taint output for Zoncolan processing"""
 
 import functools
-import json
 import logging
+import re
 import sys
 from collections import defaultdict
 from typing import (
     Any,
     Dict,
     FrozenSet,
+    Generator,
     IO,
     Iterable,
     List,
     Literal,
     NamedTuple,
     Optional,
+    Pattern,
     Set,
     Tuple,
     Union,
 )
 
-from .. import errors
+from .. import errors, json_decoder
 from ..analysis_output import AnalysisOutput
+from ..compression import is_compressed, open_text
 from . import (
     flatten_features_to_parse_trace_feature,
+    FramesStore,
     ParseConditionTuple,
     ParseError,
     ParseIssueConditionTuple,
@@ -42,10 +46,33 @@ from . import (
     ParseTypeInterval,
     SourceLocation,
 )
-from .base_parser import BaseParser, EntryPosition, ParseType
+from .base_parser import (
+    BaseParser,
+    EntryPosition,
+    FileRange,
+    ParseType,
+    read_line_range,
+)
+from .lazy_frames import LazyFrames, ModelIndex
 
 log: logging.Logger = logging.getLogger("sapp")
 
+# Pysa writes the kind and callable of a model first, each section of the model
+# as a list of ports, and the taint of each port right after the port. This lets
+# lazy frames index models without decoding them. Lines written differently are
+# decoded.
+_STRING = rb'"(?:[^"\\]|\\.)*"'
+_MODEL_PREFIX: Pattern[bytes] = re.compile(
+    rb'\{\s*"kind"\s*:\s*"model"\s*,\s*"data"\s*:\s*\{\s*"callable"\s*:\s*('
+    + _STRING
+    + rb")"
+)
+_CALLER_PORT: Pattern[bytes] = re.compile(
+    rb'"port"\s*:\s*(' + _STRING + rb')\s*,\s*"taint"\s*:'
+)
+_PORT_SECTION: Pattern[bytes] = re.compile(rb'"(\w+)"\s*:\s*\[\s*\{\s*"port"')
+_MODEL_SECTIONS: Set[bytes] = {b"sources", b"sinks", b"tito"}
+
 
 class TraceFeature(NamedTuple):
     name: str
@@ -121,6 +148,10 @@ class Parser(BaseParser):
     for the Processor.
     """
 
+    SUPPORTS_FILE_RANGES = True
+    SUPPORTS_LAZY_FRAMES = True
+    SUPPORTS_ISSUE_FILTER = True
+
     _file_version: Optional[int] = None
 
     def parse(
@@ -136,6 +167,101 @@ class Parser(BaseParser):
         for entry, _ in self._parse_entries(handle):
             yield from self._parse_by_type(entry)
 
+    def parse_file_range(
+        self, file_range: FileRange
+    ) -> Iterable[Union[ParseConditionTuple, ParseIssueTuple]]:
+        with open(file_range.path, "rb") as handle:
+            # Every range validates the header, but only the first range
+            # contains it.
+            self._set_file_version(
+                self._parse_file_version_line(handle.readline().decode().strip())
+            )
+            start = max(file_range.start, handle.tell())
+            for line in read_line_range(handle, start, file_range.end):
+                entry = json_decoder.loads(line)
+                if entry:
+                    yield from self._parse_by_type(entry)
+
+    def parse_issues_and_collect_frames(
+        self, input: AnalysisOutput
+    ) -> Generator[ParseIssueTuple, None, BaseParser.ParsedFrames]:
+        if self.frames_store != FramesStore.LAZY:
+            return (yield from super().parse_issues_and_collect_frames(input))
+        paths = [] if input.file_handle is not None else list(input.file_names())
+        if input.file_handle is not None or any(map(is_compressed, paths)):
+            log.warning(
+                "Lazy frames need uncompressed files on disk, "
+                "parsing all frames instead"
+            )
+            return (yield from super().parse_issues_and_collect_frames(input))
+
+        # Only issues are parsed upfront. For models, we only record where they
+        # are, and parse them once the model generator looks them up.
+        positions: Dict[Tuple[str, str], List[Tuple[int, int]]] = defaultdict(list)
+        for path_index, path in enumerate(paths):
+            with open(path, "rb") as handle:
+                self._set_file_version(
+                    self._parse_file_version_line(handle.readline().decode().strip())
+                )
+                offset = handle.tell()
+                for line in handle:
+                    model = self._scan_model(line)
+                    if model is None:
+                        entry = json_decoder.loads(line)
+                        if entry and entry["kind"] == "model":
+                            model = self._decoded_model(entry["data"])
+                        elif entry:
+                            yield from self._parse_by_type(entry)
+                    if model is not None:
+                        caller, ports = model
+                        for port in ports:
+                            positions[(caller, port)].append((path_index, offset))
+                    offset += len(line)
+        log.info(f"Indexed models of {len(positions)} callers and ports")
+
+        index = ModelIndex(
+            paths, positions, self._parse_model, string_pool=self.string_pool
+        )
+        return self.ParsedFrames(
+            preconditions=LazyFrames(index, ParseType.PRECONDITION),
+            postconditions=LazyFrames(index, ParseType.POSTCONDITION),
+        )
+
+    @staticmethod
+    def _scan_model(line: bytes) -> Optional[Tuple[str, Set[str]]]:
+        """Returns the callable and the caller ports of the sources and sinks
+        of a model, if the line is a model written as Pysa does."""
+        match = _MODEL_PREFIX.match(line)
+        if match is None:
+            return None
+        sections = list(_PORT_SECTION.finditer(line, match.end()))
+        port_count = 0
+        caller_ports: Set[str] = set()
+        for index, section in enumerate(sections):
+            if section.group(1) not in _MODEL_SECTIONS:
+                return None
+            end = (
+                sections[index + 1].start() if index + 1 < len(sections) else len(line)
+            )
+            ports = _CALLER_PORT.findall(line, section.start(), end)
+            port_count += len(ports)
+            # Titos do not become frames.
+            if section.group(1) != b"tito":
+                caller_ports.update(json_decoder.loads(port) for port in ports)
+        # Every port of sources, sinks and titos has a taint. Otherwise, a port
+        # was not found.
+        if port_count != line.count(b'"taint"'):
+            return None
+        return json_decoder.loads(match.group(1)), caller_ports
+
+    @staticmethod
+    def _decoded_model(data: Dict[str, Any]) -> Tuple[str, Set[str]]:
+        """Returns the callable and the caller ports of the sources and sinks
+        of a decoded model."""
+        return data["callable"], {
+            trace["port"] for trace in data.get("sources", []) + data.get("sinks", [])
+        }
+
     # Instead of returning the actual json from the AnalysisOutput, we return
     # location information so it can be retrieved later.
     def get_json_file_offsets(self, input: AnalysisOutput) -> Iterable[EntryPosition]:
@@ -152,9 +278,10 @@ class Parser(BaseParser):
 
     # Given a path and an offset, return the json in mostly-raw form.
     def get_json_from_file_offset(self, path: str, offset: int) -> Dict[str, Any]:
-        with open(path) as fh:
+        # Offsets in compressed files are positions in the decompressed stream.
+        with open_text(path) as fh:
             fh.seek(offset)
-            return json.loads(fh.readline())
+            return json_decoder.loads(fh.readline())
 
     def _parse_entries(
         self, handle: IO[str]
@@ -165,25 +292,29 @@ class Parser(BaseParser):
         { <error2> }
         ...
         """
-        file_version = self._parse_file_version(handle)
-        if file_version < 3:
-            raise ParseError(f"File version `{file_version}` is no longer supported.")
-        if file_version > 3:
-            raise ParseError(f"Unknown file version `{file_version}`.")
-        self._file_version = file_version
+        self._set_file_version(self._parse_file_version(handle))
 
         offset, line = handle.tell(), handle.readline()
         while line:
-            entry = json.loads(line)
+            entry = json_decoder.loads(line)
             if entry:
                 position = {"shard": 0, "offset": offset}
                 yield entry, position
             offset, line = handle.tell(), handle.readline()
 
+    def _set_file_version(self, file_version: int) -> None:
+        if file_version < 3:
+            raise ParseError(f"File version `{file_version}` is no longer supported.")
+        if file_version > 3:
+            raise ParseError(f"Unknown file version `{file_version}`.")
+        self._file_version = file_version
+
     def _parse_file_version(self, handle: IO[str]) -> int:
-        first_line = handle.readline().strip()
+        return self._parse_file_version_line(handle.readline().strip())
+
+    def _parse_file_version_line(self, first_line: str) -> int:
         try:
-            json_first_line = json.loads(first_line)
+            json_first_line = json_decoder.loads(first_line)
             version = json_first_line["file_version"]
         except ValueError as e:
             raise ParseError(
@@ -286,6 +417,14 @@ class Parser(BaseParser):
                 )
 
     def _parse_issue(self, json: Dict[str, Any]) -> Iterable[ParseIssueTuple]:
+        code = json["code"]
+        callable = json["callable"]
+        handle = self._generate_issue_master_handle(json)
+        filename = self._extract_filename(json["filename"])
+        location = self._parse_location(json)
+        if not self._keeps_issue(code, callable, handle, filename, location.line_no):
+            return
+
         (
             preconditions,
             final_sinks,
@@ -295,19 +434,18 @@ class Parser(BaseParser):
             initial_sources,
         ) = self._parse_issue_traces(json["traces"], "forward", "source")
 
-        location = self._parse_location(json)
         features = self._parse_features(json["features"])
 
         yield ParseIssueTuple(
-            code=json["code"],
+            code=code,
             line=location.line_no,
             callable_line=json["callable_line"],
             start=location.begin_column,
             end=location.end_column,
-            callable=json["callable"],
-            handle=self._generate_issue_master_handle(json),
+            callable=callable,
+            handle=handle,
             message=json["message"],
-            filename=self._extract_filename(json["filename"]),
+            filename=filename,
             preconditions=preconditions,
             final_sinks=final_sinks,
             postconditions=postconditions,
@@ -0,0 +1,156 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+"""Parsed issues and frames that move to disk once a `MemoryBudget` is nearly
+used up.
+
+Both start in memory, so that runs within the budget are as fast as without
+one. Once spilled, they stay on disk until they are dropped.
+"""
+
+import logging
+import os
+import tempfile
+from typing import Collection, IO, Iterable, Iterator, List, Optional, Tuple
+
+from ..memory_budget import MemoryBudget
+from ..memory_report import collection_usage, MemoryUsage
+from . import Frames, FramesBuilder, ParseConditionTuple, ParseIssueTuple
+from .disk_frames import DiskFramesBuilder
+from .parse_batch import decode_entries, encode_entries
+from .string_pool import StringPool
+
+log: logging.Logger = logging.getLogger("sapp")
+
+# Issues written to disk at once.
+SPILL_BATCH_SIZE = 10_000
+
+
+class SpillingFramesBuilder(FramesBuilder):
+    def __init__(
+        self,
+        budget: MemoryBudget,
+        string_pool: Optional[StringPool] = None,
+        interned: bool = False,
+    ) -> None:
+        super().__init__(string_pool, interned)
+        self._budget = budget
+        self._disk: Optional[DiskFramesBuilder] = None
+
+    def add(self, frame: ParseConditionTuple) -> None:
+        disk = self._disk
+        if disk is None and self._budget.should_spill():
+            disk = self._spill()
+        if disk is not None:
+            disk.add(frame)
+        else:
+            super().add(frame)
+
+    def _spill(self) -> DiskFramesBuilder:
+        disk = DiskFramesBuilder(self._budget.directory, self._string_pool)
+        count = 0
+        for frames in self._frames.values():
+            for frame in frames:
+                disk.add(frame)
+                count += 1
+        self._frames.clear()
+        log.info(f"Spilled {count} frames to disk")
+        self._disk = disk
+        return disk
+
+    def build(self) -> Frames:
+        disk = self._disk
+        if disk is not None:
+            return disk.build()
+        return super().build()
+
+
+class SpillingIssues:
+    """Parsed issues, in the order they were added. Iterating over spilled
+    issues reads them back from disk."""
+
+    def __init__(
+        self, budget: MemoryBudget, string_pool: Optional[StringPool] = None
+    ) -> None:
+        self._budget = budget
+        self._string_pool = string_pool
+        self._issues: List[ParseIssueTuple] = []
+        self._file: Optional[IO[bytes]] = None
+        # Offset and length of each batch written to the file.
+        self._batches: List[Tuple[int, int]] = []
+        self._spilled_count = 0
+
+    def append(self, issue: ParseIssueTuple) -> None:
+        self._issues.append(issue)
+        if self._file is None:
+            if self._budget.should_spill():
+                self._spill()
+        elif len(self._issues) >= SPILL_BATCH_SIZE:
+            self._spill()
+
+    def extend(self, issues: Iterable[ParseIssueTuple]) -> None:
+        for issue in issues:
+            self.append(issue)
+
+    def _spill(self) -> None:
+        file = self._file
+        if file is None:
+            file = self._file = tempfile.TemporaryFile(
+                prefix="sapp-issues-", dir=self._budget.directory
+            )
+        for start in range(0, len(self._issues), SPILL_BATCH_SIZE):
+            data, count = encode_entries(self._issues[start : start + SPILL_BATCH_SIZE])
+            self._batches.append((file.tell(), len(data)))
+            file.write(data)
+            self._spilled_count += count
+        file.flush()
+        self._issues = []
+
+    def __len__(self) -> int:
+        return self._spilled_count + len(self._issues)
+
+    def __iter__(self) -> Iterator[ParseIssueTuple]:
+        file = self._file
+        if file is not None:
+            for offset, length in self._batches:
+                data = os.pread(file.fileno(), length, offset)
+                # pyre-ignore[7]: Only issues are written to the file.
+                yield from decode_entries(data, self._string_pool)
+        yield from self._issues
+
+    def dispose(self) -> None:
+        """Removes the spilled issues."""
+        file = self._file
+        if file is not None:
+            file.close()
+        self._file = None
+        self._batches = []
+        self._spilled_count = 0
+        self._issues = []
+
+    def replace(self, issues: Iterable[ParseIssueTuple]) -> "SpillingIssues":
+        """Collects issues derived from these ones under the same budget, then
+        removes these ones."""
+        replaced = SpillingIssues(self._budget, self._string_pool)
+        replaced.extend(issues)
+        self.dispose()
+        return replaced
+
+    def memory_usage(self) -> MemoryUsage:
+        """Approximate memory used by the issues kept in memory."""
+        return collection_usage(self._issues)
+
+
+def replace_issues(
+    issues: Collection[ParseIssueTuple], replacements: Iterable[ParseIssueTuple]
+) -> Collection[ParseIssueTuple]:
+    """Collects issues derived from `issues`, e.g. filtered ones, the way
+    `issues` are kept. Issues under a memory budget stay under it and the
+    originals are removed, other issues are collected into a list."""
+    if not isinstance(issues, SpillingIssues):
+        return list(replacements)
+    return issues.replace(replacements)
@@ -0,0 +1,137 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+"""CPU and allocation profiles of pipeline steps.
+
+While a step runs, a thread samples the stacks of the other threads of the
+process at a fixed interval. The samples of each step are written in the
+collapsed stack format read by flame graph tools, one line per distinct stack:
+`thread;outermost frame;...;innermost frame count`. Allocations are traced with
+`tracemalloc`, and the lines that allocated the most memory that is still held
+after the step are written next to the samples.
+
+Worker processes, like those generating traces in parallel, are not profiled.
+"""
+
+import contextlib
+import logging
+import os
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from types import FrameType
+from typing import Dict, Generator, List, Optional
+
+log: logging.Logger = logging.getLogger("sapp")
+
+DEFAULT_INTERVAL = 0.005
+DEFAULT_TOP_ALLOCATIONS = 50
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+
+
+def _collapsed_stack(thread_name: str, frame: Optional[FrameType]) -> str:
+    names: List[str] = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    names.append(thread_name)
+    names.reverse()
+    return ";".join(names)
+
+
+class _Sampler(threading.Thread):
+    def __init__(self, interval: float) -> None:
+        super().__init__(name="sapp profiler", daemon=True)
+        self._interval = interval
+        self._stopped = threading.Event()
+        self.samples: Counter[str] = Counter()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self._interval):
+            thread_names = {
+                thread.ident: thread.name for thread in threading.enumerate()
+            }
+            for ident, frame in sys._current_frames().items():
+                if ident == self.ident:
+                    continue
+                self.samples[
+                    _collapsed_stack(thread_names.get(ident, str(ident)), frame)
+                ] += 1
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+
+class StepProfiler:
+    def __init__(
+        self,
+        directory: str,
+        interval: float = DEFAULT_INTERVAL,
+        top_allocations: int = DEFAULT_TOP_ALLOCATIONS,
+    ) -> None:
+        """
+        directory: Where the profiles of each step are written.
+        interval: Seconds between two samples of the stacks.
+        top_allocations: Number of allocation sites written for each step.
+        """
+        self.directory = directory
+        self.interval = interval
+        self.top_allocations = top_allocations
+        # Paths of the profiles written so far, by step.
+        self.profiles: Dict[str, List[str]] = {}
+
+    @contextlib.contextmanager
+    def profile(self, index: int, step_name: str) -> Generator[None, None, None]:
+        """Profiles the code run in the context as the step at the index of a
+        pipeline."""
+        os.makedirs(self.directory, exist_ok=True)
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        sampler = _Sampler(self.interval)
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop()
+            after = tracemalloc.take_snapshot()
+            if started_tracing:
+                tracemalloc.stop()
+            prefix = os.path.join(self.directory, f"{index + 1:02d}-{step_name}")
+            self.profiles[step_name] = [
+                self._write_samples(f"{prefix}.collapsed", sampler.samples),
+                self._write_allocations(f"{prefix}.allocations", before, after),
+            ]
+            log.info("Profiles of %s written to %s.*", step_name, prefix)
+
+    def _write_samples(self, path: str, samples: Counter[str]) -> str:
+        with open(path, "w") as file:
+            for stack, count in sorted(samples.items()):
+                file.write(f"{stack} {count}\n")
+        return path
+
+    def _write_allocations(
+        self, path: str, before: tracemalloc.Snapshot, after: tracemalloc.Snapshot
+    ) -> str:
+        # Allocations of the profiler itself are not interesting.
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        differences = after.filter_traces(filters).compare_to(
+            before.filter_traces(filters), "lineno"
+        )
+        total = sum(difference.size_diff for difference in differences)
+        with open(path, "w") as file:
+            file.write(f"Total: {total / 2**20:+.1f} MB\n")
+            for difference in differences[: self.top_allocations]:
+                file.write(f"{difference}\n")
+        return path
@@ -0,0 +1,41 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+"""Interning of the strings seen while ingesting an analysis output.
+
+Callables, ports, filenames, leaf kinds and features are repeated many times
+across parsed entries. Parsers, frame stores and the trace graph map these
+strings through a single `StringPool`, so that each distinct string is stored
+once and equal strings are the same object. Lookups of pooled strings are cheap,
+since Python caches the hash of a string and compares identical objects without
+looking at their contents.
+"""
+
+from typing import Dict
+
+from ..memory_report import MemoryUsage, strings_usage
+
+
+class StringPool:
+    """Hands out a canonical instance for each distinct string."""
+
+    def __init__(self) -> None:
+        # Each string maps to itself, its canonical instance.
+        self._strings: Dict[str, str] = {}
+
+    def intern(self, string: str) -> str:
+        """Returns the canonical instance of the string."""
+        return self._strings.setdefault(string, string)
+
+    def __len__(self) -> int:
+        return len(self._strings)
+
+    def __contains__(self, string: object) -> bool:
+        return string in self._strings
+
+    def memory_usage(self) -> MemoryUsage:
+        return strings_usage(self._strings)
@@ -0,0 +1,129 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import os
+import tempfile
+from typing import Optional
+from unittest import TestCase
+from unittest.mock import patch
+
+from ...analysis_output import AnalysisOutput, Metadata
+from ...db import DB, DBType
+from ...models import PrimaryKeyGenerator, Run
+from .. import Pipeline, PipelineBuilder, Summary
+from ..checkpoint import Checkpoints
+from ..create_database import CreateDatabase
+from ..database_saver import DatabaseSaver
+from ..model_generator import ModelGenerator
+from ..pysa_taint_parser import Parser
+from ..trim_trace_graph import TrimTraceGraph
+from .incremental_ingest_test import _frame_count, _traces
+from .pysa_output import pysa_issue, pysa_model, write_pysa_output
+
+
+def _pipeline(
+    database: DB, checkpoints: Optional[Checkpoints], resume_from: Optional[str] = None
+) -> Pipeline:
+    return (
+        PipelineBuilder()
+        .append(Parser())
+        .append(CreateDatabase(database))
+        .append(ModelGenerator())
+        .append(TrimTraceGraph())
+        .append(DatabaseSaver(database, Run, PrimaryKeyGenerator()))
+        .build(checkpoints, resume_from)
+    )
+
+
+class CheckpointTest(TestCase):
+    def test_resume(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            database = DB(DBType.SQLITE, os.path.join(directory, "sapp.db"))
+            checkpoints = Checkpoints(os.path.join(directory, "checkpoints"))
+            input = AnalysisOutput(
+                filename_specs=[
+                    write_pysa_output(
+                        directory,
+                        "taint-output.json",
+                        [
+                            pysa_issue("module.f", "module.g"),
+                            pysa_model("module.g", "module.h"),
+                        ],
+                    )
+                ],
+                metadata=Metadata(),
+            )
+
+            with patch.object(DatabaseSaver, "run", side_effect=OSError("Disk full")):
+                with self.assertRaises(OSError):
+                    _pipeline(database, checkpoints).run(input, Summary())
+            # CreateDatabase passes its input on unchanged.
+            self.assertEqual(
+                sorted(os.listdir(checkpoints.directory)),
+                [
+                    "01-Parser.pickle",
+                    "03-ModelGenerator.pickle",
+                    "04-TrimTraceGraph.pickle",
+                ],
+            )
+
+            # The parser would fail on this input if it was run again.
+            run_summaries, _ = _pipeline(
+                database, checkpoints, resume_from="DatabaseSaver"
+            ).run(None)
+            resumed_run = run_summaries[0].id
+            run_summaries, _ = _pipeline(database, None).run(input, Summary())
+            full_run = run_summaries[0].id
+            self.assertEqual(_frame_count(database, resumed_run), 3)
+            self.assertEqual(
+                _traces(database, resumed_run), _traces(database, full_run)
+            )
+
+            # Checkpoints are specific to the steps before them.
+            pipeline = (
+                PipelineBuilder()
+                .append(ModelGenerator())
+                .append(TrimTraceGraph())
+                .build(checkpoints, resume_from="TrimTraceGraph")
+            )
+            with self.assertRaisesRegex(ValueError, "No checkpoint of ModelGenerator"):
+                pipeline.run(None)
+
+    def test_selected_steps(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            database = DB(DBType.SQLITE, os.path.join(directory, "sapp.db"))
+            checkpoints = Checkpoints(
+                os.path.join(directory, "checkpoints"), ["Parser"]
+            )
+            input = AnalysisOutput(
+                filename_specs=[
+                    write_pysa_output(
+                        directory,
+                        "taint-output.json",
+                        [
+                            pysa_issue("module.f", "module.g"),
+                            pysa_model("module.g", "module.h"),
+                        ],
+                    )
+                ],
+                metadata=Metadata(),
+            )
+
+            with patch.object(DatabaseSaver, "run", side_effect=OSError("Disk full")):
+                with self.assertRaises(OSError):
+                    _pipeline(database, checkpoints).run(input, Summary())
+            self.assertEqual(os.listdir(checkpoints.directory), ["01-Parser.pickle"])
+
+            # Resuming runs the steps after the parser again.
+            with patch.object(
+                ModelGenerator, "run", autospec=True, side_effect=ModelGenerator.run
+            ) as model_generator:
+                run_summaries, _ = _pipeline(
+                    database, checkpoints, resume_from="DatabaseSaver"
+                ).run(None)
+            model_generator.assert_called_once()
+            self.assertEqual(_frame_count(database, run_summaries[0].id), 3)
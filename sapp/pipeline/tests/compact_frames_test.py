@@ -0,0 +1,112 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import tempfile
+from unittest import TestCase
+
+from ...analysis_output import AnalysisOutput, Metadata
+from .. import (
+    FramesBuilder,
+    FramesStore,
+    ParseConditionTuple,
+    ParseTraceFeature,
+    ParseType,
+    ParseTypeInterval,
+    SourceLocation,
+)
+from ..compact_frames import CompactCondition, CompactFrames, CompactFramesBuilder
+from ..pysa_taint_parser import Parser
+from .disk_frames_test import _frames
+from .parse_batch_test import _entries
+from .pysa_output import all_entries, write_pysa_outputs
+
+
+def _condition() -> ParseConditionTuple:
+    return ParseConditionTuple(
+        type=ParseType.POSTCONDITION,
+        caller="module.caller",
+        caller_port="result",
+        filename="module.py",
+        callee="module.callee",
+        callee_port="result",
+        callee_location=SourceLocation(100000, 2, 300),
+        leaves=[("UserControlled", 0), ("Cookies", 4)],
+        type_interval=ParseTypeInterval(
+            start=2**40, finish=7, preserves_type_context=True
+        ),
+        features=[
+            ParseTraceFeature("via:obscure", []),
+            ParseTraceFeature(
+                "via:format", [SourceLocation(4, 5, 6), SourceLocation(7, 8, 9)]
+            ),
+        ],
+        titos=[SourceLocation(10, 11, 12)],
+        annotations=[],
+    )
+
+
+class CompactFramesTest(TestCase):
+    def test_round_trip(self) -> None:
+        conditions = [_condition()] + [
+            entry for entry in _entries() if isinstance(entry, ParseConditionTuple)
+        ]
+        for condition in conditions:
+            self.assertEqual(CompactCondition(condition).unpack(), condition)
+
+    def test_matches_memory_frames(self) -> None:
+        memory_builder = FramesBuilder()
+        compact_builder = CompactFramesBuilder()
+        for frame in _frames():
+            memory_builder.add(frame)
+            compact_builder.add(frame)
+        memory = memory_builder.build()
+        compact = compact_builder.build()
+
+        self.assertEqual(compact.key_count(), memory.key_count())
+        self.assertEqual(compact.frame_count(), memory.frame_count())
+        self.assertEqual(list(compact.all_frames()), list(memory.all_frames()))
+        self.assertEqual(
+            compact.frames_from_caller("module.f3", "formal(1)"),
+            memory.frames_from_caller("module.f3", "formal(1)"),
+        )
+        self.assertEqual(compact.frames_from_caller("module.f3", "formal(2)"), [])
+
+    def test_cache(self) -> None:
+        builder = CompactFramesBuilder()
+        for frame in _frames():
+            builder.add(frame)
+        compact = builder.build()
+        assert isinstance(compact, CompactFrames)
+        compact._cache_size = 1
+
+        first = compact.frames_from_caller("module.f3", "formal(1)")
+        self.assertIs(compact.frames_from_caller("module.f3", "formal(1)"), first)
+        # Looking up another key evicts the first one.
+        compact.frames_from_caller("module.f2", "formal(1)")
+        second = compact.frames_from_caller("module.f3", "formal(1)")
+        self.assertIsNot(second, first)
+        self.assertEqual(second, first)
+
+    def test_unpackable_frames_are_kept(self) -> None:
+        frame = _condition()._replace(leaves=[("RCE", None)])
+        builder = CompactFramesBuilder()
+        builder.add(frame)
+        self.assertEqual(
+            builder.build().frames_from_caller("module.caller", "result"), [frame]
+        )
+
+    def test_parser(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            files = write_pysa_outputs(directory, files=2, callables=5)
+            analysis_output = AnalysisOutput(filename_specs=files, metadata=Metadata())
+
+            memory = Parser().parse_analysis_output(analysis_output)
+            compact = Parser(frames_store=FramesStore.COMPACT).parse_analysis_output(
+                analysis_output
+            )
+
+        self.assertEqual(all_entries(compact), all_entries(memory))
@@ -0,0 +1,113 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import os
+import tempfile
+from typing import List
+from unittest import TestCase
+from unittest.mock import patch
+
+from ...analysis_output import AnalysisOutput, Metadata
+from .. import (
+    FramesBuilder,
+    FramesStore,
+    ParseConditionTuple,
+    ParseType,
+    SourceLocation,
+)
+from ..disk_frames import DiskFramesBuilder
+from ..pysa_taint_parser import Parser
+from .pysa_output import all_entries, write_pysa_outputs
+
+
+def _frame(caller: str, caller_port: str, callee: str) -> ParseConditionTuple:
+    return ParseConditionTuple(
+        type=ParseType.PRECONDITION,
+        caller=caller,
+        caller_port=caller_port,
+        filename="module.py",
+        callee=callee,
+        callee_port="formal(x)",
+        callee_location=SourceLocation(1, 2, 3),
+        leaves=[("RCE", 1)],
+        type_interval=None,
+        features=[],
+        titos=[],
+        annotations=[],
+    )
+
+
+def _frames() -> List[ParseConditionTuple]:
+    return [
+        _frame(f"module.f{caller % 7}", f"formal({caller % 2})", f"module.g{caller}")
+        for caller in range(50)
+    ]
+
+
+class DiskFramesTest(TestCase):
+    def test_matches_memory_frames(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            memory_builder = FramesBuilder()
+            disk_builder = DiskFramesBuilder(directory)
+            for frame in _frames():
+                memory_builder.add(frame)
+                disk_builder.add(frame)
+            memory = memory_builder.build()
+            disk = disk_builder.build()
+
+            self.assertEqual(disk.key_count(), memory.key_count())
+            self.assertEqual(disk.frame_count(), memory.frame_count())
+            self.assertEqual(list(disk.all_frames()), _frames())
+            for caller in range(8):
+                for port in ("formal(0)", "formal(1)", "formal(2)"):
+                    self.assertEqual(
+                        disk.frames_from_caller(f"module.f{caller}", port),
+                        memory.frames_from_caller(f"module.f{caller}", port),
+                    )
+
+            disk.dispose()
+            self.assertEqual(os.listdir(directory), [])
+
+    def test_hash_collisions(self) -> None:
+        with patch(f"{DiskFramesBuilder.__module__}._key_hash", return_value=42):
+            builder = DiskFramesBuilder()
+            for frame in _frames():
+                builder.add(frame)
+            frames = builder.build()
+            self.assertEqual(
+                [
+                    frame.callee
+                    for frame in frames.frames_from_caller("module.f3", "formal(1)")
+                ],
+                ["module.g3", "module.g17", "module.g31", "module.g45"],
+            )
+            frames.dispose()
+
+    def test_empty(self) -> None:
+        frames = DiskFramesBuilder().build()
+        self.assertEqual(frames.frames_from_caller("module.f", "result"), [])
+        self.assertEqual(list(frames.all_frames()), [])
+        self.assertEqual(frames.key_count(), 0)
+        frames.dispose()
+
+    def test_parser(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            files = write_pysa_outputs(directory, files=2, callables=5)
+            analysis_output = AnalysisOutput(filename_specs=files, metadata=Metadata())
+
+            memory = Parser().parse_analysis_output(analysis_output)
+            disk = Parser(frames_store=FramesStore.DISK).parse_analysis_output(
+                analysis_output
+            )
+        self.addCleanup(disk.postconditions.dispose)
+        self.addCleanup(disk.preconditions.dispose)
+
+        self.assertEqual(all_entries(disk), all_entries(memory))
+        self.assertEqual(
+            disk.preconditions.frames_from_caller("module.g1_2", "formal(x)"),
+            memory.preconditions.frames_from_caller("module.g1_2", "formal(x)"),
+        )
@@ -0,0 +1,221 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import os
+import tempfile
+from typing import Dict, List, Optional, Set, Tuple
+from unittest import TestCase
+
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+
+from ...analysis_output import AnalysisOutput, Metadata
+from ...db import DB, DBType
+from ...models import (
+    Issue,
+    IssueInstance,
+    IssueInstanceTraceFrameAssoc,
+    PrimaryKeyGenerator,
+    Run,
+    SharedText,
+    TraceFrame,
+    TraceKind,
+)
+from .. import PipelineBuilder, Summary
+from ..create_database import CreateDatabase
+from ..database_saver import DatabaseSaver
+from ..incremental_ingest import (
+    IncrementalIngest,
+    ReuseUnchangedShards,
+    SaveShardManifest,
+    ShardManifest,
+)
+from ..model_generator import ModelGenerator
+from ..parallel_parser import ParallelParser
+from ..pysa_taint_parser import Parser
+from ..trim_trace_graph import TrimTraceGraph
+from .pysa_output import pysa_issue, pysa_model, write_pysa_output
+
+
+def _write_shards(directory: str, extra_issue: bool) -> List[str]:
+    # Traces cross shards: issues of `a` and `c` flow into models of `b`, whose
+    # `formal(x)` port the models call.
+    c_entries = [pysa_issue("module.fc", "module.ga")]
+    if extra_issue:
+        c_entries.append(pysa_issue("module.fc2", "module.gb"))
+    return [
+        write_pysa_output(
+            directory,
+            "a.json",
+            [
+                pysa_issue("module.fa", "module.ga"),
+                pysa_model(
+                    "module.ga",
+                    "module.gb",
+                    callee_port="formal(x)",
+                    position=(5, 6, 7),
+                ),
+            ],
+        ),
+        write_pysa_output(
+            directory,
+            "b.json",
+            [
+                pysa_issue("module.fb", "module.gb"),
+                pysa_model(
+                    "module.gb",
+                    "module.hb",
+                    callee_port="formal(x)",
+                    position=(5, 6, 7),
+                ),
+            ],
+        ),
+        write_pysa_output(directory, "c.json", c_entries),
+    ]
+
+
+def _ingest(
+    database: DB, files: List[str], incremental: Optional[IncrementalIngest]
+) -> int:
+    builder = (
+        PipelineBuilder()
+        .append(ParallelParser(Parser, set(), processes=1, incremental=incremental))
+        .append(CreateDatabase(database))
+        .append(ModelGenerator())
+    )
+    if incremental:
+        builder = builder.append(ReuseUnchangedShards(database, incremental))
+    builder = builder.append(TrimTraceGraph()).append(
+        DatabaseSaver(database, Run, PrimaryKeyGenerator())
+    )
+    if incremental:
+        builder = builder.append(SaveShardManifest(incremental))
+    run_summaries, _ = builder.build().run(
+        AnalysisOutput(filename_specs=files, metadata=Metadata()), Summary()
+    )
+    return run_summaries[0].id
+
+
+Frame = Tuple[TraceKind, str, str, str, str, str]
+
+
+def _traces(database: DB, run_id: int) -> Dict[str, Set[Frame]]:
+    """Frames reachable from the instances of each issue of a run."""
+    caller = aliased(SharedText)
+    callee = aliased(SharedText)
+    with database.make_session() as session:
+        frames = {
+            int(id): (kind, caller, port, callee, callee_port, str(location))
+            for id, kind, caller, port, callee, callee_port, location in (
+                session.execute(
+                    select(
+                        TraceFrame.id,
+                        TraceFrame.kind,
+                        caller.contents,
+                        TraceFrame.caller_port,
+                        callee.contents,
+                        TraceFrame.callee_port,
+                        TraceFrame.callee_location,
+                    )
+                    .join(caller, caller.id == TraceFrame.caller_id)
+                    .join(callee, callee.id == TraceFrame.callee_id)
+                    .where(TraceFrame.run_id == run_id)
+                )
+            )
+        }
+        first_frames = session.execute(
+            select(Issue.handle, IssueInstanceTraceFrameAssoc.trace_frame_id)
+            .join(IssueInstance, IssueInstance.issue_id == Issue.id)
+            .join(
+                IssueInstanceTraceFrameAssoc,
+                IssueInstanceTraceFrameAssoc.issue_instance_id == IssueInstance.id,
+            )
+            .where(IssueInstance.run_id == run_id)
+        ).all()
+
+    traces: Dict[str, Set[Frame]] = {}
+    for handle, frame_id in first_frames:
+        trace = traces.setdefault(handle, set())
+        queue = [frames[int(frame_id)]]
+        while queue:
+            frame = queue.pop()
+            if frame in trace:
+                continue
+            trace.add(frame)
+            queue.extend(
+                next
+                for next in frames.values()
+                if next[0] == frame[0] and next[1:3] == frame[3:5]
+            )
+    return traces
+
+
+def _frame_count(database: DB, run_id: int) -> int:
+    with database.make_session() as session:
+        return len(
+            session.execute(select(TraceFrame.id).where(TraceFrame.run_id == run_id))
+            .scalars()
+            .all()
+        )
+
+
+class IncrementalIngestTest(TestCase):
+    def test_matches_full_ingest(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            database = DB(DBType.SQLITE, os.path.join(directory, "sapp.db"))
+            manifest_path = os.path.join(directory, "manifest.json")
+
+            first_files = _write_shards(directory, extra_issue=False)
+            first_run = _ingest(database, first_files, IncrementalIngest(manifest_path))
+            self.assertEqual(ShardManifest.load(manifest_path).run_id, first_run)
+
+            second_files = _write_shards(directory, extra_issue=True)
+            incremental = IncrementalIngest(manifest_path)
+            second_run = _ingest(database, second_files, incremental)
+            self.assertEqual(incremental.unchanged_shards, {"a.json", "b.json"})
+            self.assertEqual(
+                incremental.reused_handles,
+                {"module.fa:5001", "module.fb:5001"},
+            )
+            self.assertEqual(ShardManifest.load(manifest_path).run_id, second_run)
+
+            full_run = _ingest(database, second_files, None)
+
+            incremental_traces = _traces(database, second_run)
+            self.assertEqual(len(incremental_traces), 4)
+            self.assertEqual(incremental_traces, _traces(database, full_run))
+            self.assertEqual(
+                _frame_count(database, second_run), _frame_count(database, full_run)
+            )
+            # The trace of a reused issue continues into the models of another
+            # shard.
+            self.assertIn(
+                (
+                    TraceKind.precondition,
+                    "module.gb",
+                    "formal(x)",
+                    "module.hb",
+                    "formal(x)",
+                    "5|7|7",
+                ),
+                incremental_traces["module.fa:5001"],
+            )
+
+    def test_without_previous_run(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            manifest = ShardManifest(shards={"a.json": "fingerprint"})
+            manifest_path = os.path.join(directory, "manifest.json")
+            manifest.write(manifest_path)
+
+            incremental = IncrementalIngest(manifest_path)
+            self.assertIsNone(incremental.previous_run_id)
+            # Nothing can be reused without a run.
+            self.assertEqual(incremental.previous_shards, {})
+            self.assertEqual(
+                IncrementalIngest(manifest_path, previous_run_id=1).previous_shards,
+                {"a.json": "fingerprint"},
+            )
@@ -0,0 +1,145 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import List
+from unittest import TestCase
+
+from ...analysis_output import AnalysisOutput, Metadata
+from ..base_parser import BaseParser, IssueFilter
+from ..linemap import convert, Linemap
+from ..parallel_parser import ParallelParser
+from ..pysa_taint_parser import Parser
+from .pysa_output import all_entries, write_pysa_outputs
+
+
+def handles(parser: BaseParser, analysis_output: AnalysisOutput) -> List[str]:
+    return [
+        issue.handle for issue in parser.parse_analysis_output(analysis_output).issues
+    ]
+
+
+class IssueFilterTest(TestCase):
+    def test_keeps(self) -> None:
+        issue_filter = IssueFilter(
+            codes_to_keep=frozenset({1}),
+            callables_to_keep=frozenset({"f"}),
+            handles_to_keep=frozenset({"a", "b"}),
+        )
+        self.assertTrue(issue_filter.keeps(1, "f", "a", "module.py", 1))
+        self.assertFalse(issue_filter.keeps(2, "f", "a", "module.py", 1))
+        self.assertFalse(issue_filter.keeps(1, "g", "a", "module.py", 1))
+        self.assertFalse(issue_filter.keeps(1, "f", "c", "module.py", 1))
+        self.assertTrue(IssueFilter().keeps(2, "g", "c", "module.py", 1))
+
+    def test_previous_handles(self) -> None:
+        old_handle = BaseParser.compute_diff_handle("module.py", 3, 1)
+        issue_filter = IssueFilter(
+            previous_handles=frozenset({"a", old_handle}),
+            linemap={"module.py": {"5": [3]}},
+        )
+        self.assertFalse(issue_filter.keeps(1, "f", "a", "module.py", 1))
+        # Moved from line 3 to line 5.
+        self.assertFalse(issue_filter.keeps(1, "f", "b", "module.py", 5))
+        self.assertTrue(issue_filter.keeps(1, "f", "b", "module.py", 4))
+        self.assertTrue(issue_filter.keeps(2, "f", "b", "module.py", 5))
+
+    def test_merge(self) -> None:
+        merged = IssueFilter(
+            codes_to_keep=frozenset({1, 2}), previous_handles=frozenset({"a"})
+        ).merge(
+            IssueFilter(
+                codes_to_keep=frozenset({2, 3}),
+                callables_to_keep=frozenset({"f"}),
+                previous_handles=frozenset({"b"}),
+            )
+        )
+        self.assertEqual(
+            merged,
+            IssueFilter(
+                codes_to_keep=frozenset({2}),
+                callables_to_keep=frozenset({"f"}),
+                previous_handles=frozenset({"a", "b"}),
+            ),
+        )
+        self.assertNotEqual(merged.fingerprint(), IssueFilter().fingerprint())
+
+    def test_parsers_filter_issues(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            files = write_pysa_outputs(directory, files=2, callables=5)
+            analysis_output = AnalysisOutput(filename_specs=files, metadata=Metadata())
+            all_handles = handles(Parser(), analysis_output)
+            self.assertEqual(len(all_handles), 10)
+
+            issue_filter = IssueFilter(handles_to_keep=frozenset(all_handles[2:]))
+            self.assertEqual(
+                handles(Parser(issue_filter=issue_filter), analysis_output),
+                all_handles[2:],
+            )
+            serial = Parser(issue_filter=issue_filter).parse_analysis_output(
+                analysis_output
+            )
+            for processes in (1, 2):
+                parallel = ParallelParser(
+                    Parser, set(), processes=processes, issue_filter=issue_filter
+                ).parse_analysis_output(analysis_output)
+                self.assertEqual(all_entries(parallel), all_entries(serial))
+
+    def test_previous_issue_handles(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            files = write_pysa_outputs(directory, files=1, callables=5)
+            analysis_output = AnalysisOutput(filename_specs=files, metadata=Metadata())
+            all_handles = handles(Parser(), analysis_output)
+            previous_handles = os.path.join(directory, "handles.txt")
+            with open(previous_handles, "w") as handle:
+                handle.write("\n".join(all_handles[:3]))
+
+            issue_filter = IssueFilter(codes_to_keep=frozenset({5001}))
+            for parser in (
+                Parser(issue_filter=issue_filter),
+                ParallelParser(Parser, set(), processes=2, issue_filter=issue_filter),
+            ):
+                issues = parser.parse_analysis_output(
+                    analysis_output, Path(previous_handles)
+                ).issues
+                self.assertEqual([issue.handle for issue in issues], all_handles[3:])
+                # The previous handles only apply to this parse.
+                self.assertEqual(parser.issue_filter, issue_filter)
+
+    def test_kept_issues(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            files = write_pysa_outputs(directory, files=1, callables=5)
+            analysis_output = AnalysisOutput(filename_specs=files, metadata=Metadata())
+            issues = Parser().parse_analysis_output(analysis_output).issues
+            linemap_path = os.path.join(directory, "linemap.json")
+            binary_linemap_path = os.path.join(directory, "linemap.bin")
+            with open(linemap_path, "w") as handle:
+                json.dump({"module.py": {"2": [7]}}, handle)
+            convert(linemap_path, binary_linemap_path)
+
+            for linemap_file in (linemap_path, binary_linemap_path):
+                issue_filter = IssueFilter(
+                    callables_to_keep=frozenset(issue.callable for issue in issues[1:]),
+                    previous_handles=frozenset(
+                        {
+                            issues[2].handle,
+                            BaseParser.compute_diff_handle("module.py", 7, 5001),
+                        }
+                    ),
+                    linemap=Linemap.load(linemap_file),
+                )
+                # All issues are on line 2, which moved from line 7.
+                self.assertEqual(issue_filter.kept_issues(issues), [])
+                self.assertEqual(
+                    issue_filter.existing_issues(
+                        [(issue.handle, "other.py", 2, 5001) for issue in issues]
+                    ),
+                    [False, False, True, False, False],
+                )
@@ -0,0 +1,130 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import json
+import tempfile
+from unittest import TestCase
+
+from ...analysis_output import AnalysisOutput, Metadata
+from .. import FramesStore
+from ..lazy_frames import LazyFrames
+from ..mariana_trench_parser import Parser as MarianaTrenchParser
+from ..pysa_taint_parser import Parser
+from .pysa_output import pysa_model, write_pysa_output, write_pysa_outputs
+
+
+class LazyFramesTest(TestCase):
+    def test_matches_eager_parser(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            files = write_pysa_outputs(directory, files=2, callables=5)
+            analysis_output = AnalysisOutput(filename_specs=files, metadata=Metadata())
+
+            eager = Parser().parse_analysis_output(analysis_output)
+            lazy = Parser(frames_store=FramesStore.LAZY).parse_analysis_output(
+                analysis_output
+            )
+
+            self.assertIsInstance(lazy.preconditions, LazyFrames)
+            self.assertEqual(lazy.issues, eager.issues)
+            # Nothing is parsed until frames are looked up.
+            self.assertEqual(lazy.preconditions.frame_count(), 0)
+
+            precondition = lazy.preconditions.frames_from_caller(
+                "module.g1_2", "formal(x)"
+            )
+            self.assertEqual(
+                precondition,
+                eager.preconditions.frames_from_caller("module.g1_2", "formal(x)"),
+            )
+            self.assertEqual(len(precondition), 1)
+            self.assertEqual(lazy.preconditions.frame_count(), 1)
+            self.assertEqual(lazy.postconditions.frame_count(), 0)
+            self.assertEqual(
+                lazy.preconditions.frames_from_caller("module.g1_2", "formal(y)"), []
+            )
+            self.assertEqual(
+                lazy.preconditions.frames_from_caller("module.unknown", "formal(x)"),
+                [],
+            )
+
+            self.assertEqual(
+                sorted(lazy.preconditions.all_frames()),
+                sorted(eager.preconditions.all_frames()),
+            )
+            self.assertEqual(lazy.preconditions.frame_count(), 10)
+
+            lazy.preconditions.dispose()
+            lazy.postconditions.dispose()
+
+    def test_models_written_differently(self) -> None:
+        # Models whose keys are not in the order Pysa writes them in are
+        # decoded to be indexed.
+        reordered = pysa_model("module.g", "module.h")
+        reordered = {"data": reordered["data"], "kind": "model"}
+        taint_first = pysa_model("module.f", "module.h")
+        (sink,) = taint_first["data"]["sinks"]
+        taint_first["data"]["sinks"] = [{"taint": sink["taint"], "port": "result"}]
+        with tempfile.TemporaryDirectory() as directory:
+            path = write_pysa_output(
+                directory,
+                "taint-output.json",
+                [reordered, taint_first, pysa_model("module.f", "module.h")],
+            )
+            analysis_output = AnalysisOutput(filename_specs=[path], metadata=Metadata())
+
+            eager = Parser().parse_analysis_output(analysis_output)
+            lazy = Parser(frames_store=FramesStore.LAZY).parse_analysis_output(
+                analysis_output
+            )
+            for caller, port in [
+                ("module.g", "formal(x)"),
+                ("module.f", "formal(x)"),
+                ("module.f", "result"),
+            ]:
+                frames = lazy.preconditions.frames_from_caller(caller, port)
+                self.assertEqual(len(frames), 1)
+                self.assertEqual(
+                    frames, eager.preconditions.frames_from_caller(caller, port)
+                )
+            self.assertEqual(
+                sorted(lazy.preconditions.all_frames()),
+                sorted(eager.preconditions.all_frames()),
+            )
+
+            lazy.preconditions.dispose()
+            lazy.postconditions.dispose()
+
+    def test_scanned_and_decoded_models_agree(self) -> None:
+        model = pysa_model("module.f", "module.h")
+        (sink,) = model["data"]["sinks"]
+        model["data"]["sources"] = [{"port": "result", "taint": sink["taint"]}]
+        model["data"]["tito"] = [
+            {
+                "port": "formal(y)",
+                "taint": [
+                    {"kinds": [{"return_paths": {"": 0}, "kind": "LocalReturn"}]}
+                ],
+            }
+        ]
+        unknown_section = pysa_model("module.f", "module.h")
+        unknown_section["data"]["parameter_sources"] = [sink]
+
+        # Titos do not become frames, so neither way indexes them.
+        for entry in [model, pysa_model("module.g", "module.h")]:
+            self.assertEqual(
+                Parser._scan_model(json.dumps(entry).encode()),
+                Parser._decoded_model(entry["data"]),
+            )
+        self.assertEqual(
+            Parser._decoded_model(model["data"]), ("module.f", {"formal(x)", "result"})
+        )
+        # Sections other than sources, sinks and titos are decoded.
+        self.assertIsNone(Parser._scan_model(json.dumps(unknown_section).encode()))
+
+    def test_unsupported_parser(self) -> None:
+        with self.assertRaises(ValueError):
+            MarianaTrenchParser(frames_store=FramesStore.LAZY)
@@ -0,0 +1,77 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import json
+import os
+import pickle
+import tempfile
+from typing import Dict, List
+from unittest import TestCase
+
+from ..linemap import BinaryLinemap, convert, JSONLinemap, Linemap
+
+LINEMAP: Dict[str, Dict[str, List[int]]] = {
+    "b.py": {"10": [8], "2": [1, 2], "7": []},
+    "a.py": {"5": [3, 4, 5]},
+    "empty.py": {},
+}
+
+
+class LinemapTest(TestCase):
+    def _convert(self, directory: str, linemap: Dict[str, Dict[str, List[int]]]) -> str:
+        json_path = os.path.join(directory, "linemap.json")
+        binary_path = os.path.join(directory, "linemap.bin")
+        with open(json_path, "w") as handle:
+            json.dump(linemap, handle)
+        convert(json_path, binary_path)
+        return binary_path
+
+    def test_binary_matches_json(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            binary = Linemap.load(self._convert(directory, LINEMAP))
+            self.assertIsInstance(binary, BinaryLinemap)
+            json_linemap = JSONLinemap(LINEMAP)
+            for filename in ["a.py", "b.py", "empty.py", "missing.py"]:
+                for line in range(12):
+                    self.assertEqual(
+                        list(binary.old_lines(filename, line)),
+                        list(json_linemap.old_lines(filename, line)),
+                        (filename, line),
+                    )
+            self.assertEqual(binary.old_lines("b.py", 2), [1, 2])
+
+    def test_empty(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            binary = Linemap.load(self._convert(directory, {}))
+            self.assertEqual(binary.old_lines("a.py", 1), [])
+
+    def test_load_json(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "linemap.json")
+            with open(path, "w") as handle:
+                json.dump(LINEMAP, handle)
+            linemap = Linemap.load(path)
+            self.assertIsInstance(linemap, JSONLinemap)
+            self.assertEqual(linemap.old_lines("a.py", 5), [3, 4, 5])
+
+    def test_pickle(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            binary = Linemap.load(self._convert(directory, LINEMAP))
+            copy = pickle.loads(pickle.dumps(binary))
+            self.assertEqual(copy.old_lines("a.py", 5), [3, 4, 5])
+            self.assertEqual(copy.fingerprint(), binary.fingerprint())
+
+    def test_fingerprint(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            first = Linemap.load(self._convert(directory, LINEMAP))
+            second = Linemap.load(
+                self._convert(directory, {**LINEMAP, "c.py": {"1": [2]}})
+            )
+            self.assertNotEqual(first.fingerprint(), second.fingerprint())
+        self.assertEqual(
+            JSONLinemap(LINEMAP).fingerprint(), JSONLinemap(dict(LINEMAP)).fingerprint()
+        )
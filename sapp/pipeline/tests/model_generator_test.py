@@ -0,0 +1,171 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import pickle
+import tempfile
+from typing import FrozenSet, List, Optional, Tuple
+from unittest import TestCase
+
+from ...analysis_output import AnalysisOutput, Metadata
+from ...models import Run, RunStatus, SharedTextKind, TraceKind
+from ...trace_graph import TraceGraph
+from .. import FramesStore, PipelineBuilder, Summary
+from ..model_generator import ExplorationStatistics, ModelGenerator
+from ..pysa_taint_parser import Parser
+from .pysa_output import pysa_issue, pysa_model, write_pysa_output
+
+Frame = Tuple[TraceKind, str, str, str, str, str, FrozenSet[Tuple[str, int]]]
+
+
+def _frame(graph: TraceGraph, frame_id: int) -> Frame:
+    frame = graph.get_trace_frame_from_id(frame_id)
+    leaves = graph.get_trace_frame_leaf_ids_with_depths(frame)
+    return (
+        frame.kind,
+        graph.get_text(frame.caller_id),
+        frame.caller_port,
+        graph.get_text(frame.callee_id),
+        frame.callee_port,
+        str(frame.callee_location),
+        frozenset(
+            (graph.get_shared_text_by_local_id(leaf).contents, depth)
+            for leaf, depth in leaves.items()
+        ),
+    )
+
+
+def _contents(
+    graph: TraceGraph,
+) -> Tuple[FrozenSet[Frame], FrozenSet[Tuple[str, FrozenSet[Frame], FrozenSet[str]]]]:
+    frames = frozenset(_frame(graph, frame_id) for frame_id in graph._trace_frames)
+    instances = frozenset(
+        (
+            graph.get_issue(instance.issue_id).handle,
+            frozenset(
+                _frame(graph, frame.id.local_id)
+                for frame in graph.get_issue_instance_trace_frames(instance)
+            ),
+            frozenset(
+                graph.get_shared_text_by_local_id(text_id).contents
+                for text_id in graph._issue_instance_shared_text_assoc[
+                    instance.id.local_id
+                ]
+            ),
+        )
+        for instance in graph.get_issue_instances()
+    )
+    return frames, instances
+
+
+class TwoRunsModelGenerator(ModelGenerator):
+    def _create_empty_runs(
+        self, status: RunStatus, status_description: Optional[str] = None
+    ) -> List[Run]:
+        return super()._create_empty_runs(
+            status, status_description
+        ) + super()._create_empty_runs(status, status_description)
+
+
+class ModelGeneratorTest(TestCase):
+    def _generate(
+        self,
+        files: List[str],
+        processes: int,
+        frames_store: FramesStore,
+        generator: Optional[ModelGenerator] = None,
+    ) -> Tuple[TraceGraph, Summary]:
+        return (
+            PipelineBuilder()
+            .append(Parser(frames_store=frames_store))
+            .append(generator or ModelGenerator(processes=processes))
+            .build()
+            .run(AnalysisOutput(filename_specs=files, metadata=Metadata()), Summary())
+        )
+
+    def _write_output(self, directory: str) -> List[str]:
+        # Issues of different callables flow into the same models.
+        return [
+            write_pysa_output(
+                directory,
+                "taint-output.json",
+                [
+                    pysa_issue(f"module.f{index}", f"module.g{index % 3}")
+                    for index in range(8)
+                ]
+                + [pysa_model(f"module.g{index}", "module.h") for index in range(3)],
+            )
+        ]
+
+    def test_parallel_matches_serial(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            files = self._write_output(directory)
+            for frames_store in (FramesStore.MEMORY, FramesStore.LAZY):
+                serial, serial_summary = self._generate(files, 1, frames_store)
+                parallel, parallel_summary = self._generate(files, 3, frames_store)
+                self.assertEqual(_contents(parallel), _contents(serial))
+                # Frames of models reached from several partitions are only kept
+                # once.
+                self.assertEqual(len(parallel._trace_frames), len(serial._trace_frames))
+                self.assertEqual(
+                    parallel_summary.missing_traces, serial_summary.missing_traces
+                )
+                self.assertEqual(
+                    {frame.run_id for frame in parallel._trace_frames.values()},
+                    {parallel_summary.runs[0].id},
+                )
+
+    def test_exploration_statistics(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            generator = ModelGenerator()
+            self._generate(
+                self._write_output(directory), 1, FramesStore.MEMORY, generator
+            )
+            # The traces of the models of `module.g0`, `module.g1`, `module.g2`
+            # and `module.h`, and of the source leaf, are explored once.
+            self.assertEqual(
+                generator.exploration_statistics,
+                ExplorationStatistics(explored=14, partially_explored=0, unexplored=5),
+            )
+
+    def test_several_runs(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            graph, summary = self._generate(
+                self._write_output(directory),
+                1,
+                FramesStore.MEMORY,
+                TwoRunsModelGenerator(),
+            )
+        first_run, second_run = summary.runs
+        frames = {
+            run.id.local_id: {
+                _frame(graph, frame_id)
+                for frame_id, frame in graph._trace_frames.items()
+                if frame.run_id.local_id == run.id.local_id
+            }
+            for run in (first_run, second_run)
+        }
+        # Traces explored for the first run are explored again for the second.
+        self.assertGreater(len(frames[first_run.id.local_id]), 8)
+        self.assertEqual(frames[first_run.id.local_id], frames[second_run.id.local_id])
+
+    def test_pickle(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            graph, _ = self._generate(
+                self._write_output(directory), 1, FramesStore.MEMORY
+            )
+            copy = pickle.loads(pickle.dumps(graph))
+            self.assertEqual(_contents(copy), _contents(graph))
+            self.assertEqual(
+                copy.get_trace_frames_from_caller(
+                    TraceKind.precondition,
+                    copy.get_or_add_shared_text(
+                        SharedTextKind.callable, "module.g0"
+                    ).id,
+                    "formal(x)",
+                )[0].callee_port,
+                "formal(y)",
+            )
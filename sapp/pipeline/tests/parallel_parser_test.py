@@ -0,0 +1,132 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import gzip
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from ...analysis_output import AnalysisOutput, Metadata
+from ..base_parser import read_line_range, split_file_ranges
+from ..parallel_parser import ParallelParser
+from ..parse_batch import share
+from ..pysa_taint_parser import Parser
+from .pysa_output import all_entries, write_pysa_outputs
+
+
+class ParallelParserTest(TestCase):
+    def test_matches_serial_parser(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            files = write_pysa_outputs(directory, files=3, callables=5)
+            analysis_output = AnalysisOutput(filename_specs=files, metadata=Metadata())
+
+            serial = Parser().parse_analysis_output(analysis_output)
+            parallel = ParallelParser(
+                Parser, set(), processes=2, max_in_flight=1
+            ).parse_analysis_output(analysis_output)
+
+        self.assertEqual(len(serial.issues), 15)
+        self.assertEqual(serial.preconditions.frame_count(), 15)
+        # Results are consumed in submission order, so the output is
+        # identical to parsing the files one after the other.
+        self.assertEqual(all_entries(parallel), all_entries(serial))
+
+    def test_splits_files_into_ranges(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            files = write_pysa_outputs(directory, files=2, callables=20)
+            analysis_output = AnalysisOutput(filename_specs=files, metadata=Metadata())
+
+            parallel_parser = ParallelParser(
+                Parser, set(), processes=2, max_range_bytes=4096
+            )
+            self.assertGreater(len(parallel_parser._file_ranges(analysis_output)), 2)
+
+            serial = Parser().parse_analysis_output(analysis_output)
+            parallel = parallel_parser.parse_analysis_output(analysis_output)
+
+        self.assertEqual(len(serial.issues), 40)
+        self.assertEqual(all_entries(parallel), all_entries(serial))
+
+    def test_compressed_files(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            files = write_pysa_outputs(directory, files=2, callables=20)
+            analysis_output = AnalysisOutput(filename_specs=files, metadata=Metadata())
+            serial = Parser().parse_analysis_output(analysis_output)
+
+            compressed = []
+            for path in files:
+                with open(path, "rb") as input, gzip.open(f"{path}.gz", "wb") as output:
+                    output.write(input.read())
+                compressed.append(f"{path}.gz")
+            analysis_output = AnalysisOutput(
+                filename_specs=compressed, metadata=Metadata()
+            )
+            parallel_parser = ParallelParser(
+                Parser, set(), processes=2, max_range_bytes=4096
+            )
+            # Compressed files are not split.
+            self.assertEqual(len(parallel_parser._file_ranges(analysis_output)), 2)
+            parallel = parallel_parser.parse_analysis_output(analysis_output)
+
+        self.assertEqual(all_entries(parallel), all_entries(serial))
+
+    def test_main_process_does_not_share_memory(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            files = write_pysa_outputs(directory, files=2, callables=5)
+            analysis_output = AnalysisOutput(filename_specs=files, metadata=Metadata())
+            with patch(
+                "sapp.pipeline.parallel_parser.share", wraps=share
+            ) as parallel_share:
+                parsed = ParallelParser(
+                    Parser, set(), processes=1
+                ).parse_analysis_output(analysis_output)
+
+        self.assertEqual(len(parsed.issues), 10)
+        self.assertEqual(parallel_share.call_count, 2)
+        for call in parallel_share.call_args_list:
+            self.assertIsNone(call.args[2])
+
+    def test_stopping_early_releases_pending_results(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            files = write_pysa_outputs(directory, files=4, callables=5)
+            analysis_output = AnalysisOutput(filename_specs=files, metadata=Metadata())
+            parallel_parser = ParallelParser(
+                Parser, set(), processes=2, max_in_flight=2
+            )
+            with patch("sapp.pipeline.parallel_parser.release") as release:
+                entries = parallel_parser.parse(analysis_output)
+                next(iter(entries))
+                # pyre-ignore[16]: `parse` returns a generator.
+                entries.close()
+
+        # The range after the one being consumed was submitted, but not consumed.
+        self.assertEqual(release.call_count, 1)
+
+
+class SplitFileRangesTest(TestCase):
+    def test_ranges_are_line_aligned(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "output.json")
+            lines = [f'{{"line": {index}}}\n' * (index % 3 + 1) for index in range(50)]
+            with open(path, "w") as handle:
+                handle.write("".join(lines))
+
+            for max_range_bytes in (1, 7, 64, 1000, 10**6):
+                ranges = split_file_ranges(path, max_range_bytes)
+                self.assertEqual(ranges[0].start, 0)
+                self.assertEqual(ranges[-1].end, os.path.getsize(path))
+                read = []
+                with open(path, "rb") as handle:
+                    for previous, next in zip(ranges, ranges[1:]):
+                        self.assertEqual(previous.end, next.start)
+                    for file_range in ranges:
+                        self.assertLess(file_range.start, file_range.end)
+                        read.extend(
+                            read_line_range(handle, file_range.start, file_range.end)
+                        )
+                self.assertEqual("".join(read), "".join(lines))
@@ -0,0 +1,170 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+from multiprocessing import shared_memory
+from typing import List, Union
+from unittest import TestCase
+from unittest.mock import patch
+
+from ordered_set import OrderedSet
+
+from .. import (
+    ParseConditionTuple,
+    ParseIssueConditionTuple,
+    ParseIssueTuple,
+    ParseTraceAnnotation,
+    ParseTraceAnnotationSubtrace,
+    ParseTraceFeature,
+    ParseType,
+    ParseTypeInterval,
+    SourceLocation,
+)
+from ..parse_batch import decode_entries, encode_entries, pack, release, unpack
+
+
+def _annotation() -> ParseTraceAnnotation:
+    return ParseTraceAnnotation(
+        location=SourceLocation(1, 2, 3),
+        kind="tito_transform",
+        msg="Propagation through Transform",
+        leaf_kind="Source",
+        leaf_depth=2,
+        type_interval=ParseTypeInterval(1, 4, True),
+        link=None,
+        trace_key="key",
+        titos=[SourceLocation(4, 5, 6)],
+        subtraces=[
+            ParseTraceAnnotationSubtrace(
+                callee="module.callee",
+                port="formal(x)",
+                position=SourceLocation(7, 8, 9),
+                features=[ParseTraceFeature("via:subtrace", [])],
+            )
+        ],
+    )
+
+
+def _entries() -> List[Union[ParseConditionTuple, ParseIssueTuple]]:
+    issue_condition = ParseIssueConditionTuple(
+        callee="module.sink",
+        port="formal(y)",
+        location=SourceLocation(10, 11, 12),
+        leaves=[("RCE", 2)],
+        titos=[SourceLocation(13, 14, 15)],
+        features=[ParseTraceFeature("always-via:tito", [SourceLocation(16, 17, 18)])],
+        type_interval=None,
+        annotations=[_annotation()],
+        root_port="result",
+    )
+    return [
+        ParseIssueTuple(
+            code=5001,
+            message="[UserControlled] to [RCE]",
+            callable="module.f",
+            handle="module.f:5001",
+            filename="module.py",
+            line=2,
+            start=3,
+            end=4,
+            preconditions=[issue_condition],
+            postconditions=[issue_condition._replace(root_port=None)],
+            initial_sources={(None, "UserControlled", 0)},
+            final_sinks=OrderedSet([("module.sink", "RCE", 2), (None, "RCE", 1)]),
+            features=["via:format-string"],
+            callable_line=None,
+            fix_info={"replacement": ["a", 1, None], "nested": {"x": 1.5}},
+        ),
+        ParseConditionTuple(
+            type=ParseType.PRECONDITION,
+            caller="module.g",
+            caller_port="formal(x)",
+            filename="module.py",
+            callee="module.h",
+            callee_port="formal(y)",
+            callee_location=SourceLocation(2, 3, 4),
+            leaves=[("RCE", 1), ("SQL", 0)],
+            type_interval=ParseTypeInterval(0, 10, False),
+            features=[],
+            titos=[],
+            annotations=frozenset([_annotation()]),
+        ),
+        ParseConditionTuple(
+            type=ParseType.POSTCONDITION,
+            caller="module.g",
+            caller_port="result",
+            filename="module.py",
+            callee="leaf",
+            callee_port="source",
+            callee_location=SourceLocation(5, 6, 7),
+            leaves=[],
+            type_interval=None,
+            features=[ParseTraceFeature("via:obscure", [])],
+            titos=[SourceLocation(1, 1, 1), SourceLocation(2, 2, 2)],
+            annotations=[],
+        ),
+    ]
+
+
+class ParseBatchTest(TestCase):
+    def test_roundtrip(self) -> None:
+        entries = _entries()
+        data, count = encode_entries(entries)
+        batch = decode_entries(data)
+
+        self.assertEqual(count, 3)
+        self.assertEqual(len(batch), 3)
+        decoded = list(batch)
+        self.assertEqual(decoded, entries)
+        # Container types are preserved.
+        issue = decoded[0]
+        assert isinstance(issue, ParseIssueTuple)
+        self.assertIsInstance(issue.initial_sources, set)
+        self.assertIsInstance(issue.final_sinks, OrderedSet)
+        self.assertIsInstance(decoded[1].annotations, frozenset)
+
+    def test_chunks(self) -> None:
+        with patch("sapp.pipeline.parse_batch.CHUNK_SIZE", 2):
+            data, count = encode_entries(_entries())
+        self.assertEqual(count, 3)
+        batch = decode_entries(data)
+        self.assertEqual(len(batch), 3)
+        self.assertEqual(list(batch), _entries())
+
+    def test_strings_are_shared(self) -> None:
+        decoded = list(decode_entries(encode_entries(_entries())[0]))
+        self.assertIs(decoded[1].caller, decoded[2].caller)
+        self.assertIs(decoded[0].filename, decoded[1].filename)
+
+    def test_inline_payload(self) -> None:
+        payload = pack(_entries(), min_shared_memory_bytes=None)
+        self.assertIsNone(payload.shared_memory_name)
+        self.assertEqual(payload.entry_count, 3)
+        with unpack(payload) as batch:
+            self.assertEqual(list(batch), _entries())
+
+    def test_shared_memory_payload(self) -> None:
+        payload = pack(_entries(), min_shared_memory_bytes=1)
+        self.assertIsNone(payload.data)
+        name = payload.shared_memory_name
+        assert name is not None
+        with unpack(payload) as batch:
+            # Stopping before the end still releases the shared memory.
+            self.assertEqual(next(iter(batch)), _entries()[0])
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+    def test_release(self) -> None:
+        payload = pack(_entries(), min_shared_memory_bytes=1)
+        name = payload.shared_memory_name
+        assert name is not None
+        release(payload)
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+    def test_empty(self) -> None:
+        with unpack(pack([], min_shared_memory_bytes=1)) as batch:
+            self.assertEqual(list(batch), [])
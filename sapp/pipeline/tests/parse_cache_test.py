@@ -0,0 +1,83 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from ...analysis_output import AnalysisOutput, Metadata
+from ..base_parser import FileRange
+from ..parallel_parser import ParallelParser
+from ..parse_cache import ParseCache
+from ..pysa_taint_parser import Parser
+from .pysa_output import all_entries, write_pysa_outputs
+
+
+class ParseCacheTest(TestCase):
+    def test_key(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            (path,) = write_pysa_outputs(directory, files=1, callables=2)
+            size = os.path.getsize(path)
+            whole = FileRange(path, 0, size)
+            key = ParseCache.key(Parser, set(), Metadata(), whole)
+
+            self.assertEqual(key, ParseCache.key(Parser, set(), Metadata(), whole))
+            self.assertNotEqual(
+                key, ParseCache.key(Parser, set(), Metadata(), FileRange(path, 1, size))
+            )
+            self.assertNotEqual(
+                key, ParseCache.key(Parser, {"repo"}, Metadata(), whole)
+            )
+            self.assertNotEqual(
+                key, ParseCache.key(Parser, set(), Metadata(tool="other"), whole)
+            )
+            with patch.object(Parser, "CACHE_VERSION", Parser.CACHE_VERSION + 1):
+                self.assertNotEqual(
+                    key, ParseCache.key(Parser, set(), Metadata(), whole)
+                )
+
+            with open(path, "a") as handle:
+                handle.write("\n")
+            self.assertNotEqual(
+                key,
+                ParseCache.key(Parser, set(), Metadata(), FileRange(path, 0, size + 1)),
+            )
+
+    def test_get_and_put(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ParseCache(directory)
+            self.assertIsNone(cache.get("0123"))
+
+            cache.put("0123", b"batch", 3)
+            self.assertEqual(cache.get("0123"), (b"batch", 3))
+
+            with open(cache._path("0123"), "r+b") as handle:
+                handle.truncate(4)
+            self.assertIsNone(cache.get("0123"))
+
+    def test_parser_reuses_cached_results(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            files = write_pysa_outputs(directory, files=2, callables=5)
+            analysis_output = AnalysisOutput(filename_specs=files, metadata=Metadata())
+            cache_directory = os.path.join(directory, "cache")
+
+            serial = Parser().parse_analysis_output(analysis_output)
+            first = ParallelParser(
+                Parser, set(), processes=1, parse_cache_directory=cache_directory
+            ).parse_analysis_output(analysis_output)
+            # Nothing is parsed again on the second run.
+            with (
+                patch.object(Parser, "parse_file_range", side_effect=AssertionError),
+                patch.object(Parser, "parse_handle", side_effect=AssertionError),
+            ):
+                second = ParallelParser(
+                    Parser, set(), processes=1, parse_cache_directory=cache_directory
+                ).parse_analysis_output(analysis_output)
+
+        self.assertEqual(all_entries(first), all_entries(serial))
+        self.assertEqual(all_entries(second), all_entries(serial))
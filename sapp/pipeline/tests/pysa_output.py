@@ -0,0 +1,137 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+"""Builders of small Pysa outputs, shared by the parser and pipeline tests."""
+
+import json
+import os
+from typing import Any, Dict, List, Tuple
+
+from .. import IssuesAndFrames
+
+# Line, start and end of a call.
+Position = Tuple[int, int, int]
+
+
+def _position(position: Position) -> Dict[str, int]:
+    line, start, end = position
+    return {"line": line, "start": start, "end": end}
+
+
+def pysa_model(
+    callable: str,
+    callee: str,
+    callee_port: str = "formal(y)",
+    position: Position = (2, 3, 4),
+) -> Dict[str, Any]:
+    """A model with a sink on `formal(x)` through a call to `callee`."""
+    return {
+        "kind": "model",
+        "data": {
+            "callable": callable,
+            "filename": "module.py",
+            "sinks": [
+                {
+                    "port": "formal(x)",
+                    "taint": [
+                        {
+                            "call": {
+                                "position": _position(position),
+                                "resolves_to": [callee],
+                                "port": callee_port,
+                            },
+                            "kinds": [{"kind": "RCE", "length": 1}],
+                        }
+                    ],
+                }
+            ],
+        },
+    }
+
+
+def pysa_issue(
+    callable: str,
+    callee: str,
+    callee_port: str = "formal(x)",
+    position: Position = (2, 3, 4),
+) -> Dict[str, Any]:
+    """An issue whose backward trace calls `callee`."""
+    return {
+        "kind": "issue",
+        "data": {
+            "callable": callable,
+            "callable_line": 1,
+            "code": 5001,
+            "line": 2,
+            "start": 3,
+            "end": 4,
+            "filename": "module.py",
+            "message": "[UserControlled] to [RCE]",
+            "master_handle": f"{callable}:5001",
+            "features": [],
+            "traces": [
+                {
+                    "name": "forward",
+                    "roots": [
+                        {
+                            "origin": {"line": 2, "start": 3, "end": 4},
+                            "kinds": [{"kind": "UserControlled"}],
+                        }
+                    ],
+                },
+                {
+                    "name": "backward",
+                    "roots": [
+                        {
+                            "call": {
+                                "position": _position(position),
+                                "resolves_to": [callee],
+                                "port": callee_port,
+                            },
+                            "kinds": [{"kind": "RCE", "length": 2}],
+                        }
+                    ],
+                },
+            ],
+        },
+    }
+
+
+def write_pysa_output(directory: str, name: str, entries: List[Dict[str, Any]]) -> str:
+    path = os.path.join(directory, name)
+    with open(path, "w") as handle:
+        handle.write(json.dumps({"file_version": 3}) + "\n")
+        for entry in entries:
+            handle.write(json.dumps(entry) + "\n")
+    return path
+
+
+def write_pysa_outputs(directory: str, files: int, callables: int) -> List[str]:
+    """Files with an issue and a model for each of `callables` callables."""
+    return [
+        write_pysa_output(
+            directory,
+            f"taint-output-{file}.json",
+            [
+                entry
+                for index in range(callables)
+                for entry in (
+                    pysa_issue(f"module.f{file}_{index}", f"module.g{file}_{index}"),
+                    pysa_model(f"module.g{file}_{index}", f"module.h{file}_{index}"),
+                )
+            ],
+        )
+        for file in range(files)
+    ]
+
+
+def all_entries(issues_and_frames: IssuesAndFrames) -> List[object]:
+    return (
+        list(issues_and_frames.issues)
+        + list(issues_and_frames.preconditions.all_frames())
+        + list(issues_and_frames.postconditions.all_frames())
+    )
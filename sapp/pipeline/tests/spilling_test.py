@@ -0,0 +1,93 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import tempfile
+from typing import Optional
+from unittest import TestCase
+from unittest.mock import patch
+
+from ...analysis_output import AnalysisOutput, Metadata
+from ...memory_budget import MemoryBudget
+from .. import IssuesAndFrames, Pipeline
+from ..disk_frames import DiskFrames
+from ..issue_callable_filter import IssueCallableFilter
+from ..pysa_taint_parser import Parser
+from ..spilling import SpillingIssues
+from .pysa_output import pysa_issue, pysa_model, write_pysa_output
+
+
+def _parse(directory: str, memory_budget: Optional[MemoryBudget]) -> IssuesAndFrames:
+    path = write_pysa_output(
+        directory,
+        "taint-output.json",
+        [pysa_issue(f"module.f{index}", f"module.g{index}") for index in range(5)]
+        + [pysa_model(f"module.g{index}", f"module.h{index}") for index in range(5)],
+    )
+    return Parser(memory_budget=memory_budget).parse_analysis_output(
+        AnalysisOutput(filename_specs=[path], metadata=Metadata())
+    )
+
+
+class SpillingTest(TestCase):
+    def test_within_budget(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            parsed = _parse(directory, MemoryBudget(limit_in_gb=1e6, check_interval=1))
+            self.assertNotIsInstance(parsed.preconditions, DiskFrames)
+            self.assertEqual(parsed.memory_report()["issues"].count, 5)
+
+    def test_spill(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            expected = _parse(directory, None)
+            budget = MemoryBudget(
+                limit_in_gb=1e-6, check_interval=3, directory=directory
+            )
+            with patch("sapp.pipeline.spilling.SPILL_BATCH_SIZE", 2):
+                parsed = _parse(directory, budget)
+
+            self.assertIsInstance(parsed.issues, SpillingIssues)
+            self.assertEqual(len(parsed.issues), 5)
+            self.assertEqual(list(parsed.issues), list(expected.issues))
+            # Issues are spilled in batches once the first batch is spilled.
+            self.assertEqual(parsed.memory_report()["issues"].count, 0)
+
+            self.assertIsInstance(parsed.preconditions, DiskFrames)
+            self.assertEqual(
+                parsed.preconditions.frame_count(), expected.preconditions.frame_count()
+            )
+            self.assertEqual(
+                parsed.preconditions.frames_from_caller("module.g3", "formal(x)"),
+                expected.preconditions.frames_from_caller("module.g3", "formal(x)"),
+            )
+            parsed.issues.dispose()
+            parsed.preconditions.dispose()
+            parsed.postconditions.dispose()
+
+    def test_filter_spilled_issues(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            expected = _parse(directory, None)
+            budget = MemoryBudget(
+                limit_in_gb=1e-6, check_interval=3, directory=directory
+            )
+            with patch("sapp.pipeline.spilling.SPILL_BATCH_SIZE", 2):
+                parsed = _parse(directory, budget)
+                filtered, _ = Pipeline(
+                    [IssueCallableFilter({"module.f1", "module.f3"})]
+                ).run(parsed)
+
+            # Filtered issues stay under the budget.
+            self.assertIsInstance(filtered.issues, SpillingIssues)
+            self.assertEqual(
+                list(filtered.issues),
+                [
+                    issue
+                    for issue in expected.issues
+                    if issue.callable in {"module.f1", "module.f3"}
+                ],
+            )
+            filtered.issues.dispose()
+            filtered.preconditions.dispose()
+            filtered.postconditions.dispose()
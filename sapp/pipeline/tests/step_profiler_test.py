@@ -0,0 +1,64 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import os
+import tempfile
+import time
+from typing import List, Tuple
+from unittest import TestCase
+
+from ...metrics_logger import ScopedMetricsLogger
+from .. import PipelineBuilder, PipelineStep, Summary
+from ..step_profiler import StepProfiler
+
+
+def _spin(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class Allocate(PipelineStep[None, List[str]]):
+    def run(
+        self, input: None, summary: Summary, scoped_metrics_logger: ScopedMetricsLogger
+    ) -> Tuple[List[str], Summary]:
+        _spin(0.1)
+        return [str(index) for index in range(10000)], summary
+
+
+class StepProfilerTest(TestCase):
+    def test_profile(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            profiler = StepProfiler(directory, interval=0.001)
+            output, _ = (
+                PipelineBuilder().append(Allocate()).build(profiler=profiler).run(None)
+            )
+            self.assertEqual(len(output), 10000)
+            self.assertEqual(
+                profiler.profiles["Allocate"],
+                [
+                    os.path.join(directory, "01-Allocate.collapsed"),
+                    os.path.join(directory, "01-Allocate.allocations"),
+                ],
+            )
+
+            with open(os.path.join(directory, "01-Allocate.collapsed")) as file:
+                samples = [line.rsplit(" ", 1) for line in file.read().splitlines()]
+            spinning = sum(
+                int(count)
+                for stack, count in samples
+                if stack.startswith("MainThread;")
+                and ";run (" in stack
+                and stack.split(";")[-1].startswith("_spin (")
+            )
+            self.assertGreater(spinning, 10)
+
+            with open(os.path.join(directory, "01-Allocate.allocations")) as file:
+                allocations = file.read().splitlines()
+            self.assertTrue(allocations[0].startswith("Total: +"))
+            # The output of the step is still held once it has run.
+            self.assertIn(__file__, allocations[1])
@@ -0,0 +1,98 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import tempfile
+from unittest import TestCase
+
+from ...analysis_output import AnalysisOutput, Metadata
+from ...models import SharedTextKind
+from ...trace_graph import TraceGraph
+from .. import FramesBuilder, ParseConditionTuple
+from ..parallel_parser import ParallelParser
+from ..parse_batch import decode_entries, encode_entries
+from ..pysa_taint_parser import Parser
+from ..string_pool import StringPool
+from .parse_batch_test import _entries
+from .pysa_output import write_pysa_outputs
+
+
+def _copy(string: str) -> str:
+    # Slicing returns the same object, so build an equal but distinct string.
+    return "".join(list(string))
+
+
+class StringPoolTest(TestCase):
+    def test_contains(self) -> None:
+        pool = StringPool()
+        pool.intern("a")
+        pool.intern("b")
+        pool.intern(_copy("a"))
+        self.assertEqual(len(pool), 2)
+        self.assertIn("a", pool)
+        self.assertNotIn("c", pool)
+
+    def test_intern(self) -> None:
+        pool = StringPool()
+        first = _copy("module.callable")
+        second = _copy("module.callable")
+        self.assertIsNot(first, second)
+        self.assertIs(pool.intern(first), first)
+        self.assertIs(pool.intern(second), first)
+
+    def test_frames_builder(self) -> None:
+        pool = StringPool()
+        frame = _entries()[1]
+        assert isinstance(frame, ParseConditionTuple)
+        canonical = pool.intern(frame.caller)
+        caller = _copy(frame.caller)
+        interned = FramesBuilder(pool)
+        interned.add(frame._replace(caller=caller))
+        (stored,) = interned.build().frames_from_caller(caller, frame.caller_port)
+        self.assertIs(stored.caller, canonical)
+
+        # Frames decoded with the pool are kept as they are.
+        decoded = FramesBuilder(pool, interned=True)
+        decoded.add(stored)
+        (kept,) = decoded.build().frames_from_caller(caller, frame.caller_port)
+        self.assertIs(kept, stored)
+
+    def test_decoded_batches_share_strings(self) -> None:
+        pool = StringPool()
+        data, _ = encode_entries(_entries())
+        first = list(decode_entries(data, pool))
+        second = list(decode_entries(data, pool))
+        self.assertEqual(first, _entries())
+        self.assertEqual(second, _entries())
+        for left, right in zip(first, second):
+            self.assertIs(left.filename, right.filename)
+
+    def test_parsers_share_strings_with_trace_graph(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            files = write_pysa_outputs(directory, files=2, callables=3)
+            analysis_output = AnalysisOutput(filename_specs=files, metadata=Metadata())
+            for parser in [
+                Parser(),
+                ParallelParser(Parser, set(), processes=1),
+            ]:
+                issues_and_frames = parser.parse_analysis_output(analysis_output)
+                pool = issues_and_frames.string_pool
+                self.assertIs(pool, parser.string_pool)
+
+                frames = list(issues_and_frames.preconditions.all_frames())
+                self.assertNotEqual(frames, [])
+                for frame in frames:
+                    self.assertIs(frame.caller, pool.intern(frame.caller))
+                    self.assertIs(frame.callee_port, pool.intern(frame.callee_port))
+                for issue in issues_and_frames.issues:
+                    self.assertIs(issue.callable, pool.intern(issue.callable))
+
+                graph = TraceGraph(pool)
+                issue = issues_and_frames.issues[0]
+                shared_text = graph.get_or_add_shared_text(
+                    SharedTextKind.callable, _copy(issue.callable)
+                )
+                self.assertIs(shared_text.contents, issue.callable)
@@ -6,6 +6,8 @@
 # pyre-strict
 
 import io
+import os
+import tempfile
 import unittest
 from typing import Iterable, Union
 
@@ -19,7 +21,7 @@ from .. import (
     ParseTypeInterval,
     SourceLocation,
 )
-from ..base_parser import ParseType
+from ..base_parser import FileRange, ParseType
 from ..mariana_trench_parser import Parser
 from ..mariana_trench_parser_objects import IssueCallee
 
@@ -37,15 +39,16 @@ class TestParser(unittest.TestCase):
     ) -> None:
         output = "".join(output.split("\n"))  # Flatten json-line.
         parser = Parser()
+        metadata = Metadata(
+            repo_roots={"/analysis/root"},
+            analysis_tool_version="0.2",
+            rules={1: Rule(name="TestRule", description="Test Rule Description")},
+        )
         analysis_output = AnalysisOutput(
             directory="/output/directory",
             filename_specs=["models.json"],
             file_handle=io.StringIO(output),
-            metadata=Metadata(
-                repo_roots={"/analysis/root"},
-                analysis_tool_version="0.2",
-                rules={1: Rule(name="TestRule", description="Test Rule Description")},
-            ),
+            metadata=metadata,
         )
 
         def sort_entry(e: Union[ParseConditionTuple, ParseIssueTuple]) -> str:
@@ -68,6 +71,24 @@ class TestParser(unittest.TestCase):
             expected,
         )
 
+        # Parsing the file as a byte range must yield the same entries.
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "models.json")
+            with open(path, "w") as handle:
+                handle.write(output)
+            range_parser = Parser()
+            range_parser.initialize(metadata)
+            handle_parser = Parser()
+            handle_parser.initialize(metadata)
+            self.assertEqual(
+                list(
+                    range_parser.parse_file_range(
+                        FileRange(path=path, start=0, end=os.path.getsize(path))
+                    )
+                ),
+                list(handle_parser.parse_handle(io.StringIO(output))),
+            )
+
     def testEmptyModels(self) -> None:
         self.assertParsed(
             """
@@ -3619,3 +3640,18 @@ class TestParser(unittest.TestCase):
                 )
             ],
         )
+
+    def testParseHandleIsStreaming(self) -> None:
+        model = (
+            '{"method": "LClass;.method:()V", "position": {"line": 1}, '
+            '"sinks": [{"port": "Argument(1)", "taint": [{"call_info": '
+            '{"call_kind": "CallSite", "resolves_to": "LSink;.sink:()V", '
+            '"port": "Argument(1)"}, "kinds": [{"kind": "TestSink"}]}]}]}\n'
+        )
+        handle = io.StringIO(model * 3)
+        entries = iter(Parser().parse_handle(handle))
+
+        self.assertEqual(next(entries).caller, "LClass;.method:()V")
+        # Only the first model has been read.
+        self.assertEqual(handle.tell(), len(model))
+        self.assertEqual(len(list(entries)), 2)
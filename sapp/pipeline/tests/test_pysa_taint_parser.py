@@ -5,8 +5,12 @@
 
 # pyre-strict
 
+import gzip
 import io
+import json
+import os
 import sys
+import tempfile
 import unittest
 from typing import Iterable, Union
 
@@ -21,8 +25,9 @@ from .. import (
     ParseTypeInterval,
     SourceLocation,
 )
-from ..base_parser import ParseType
+from ..base_parser import FileRange, ParseType
 from ..pysa_taint_parser import Parser
+from .pysa_output import write_pysa_outputs
 
 
 class TestParser(unittest.TestCase):
@@ -62,6 +67,20 @@ class TestParser(unittest.TestCase):
             expected,
         )
 
+        # Parsing the file as a byte range must yield the same entries.
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "taint-output.json")
+            with open(path, "w") as handle:
+                handle.write(input)
+            self.assertEqual(
+                list(
+                    Parser().parse_file_range(
+                        FileRange(path=path, start=0, end=os.path.getsize(path))
+                    )
+                ),
+                list(Parser().parse_handle(io.StringIO(input))),
+            )
+
     def testEmptyModelV3(self) -> None:
         self.assertParsed(
             version=3,
@@ -4589,3 +4608,24 @@ class TestParser(unittest.TestCase):
             """,
             expected=[],
         )
+
+    def testCompressedFileOffsets(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            (path,) = write_pysa_outputs(directory, files=1, callables=5)
+            with open(path, "rb") as input, gzip.open(f"{path}.gz", "wb") as output:
+                output.write(input.read())
+            with open(path) as input:
+                entries = [json.loads(line) for line in input.readlines()[1:]]
+
+            parser = Parser()
+            analysis_output = AnalysisOutput(
+                filename_specs=[f"{path}.gz"], metadata=Metadata()
+            )
+            positions = list(parser.get_json_file_offsets(analysis_output))
+            self.assertEqual(len(positions), len(entries))
+            # Offsets are positions in the decompressed stream.
+            for position, entry in zip(positions, entries):
+                self.assertEqual(
+                    parser.get_json_from_file_offset(f"{path}.gz", position.offset),
+                    entry,
+                )
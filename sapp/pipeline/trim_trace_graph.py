@@ -40,5 +40,6 @@ class TrimTraceGraph(PipelineStep[TraceGraph, List[TraceGraph]]):
                     run.id,
                 )
                 trimmed_graph.populate_from_trace_graph(input)
+                trimmed_graph.compact()
                 trimmed_graphs.append(trimmed_graph)
         return trimmed_graphs, summary
@@ -9,6 +9,7 @@ from typing import Set, Tuple
 
 from ..metrics_logger import ScopedMetricsLogger
 from . import IssuesAndFrames, ParseIssueTuple, PipelineStep, Summary
+from .spilling import replace_issues
 
 
 class WarningCodeFilter(PipelineStep[IssuesAndFrames, IssuesAndFrames]):
@@ -24,12 +25,9 @@ class WarningCodeFilter(PipelineStep[IssuesAndFrames, IssuesAndFrames]):
         summary: Summary,
         scoped_metrics_logger: ScopedMetricsLogger,
     ) -> Tuple[IssuesAndFrames, Summary]:
-        filtered_issues = []
-        for issue in input.issues:
-            if self._should_skip_issue(issue):
-                continue
-            filtered_issues.append(issue)
-
-        input.issues = filtered_issues
+        input.issues = replace_issues(
+            input.issues,
+            (issue for issue in input.issues if not self._should_skip_issue(issue)),
+        )
 
         return input, summary
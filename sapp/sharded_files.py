@@ -11,6 +11,8 @@ import fnmatch
 import os
 import re
 
+from .compression import COMPRESSED_EXTENSIONS, find_file
+
 
 class ShardedFileComponents:
     """
@@ -26,7 +28,8 @@ class ShardedFileComponents:
 
     def __init__(self, filepattern: str) -> None:
         self.directory, root = os.path.split(filepattern)
-        m = re.match(r"([^@]+)@([^.@]+)(\.[^.@]*)?$", root)
+        # The extension may have several components, e.g. `.json.zst`.
+        m = re.match(r"([^@]+)@([^.@]+)(\.[^@]*)?$", root)
         if not m:
             raise ValueError("Not a sharded file: {}".format(filepattern))
 
@@ -96,6 +99,9 @@ class ShardedFile:
     are indicated as properties on the sharded file.
 
     The list of shards is available in shard_file_names.
+
+    Shards that only exist compressed (e.g. path/foo@00000-of-00001.ext.zst)
+    are used in place of the uncompressed ones.
     """
 
     def __init__(self, pattern: str) -> None:
@@ -119,9 +125,10 @@ class ShardedFile:
         self._shard_file_names = []
         for i in range(pcomps.shard_total):
             filename = pcomps.get_shard_filename(i)
-            if not os.path.isfile(filename):
+            existing = find_file(filename)
+            if existing is None:
                 raise ValueError("Shard {} does not exist.".format(filename))
-            self._shard_file_names.append(filename)
+            self._shard_file_names.append(existing)
 
     def _find_unambiguous_shard_total(
         self,
@@ -133,9 +140,10 @@ class ShardedFile:
             raise ValueError("Not a directory {}".format(dir))
 
         pattern = pcomps.stem + "@?????-of-?????" + pcomps.extension
+        patterns = [pattern] + [pattern + ext for ext in COMPRESSED_EXTENSIONS]
         seen_shard_count = -1
         for file in os.listdir(dir):
-            if fnmatch.fnmatch(file, pattern):
+            if any(fnmatch.fnmatch(file, candidate) for candidate in patterns):
                 try:
                     comps = ShardedFileComponents(file)
                 except ValueError:
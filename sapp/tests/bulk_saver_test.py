@@ -5,14 +5,27 @@
 
 # pyre-strict
 
+import os
+import tempfile
 from unittest import TestCase
+from unittest.mock import patch
 
 from pyre_extensions import none_throws
-from sqlalchemy import delete, select
+from sqlalchemy import delete, func, select
 from sqlalchemy.exc import IntegrityError
 
+from ..bulk_saver import BulkSaver
 from ..db import DB, DBType
-from ..models import create as create_tables, Issue, IssueInstance, PrimaryKey
+from ..memory_budget import MemoryBudget
+from ..models import (
+    create as create_tables,
+    Issue,
+    IssueInstance,
+    PrimaryKey,
+    TraceFrame,
+    TraceFrameLeafAssoc,
+)
+from ..trace_graph import TraceGraph
 from .fake_object_generator import FakeObjectGenerator
 
 
@@ -106,3 +119,92 @@ class BulkSaverTest(TestCase):
         issue2 = self.fakes.issue()
         self.fakes.instance(issue_id=issue2.id)
         self.fakes.save_all(self.db)
+
+    def test_stream_trace_graph(self) -> None:
+        graph = TraceGraph()
+        fakes = FakeObjectGenerator(graph)
+        source = fakes.source("source")
+        frames = [
+            fakes.precondition(
+                caller=f"caller{index}", callee="leaf", leaves=[(source, 1)]
+            )
+            for index in range(3)
+        ]
+        saver = BulkSaver()
+        graph.update_bulk_saver(saver)
+        # Frames are not copied and assocs are only created when saved.
+        self.assertEqual(saver.saving[TraceFrame.__name__], [])
+        self.assertEqual(saver.saving[TraceFrameLeafAssoc.__name__], [])
+        self.assertEqual(saver.get_item_count(TraceFrame), 3)
+        self.assertEqual(
+            [frame.id for frame in saver.get_items_to_add(TraceFrame)],
+            [frame.id for frame in frames],
+        )
+        self.assertEqual(len(saver.get_items_to_add(TraceFrameLeafAssoc)), 3)
+
+        saver.prepare_all(self.db)
+        saver.save_all(self.db)
+        with self.db.make_session() as session:
+            self.assertEqual(
+                {
+                    id.resolved()
+                    for id in session.execute(select(TraceFrame.id)).scalars()
+                },
+                {frame.id.resolved() for frame in frames},
+            )
+            self.assertEqual(
+                session.execute(
+                    select(func.count()).select_from(TraceFrameLeafAssoc)
+                ).scalar(),
+                3,
+            )
+
+    def test_background_writes(self) -> None:
+        graph = TraceGraph()
+        fakes = FakeObjectGenerator(graph)
+        source = fakes.source("source")
+        for index in range(5):
+            fakes.precondition(
+                caller=f"caller{index}", callee="leaf", leaves=[(source, 1)]
+            )
+
+        with tempfile.TemporaryDirectory() as directory:
+            database = DB(DBType.SQLITE, os.path.join(directory, "sapp.db"))
+            create_tables(database)
+            saver = BulkSaver(background_writes=True)
+            saver.BATCH_SIZE = 2
+            graph.update_bulk_saver(saver)
+            saver.prepare_all(database)
+            # Frames, their leaf assocs, and the shared texts of the source, the
+            # file and the 6 callables.
+            self.assertEqual(saver.save_all(database), 5 + 5 + 8)
+            with database.make_session() as session:
+                for model in (TraceFrame, TraceFrameLeafAssoc):
+                    self.assertEqual(
+                        session.execute(
+                            select(func.count()).select_from(model)
+                        ).scalar(),
+                        5,
+                    )
+
+            # Errors of the writer thread are raised by the saver.
+            saver = BulkSaver(background_writes=True)
+            graph.update_bulk_saver(saver)
+            saver.prepare_all(database)
+            with patch.object(
+                BulkSaver, "_save_batch", side_effect=OSError("Disk full")
+            ):
+                with self.assertRaises(OSError):
+                    saver.save_all(database)
+
+            # Near the memory budget, each batch is written before the next one
+            # is queued.
+            database = DB(DBType.SQLITE, os.path.join(directory, "budget.db"))
+            create_tables(database)
+            saver = BulkSaver(
+                background_writes=True, memory_budget=MemoryBudget(limit_in_gb=1e-6)
+            )
+            saver.BATCH_SIZE = 2
+            graph.update_bulk_saver(saver)
+            saver.prepare_all(database)
+            self.assertEqual(saver.save_all(database), 5 + 5 + 8)
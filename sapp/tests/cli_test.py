@@ -14,13 +14,16 @@ from functools import partial
 from pathlib import Path
 from typing import Generator
 from unittest import TestCase
-from unittest.mock import MagicMock, patch
+from unittest.mock import call, MagicMock, patch
 
 from click.testing import CliRunner, Result
 
 from .. import __name__ as client
 from ..cli import cli
-from ..pipeline import Summary
+from ..json_decoder import JSONDecoder
+from ..pipeline import FramesStore, Summary
+from ..pipeline.linemap import Linemap
+from ..pipeline.pysa_taint_parser import Parser as PysaParser
 
 PIPELINE_RUN = f"{client}.pipeline.Pipeline.run"
 
@@ -150,6 +153,198 @@ class TestSappCli(TestCase):
                 )
             assert_successful_exit(result)
 
+    def test_option_jobs(self, mock_analysis_output: MagicMock) -> None:
+        with (
+            patch(PIPELINE_RUN, self.verify_input_file),
+            patch(f"{client}.cli_lib.ParallelParser") as parallel_parser,
+        ):
+            with isolated_fs() as path:
+                result = self.runner.invoke(cli, ["analyze", "--jobs", "4", path])
+                assert_successful_exit(result)
+        parallel_parser.assert_called_once_with(
+            PysaParser,
+            set(),
+            processes=4,
+            frames_store=FramesStore.MEMORY,
+            parse_cache_directory=None,
+            incremental=None,
+        )
+
+    def test_option_parse_cache(self, mock_analysis_output: MagicMock) -> None:
+        with (
+            patch(PIPELINE_RUN, self.verify_input_file),
+            patch(f"{client}.cli_lib.ParallelParser") as parallel_parser,
+        ):
+            with isolated_fs() as path:
+                result = self.runner.invoke(
+                    cli, ["analyze", "--parse-cache", "cache", path]
+                )
+                assert_successful_exit(result)
+        parallel_parser.assert_called_once_with(
+            PysaParser,
+            set(),
+            processes=1,
+            frames_store=FramesStore.MEMORY,
+            parse_cache_directory="cache",
+            incremental=None,
+        )
+
+    def test_option_trace_jobs(self, mock_analysis_output: MagicMock) -> None:
+        with (
+            patch(PIPELINE_RUN, self.verify_input_file),
+            patch(f"{client}.cli_lib.ModelGenerator") as model_generator,
+        ):
+            with isolated_fs() as path:
+                result = self.runner.invoke(cli, ["analyze", "--trace-jobs", "4", path])
+                assert_successful_exit(result)
+        model_generator.assert_called_once_with(processes=4)
+
+    def test_option_previous_run_id(self, mock_analysis_output: MagicMock) -> None:
+        with patch(PIPELINE_RUN, self.verify_input_file):
+            with isolated_fs() as path:
+                result = self.runner.invoke(
+                    cli, ["analyze", "--previous-run-id", "1", path]
+                )
+        self.assertEqual(result.exit_code, 2)
+        self.assertIn("--previous-run-id requires --shard-manifest", result.output)
+
+    def test_option_frames_store_lazy(self, mock_analysis_output: MagicMock) -> None:
+        with patch(PIPELINE_RUN, self.verify_input_file):
+            with isolated_fs() as path:
+                result = self.runner.invoke(
+                    cli, ["analyze", "--frames-store", "lazy", "--jobs", "2", path]
+                )
+        self.assertEqual(result.exit_code, 2)
+        self.assertIn("--frames-store lazy is only supported", result.output)
+
+    def test_option_resume_from(self, mock_analysis_output: MagicMock) -> None:
+        with patch(PIPELINE_RUN, self.verify_input_file):
+            with isolated_fs() as path:
+                result = self.runner.invoke(
+                    cli, ["analyze", "--resume-from", "DatabaseSaver", path]
+                )
+        self.assertEqual(result.exit_code, 2)
+        self.assertIn("--resume-from requires --checkpoint-directory", result.output)
+
+    def test_option_checkpoint_step(self, mock_analysis_output: MagicMock) -> None:
+        with (
+            patch(PIPELINE_RUN, self.verify_input_file),
+            patch(f"{client}.cli_lib.Checkpoints") as checkpoints,
+        ):
+            with isolated_fs() as path:
+                result = self.runner.invoke(
+                    cli, ["analyze", "--checkpoint-directory", "checkpoints", path]
+                )
+                assert_successful_exit(result)
+                result = self.runner.invoke(
+                    cli,
+                    [
+                        "analyze",
+                        "--checkpoint-directory",
+                        "checkpoints",
+                        "--checkpoint-step",
+                        "TrimTraceGraph",
+                        path,
+                    ],
+                )
+                assert_successful_exit(result)
+        self.assertEqual(
+            checkpoints.call_args_list,
+            [
+                call("checkpoints", ["Parser", "ModelGenerator"]),
+                call("checkpoints", ("TrimTraceGraph",)),
+            ],
+        )
+
+    def test_option_memory_budget(self, mock_analysis_output: MagicMock) -> None:
+        with (
+            patch(PIPELINE_RUN, self.verify_input_file),
+            patch(f"{client}.cli_lib.DatabaseSaver") as database_saver,
+            patch(
+                f"{client}.pipeline.pysa_taint_parser.Parser.__init__",
+                return_value=None,
+            ) as parser,
+        ):
+            with isolated_fs() as path:
+                result = self.runner.invoke(
+                    cli, ["analyze", "--memory-budget", "2.5", path]
+                )
+                assert_successful_exit(result)
+        memory_budget = database_saver.call_args.kwargs["memory_budget"]
+        self.assertEqual(memory_budget.limit_in_gb, 2.5)
+        parser.assert_called_once_with(memory_budget=memory_budget)
+
+    def test_option_memory_budget_with_frames_store(
+        self, mock_analysis_output: MagicMock
+    ) -> None:
+        with (
+            patch(PIPELINE_RUN, self.verify_input_file),
+            self.assertLogs("sapp", level="WARNING") as logs,
+        ):
+            with isolated_fs() as path:
+                result = self.runner.invoke(
+                    cli,
+                    [
+                        "analyze",
+                        "--memory-budget",
+                        "2.5",
+                        "--frames-store",
+                        "disk",
+                        path,
+                    ],
+                )
+                assert_successful_exit(result)
+        self.assertIn("--frames-store disk are not spilled", logs.output[0])
+
+    def test_option_frames_store(self, mock_analysis_output: MagicMock) -> None:
+        with (
+            patch(PIPELINE_RUN, self.verify_input_file),
+            patch(
+                f"{client}.pipeline.pysa_taint_parser.Parser.__init__",
+                return_value=None,
+            ) as parser,
+        ):
+            with isolated_fs() as path:
+                result = self.runner.invoke(
+                    cli, ["analyze", "--frames-store", "disk", path]
+                )
+                assert_successful_exit(result)
+        parser.assert_called_once_with(frames_store=FramesStore.DISK)
+
+    def test_default_frames_store(self, mock_analysis_output: MagicMock) -> None:
+        with (
+            patch(PIPELINE_RUN, self.verify_input_file),
+            patch(
+                f"{client}.pipeline.pysa_taint_parser.Parser.__init__",
+                return_value=None,
+            ) as parser,
+        ):
+            with isolated_fs() as path:
+                result = self.runner.invoke(cli, ["analyze", path])
+                assert_successful_exit(result)
+        parser.assert_called_once_with()
+
+    def test_option_json_decoder(self, mock_analysis_output: MagicMock) -> None:
+        with (
+            patch(PIPELINE_RUN, self.verify_input_file),
+            patch(f"{client}.cli.set_decoder") as set_decoder,
+        ):
+            with isolated_fs() as path:
+                result = self.runner.invoke(
+                    cli, ["--json-decoder", "json", "analyze", path]
+                )
+                assert_successful_exit(result)
+        set_decoder.assert_called_once_with(JSONDecoder.STDLIB)
+
+    def test_linemap_convert(self, mock_analysis_output: MagicMock) -> None:
+        with isolated_fs():
+            Path("linemap.json").write_text('{"module.py": {"5": [3]}}')
+            result = self.runner.invoke(
+                cli, ["linemap", "convert", "linemap.json", "linemap.bin"]
+            )
+            assert_successful_exit(result)
+            self.assertEqual(Linemap.load("linemap.bin").old_lines("module.py", 5), [3])
+
 
 def assert_successful_exit(r: Result) -> None:
     # pyre bug: using the variable name `result` leads to a wrong type error.
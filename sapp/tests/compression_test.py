@@ -0,0 +1,106 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import gzip
+import io
+import os
+import tempfile
+from typing import List
+from unittest import TestCase
+
+import zstandard
+
+from ..analysis_output import AnalysisOutput
+from ..compression import open_text
+
+LINES: List[str] = [
+    f'{{"index": {index}, "name": "é{index}"}}\n' for index in range(5000)
+]
+DATA: bytes = "".join(LINES).encode()
+
+
+def write(path: str, data: bytes) -> str:
+    with open(path, "wb") as handle:
+        handle.write(data)
+    return path
+
+
+class CompressionTest(TestCase):
+    def test_open_text(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            paths = [
+                write(os.path.join(directory, "output.json"), DATA),
+                write(os.path.join(directory, "output.json.gz"), gzip.compress(DATA)),
+                # Multiple frames, as written by parallel zstd.
+                write(
+                    os.path.join(directory, "output.json.zst"),
+                    zstandard.compress(DATA[:1000]) + zstandard.compress(DATA[1000:]),
+                ),
+            ]
+            for path in paths:
+                for threaded in (False, True):
+                    with open_text(path, threaded) as handle:
+                        lines, offsets = [], []
+                        offset, line = handle.tell(), handle.readline()
+                        while line:
+                            lines.append(line)
+                            offsets.append(offset)
+                            offset, line = handle.tell(), handle.readline()
+                    self.assertEqual(lines, LINES)
+                    # Offsets are positions in the decompressed data.
+                    self.assertEqual(offsets[1], len(LINES[0].encode()))
+
+    def test_close_before_end(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = write(
+                os.path.join(directory, "output.json.zst"),
+                zstandard.compress(DATA * 50),
+            )
+            handle = open_text(path, threaded=True)
+            self.assertEqual(handle.readline(), LINES[0])
+            handle.close()
+            with self.assertRaises(ValueError):
+                handle.readline()
+
+    def test_seek(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = write(os.path.join(directory, "output.json.gz"), gzip.compress(DATA))
+            with open_text(path) as handle:
+                handle.readline()
+                with self.assertRaises(io.UnsupportedOperation):
+                    handle.seek(0)
+
+            offset = len("".join(LINES[:3000]).encode())
+            with open_text(path) as handle:
+                # Seeking forward decompresses up to the offset.
+                handle.seek(offset)
+                self.assertEqual(handle.readline(), LINES[3000])
+
+    def test_compressed_shards(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            write(
+                os.path.join(directory, "output@00000-of-00002.json.zst"),
+                zstandard.compress(DATA[:1000]),
+            )
+            write(
+                os.path.join(directory, "output@00001-of-00002.json.gz"),
+                gzip.compress(DATA[1000:]),
+            )
+            for spec in ("output@*.json", "output@2.json"):
+                analysis_output = AnalysisOutput.from_file(
+                    os.path.join(directory, spec)
+                )
+                self.assertEqual(
+                    [os.path.basename(name) for name in analysis_output.file_names()],
+                    ["output@00000-of-00002.json.zst", "output@00001-of-00002.json.gz"],
+                )
+                self.assertEqual(
+                    "".join(
+                        handle.read() for handle in analysis_output.file_handles()
+                    ).encode(),
+                    DATA,
+                )
@@ -0,0 +1,61 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+from unittest import TestCase
+
+from ..frame_adjacency import FrameAdjacency
+from ..models import TraceKind
+
+
+class FrameAdjacencyTest(TestCase):
+    def test_lookup(self) -> None:
+        adjacency = FrameAdjacency(
+            [
+                (TraceKind.precondition, 2, "formal(x)", [7, 5]),
+                (TraceKind.precondition, 2, "result", [6]),
+                (TraceKind.precondition, 1, "result", [3]),
+                (TraceKind.postcondition, 2, "formal(x)", [8]),
+                # Frames of the same key are combined.
+                (TraceKind.precondition, 2, "formal(x)", [9, 5]),
+                (TraceKind.precondition, 3, "leaf", []),
+            ]
+        )
+        self.assertEqual(
+            list(adjacency.frame_ids(TraceKind.precondition, 2, "formal(x)")),
+            [5, 7, 9],
+        )
+        self.assertEqual(
+            list(adjacency.frame_ids(TraceKind.postcondition, 2, "formal(x)")), [8]
+        )
+        self.assertEqual(
+            list(adjacency.frame_ids(TraceKind.postcondition, 2, "result")), []
+        )
+        self.assertEqual(
+            list(adjacency.frame_ids(TraceKind.precondition, 3, "leaf")), []
+        )
+        self.assertEqual(
+            list(adjacency.frame_ids(TraceKind.precondition, 2, "missing")), []
+        )
+        self.assertEqual(
+            {
+                port: list(frame_ids)
+                for port, frame_ids in adjacency.ports(TraceKind.precondition, 2)
+            },
+            {"formal(x)": [5, 7, 9], "result": [6]},
+        )
+        self.assertEqual(
+            sorted(
+                (kind.name, text_id, port, list(frame_ids))
+                for kind, text_id, port, frame_ids in adjacency.entries()
+            ),
+            [
+                ("postcondition", 2, "formal(x)", [8]),
+                ("precondition", 1, "result", [3]),
+                ("precondition", 2, "formal(x)", [5, 7, 9]),
+                ("precondition", 2, "result", [6]),
+            ],
+        )
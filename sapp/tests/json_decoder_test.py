@@ -0,0 +1,48 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import os
+from unittest import TestCase
+from unittest.mock import patch
+
+from .. import json_decoder
+from ..json_decoder import ENVIRONMENT_VARIABLE, JSONDecoder
+
+
+class JSONDecoderTest(TestCase):
+    def setUp(self) -> None:
+        self.decoder: JSONDecoder = json_decoder.decoder()
+        environment = patch.dict(os.environ)
+        environment.start()
+        self.addCleanup(environment.stop)
+
+    def tearDown(self) -> None:
+        json_decoder.set_decoder(self.decoder)
+
+    def test_decoders_agree(self) -> None:
+        line = '{"kind": "issue", "data": {"line": 1, "features": ["a", "\\u00e9"]}}'
+        for decoder in json_decoder.available_decoders():
+            json_decoder.set_decoder(decoder)
+            self.assertEqual(os.environ[ENVIRONMENT_VARIABLE], decoder.value)
+            self.assertEqual(
+                json_decoder.loads(line),
+                {"kind": "issue", "data": {"line": 1, "features": ["a", "é"]}},
+            )
+            self.assertEqual(
+                json_decoder.loads(line.encode()), json_decoder.loads(line)
+            )
+            with self.assertRaises(ValueError):
+                json_decoder.loads('{"kind": ')
+
+    def test_default_decoder(self) -> None:
+        self.assertIn(JSONDecoder.STDLIB, json_decoder.available_decoders())
+        with patch.dict(os.environ, {ENVIRONMENT_VARIABLE: "json"}):
+            self.assertEqual(json_decoder._default_decoder(), JSONDecoder.STDLIB)
+        with patch.dict(os.environ, {ENVIRONMENT_VARIABLE: "unknown"}):
+            self.assertEqual(
+                json_decoder._default_decoder(), json_decoder.available_decoders()[0]
+            )
@@ -0,0 +1,43 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+from unittest import TestCase
+
+from ..memory_report import collection_usage, format_report, MemoryUsage, merge_reports
+from ..trace_graph import TraceGraph
+from .fake_object_generator import FakeObjectGenerator
+
+
+class MemoryReportTest(TestCase):
+    def test_collection_usage(self) -> None:
+        small = collection_usage({index: (index,) for index in range(10)})
+        large = collection_usage({index: (index,) * 100 for index in range(10)})
+        self.assertEqual(small.count, 10)
+        self.assertGreater(large.bytes, small.bytes)
+        self.assertEqual(collection_usage([]).count, 0)
+
+    def test_merge_and_format(self) -> None:
+        report = merge_reports(
+            [
+                {"frames": MemoryUsage(1, 2**20), "texts": MemoryUsage(0, 0)},
+                {"frames": MemoryUsage(2, 2**20)},
+            ]
+        )
+        self.assertEqual(report["frames"], MemoryUsage(3, 2**21))
+        self.assertEqual(format_report(report), "total 2.0 MB, frames 2.0 MB (3)")
+
+    def test_trace_graph(self) -> None:
+        graph = TraceGraph()
+        generator = FakeObjectGenerator(graph)
+        generator.precondition(caller="a", callee="b")
+        generator.precondition(caller="b", callee="c")
+        report = graph.memory_report()
+        self.assertEqual(report["trace_frames"].count, 2)
+        self.assertEqual(report["issues"].count, 0)
+        self.assertGreater(report["trace_frames"].bytes, 0)
+        graph.compact()
+        self.assertEqual(graph.memory_report()["trace_frame_index"].count, 4)
@@ -0,0 +1,87 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+from typing import List, Set
+from unittest import TestCase
+
+from ..models import LeafMapping, TraceFrame, TraceKind
+from ..trace_graph import TraceGraph
+from .fake_object_generator import FakeObjectGenerator
+
+
+class TraceGraphTest(TestCase):
+    def test_leaf_kind_masks(self) -> None:
+        graph = TraceGraph()
+        # Leaf kind 3 is the transform T@3 of leaf kind 2.
+        frame = FakeObjectGenerator(graph).precondition()
+        leaf_mapping = frame.leaf_mapping
+        leaf_mapping.update(
+            {
+                LeafMapping(caller_leaf=1, callee_leaf=1, raw_kind=1),
+                LeafMapping(caller_leaf=2, callee_leaf=3, raw_kind=4),
+            }
+        )
+
+        for leaves in [set(), {1}, {2}, {3}, {1, 2, 3}]:
+            mask = graph.leaf_kinds_mask(leaves)
+            self.assertEqual(graph.leaf_kinds_from_mask(mask), leaves)
+            self.assertEqual(
+                graph.leaf_kinds_from_mask(graph.next_leaf_kinds_mask(mask, frame)),
+                graph.compute_next_leaf_kinds(leaves, leaf_mapping),
+            )
+            self.assertEqual(
+                graph.leaf_kinds_from_mask(graph.prev_leaf_kinds_mask(mask, frame)),
+                graph.compute_prev_leaf_kinds(leaves, leaf_mapping),
+            )
+
+        # Masks follow leaf maps added to the frame.
+        leaf_mapping.add(LeafMapping(caller_leaf=5, callee_leaf=5, raw_kind=5))
+        self.assertEqual(
+            graph.leaf_kinds_from_mask(graph.leaf_mapping_masks(frame).caller_kinds),
+            {1, 2, 5},
+        )
+
+    def test_compact(self) -> None:
+        graph = TraceGraph()
+        generator = FakeObjectGenerator(graph)
+        first = generator.precondition(caller="a", callee="b", callee_port="x")
+        second = generator.precondition(caller="a", caller_port="y", callee="b")
+        graph.compact()
+        # Frames added after compaction are found along with compacted ones.
+        third = generator.precondition(caller="a", callee="c", callee_port="x")
+
+        def ids(frames: List[TraceFrame]) -> Set[int]:
+            return {frame.id.local_id for frame in frames}
+
+        for _ in range(2):
+            self.assertEqual(
+                ids(
+                    graph.get_trace_frames_from_caller(
+                        TraceKind.precondition, first.caller_id, first.caller_port
+                    )
+                ),
+                ids([first, third]),
+            )
+            self.assertEqual(
+                ids(
+                    graph.get_all_trace_frames_from_caller(
+                        TraceKind.precondition, first.caller_id
+                    )
+                ),
+                ids([first, second, third]),
+            )
+            self.assertEqual(
+                ids(
+                    graph.get_trace_frames_from_callee(
+                        TraceKind.precondition, first.callee_id, "x"
+                    )
+                ),
+                ids([first]),
+            )
+            self.assertTrue(graph.has_preconditions_with_caller(first.caller_id, "y"))
+            self.assertFalse(graph.has_postconditions_with_caller(first.caller_id, "y"))
+            graph.compact()
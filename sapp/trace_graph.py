@@ -8,15 +8,36 @@
 import logging
 import re
 from collections import defaultdict
-from typing import cast, DefaultDict, Dict, Iterable, List, Optional, Set, Tuple
+from typing import (
+    Any,
+    cast,
+    Collection,
+    DefaultDict,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+)
+
+from munch import Munch
 
 from .bulk_saver import BulkSaver
+from .frame_adjacency import AdjacencyEntry, FrameAdjacency
+from .memory_report import collection_usage, MemoryReport, MemoryUsage
 from .models import (
     ClassTypeInterval,
     DBID,
     Issue,
     IssueInstance,
     IssueInstanceFixInfo,
+    IssueInstanceSharedTextAssoc,
+    IssueInstanceTraceFrameAssoc,
     LeafMapping,
     MetaRunIssueInstanceIndex,
     SHARED_TEXT_LENGTH,
@@ -24,8 +45,11 @@ from .models import (
     SharedTextKind,
     TraceFrame,
     TraceFrameAnnotation,
+    TraceFrameAnnotationTraceFrameAssoc,
+    TraceFrameLeafAssoc,
     TraceKind,
 )
+from .pipeline.string_pool import StringPool
 
 log: logging.Logger = logging.getLogger("sapp")
 
@@ -36,6 +60,26 @@ FeatureID = int
 InstanceID = int
 
 
+def _assoc_count(assoc: Mapping[int, Collection[object]]) -> int:
+    return sum(len(ids) for ids in assoc.values())
+
+
+class LeafMappingMasks(NamedTuple):
+    """The leaf mapping of a trace frame over the bits of
+    `TraceGraph.leaf_kind_bit`."""
+
+    # Number of leaf maps the masks were computed from. Leaf mappings only grow.
+    size: int
+    caller_kinds: int
+    callee_kinds: int
+    # Caller kinds that map to themselves.
+    identity_kinds: int
+    # Caller and callee kind of the other leaf maps.
+    transforms: Tuple[Tuple[int, int], ...]
+    # Callee kind and raw kind id of each leaf map.
+    raw_kinds: Tuple[Tuple[int, int], ...]
+
+
 class TraceGraph:
     """Represents a graph of the Zoncolan trace steps. Nodes of the graph are
     the issues, preconditions, postconditions, sources and sinks. Edges are
@@ -44,7 +88,14 @@ class TraceGraph:
     'callee->caller' gives the reverse edge.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, string_pool: Optional[StringPool] = None) -> None:
+        """
+        string_pool: Strings of the parsed entries the graph is built from.
+        Contents of new shared texts are interned in it.
+        """
+        self.string_pool: StringPool = (
+            StringPool() if string_pool is None else string_pool
+        )
         self._issues: Dict[int, Issue] = {}
         self._issue_instances: Dict[int, IssueInstance] = {}
         self._trace_annotations: Dict[int, TraceFrameAnnotation] = {}
@@ -68,6 +119,10 @@ class TraceGraph:
             TraceKind, DefaultDict[Tuple[int, str], Set[int]]
         ] = defaultdict(lambda: defaultdict(set))
 
+        # Frames indexed before the last `compact`.
+        self._compact_trace_frames_map: Optional[FrameAdjacency] = None
+        self._compact_trace_frames_rev_map: Optional[FrameAdjacency] = None
+
         self._trace_frames: Dict[int, TraceFrame] = {}
 
         self._shared_texts: Dict[int, SharedText] = {}
@@ -116,6 +171,12 @@ class TraceGraph:
             Dict[FrameID, Set[FeatureID]], defaultdict(lambda: set())
         )
 
+        # Leaf kinds are numbered densely as they are first seen, so that sets
+        # of leaf kinds can be combined as bit masks while exploring traces.
+        self._leaf_kind_bits: Dict[int, int] = {}
+        self._leaf_kind_ids: List[int] = []
+        self._leaf_mapping_masks: Dict[int, LeafMappingMasks] = {}
+
     # !!!!! IMPORTANT !!!!!
     # IF YOU ARE ADDING MORE FIELDS/EDGES TO THIS GRAPH, CHECK IF
     # TrimmedTraceGraph NEEDS TO BE UPDATED AS WELL.
@@ -196,9 +257,9 @@ class TraceGraph:
     ) -> bool:
         return any(
             run_id in (None, self._trace_frames[trace_frame_id].run_id)
-            for trace_frame_id in self._trace_frames_map.get(kind, {})
-            .get(caller_id.local_id, {})
-            .get(caller_port, set())
+            for trace_frame_id in self.get_trace_frame_ids_from_caller(
+                kind, caller_id.local_id, caller_port
+            )
         )
 
     def has_postconditions_with_caller(self, caller_id: DBID, caller_port: str) -> bool:
@@ -243,6 +304,68 @@ class TraceGraph:
         self._trace_frames_rev_map[kind][rev_key].add(trace_frame.id.local_id)
         self._trace_frames[trace_frame.id.local_id] = trace_frame
 
+    def compact(self) -> None:
+        """Moves the index of frames by caller and by callee into arrays.
+
+        Frames added afterwards are indexed in dictionaries again, until the
+        next compaction. Frames cannot be removed from a compacted index.
+        """
+        if self._compact_trace_frames_map is not None and not self._trace_frames_map:
+            return
+
+        forward: List[Iterable[AdjacencyEntry]] = [
+            (
+                (kind, caller_id, caller_port, frame_ids)
+                for kind, callers in self._trace_frames_map.items()
+                for caller_id, ports in callers.items()
+                for caller_port, frame_ids in ports.items()
+            )
+        ]
+        reverse: List[Iterable[AdjacencyEntry]] = [
+            (
+                (kind, callee_id, callee_port, frame_ids)
+                for kind, callees in self._trace_frames_rev_map.items()
+                for (callee_id, callee_port), frame_ids in callees.items()
+            )
+        ]
+        compact_map = self._compact_trace_frames_map
+        if compact_map is not None:
+            forward.append(compact_map.entries())
+        compact_rev_map = self._compact_trace_frames_rev_map
+        if compact_rev_map is not None:
+            reverse.append(compact_rev_map.entries())
+
+        self._compact_trace_frames_map = FrameAdjacency(
+            entry for entries in forward for entry in entries
+        )
+        self._compact_trace_frames_rev_map = FrameAdjacency(
+            entry for entries in reverse for entry in entries
+        )
+        self._trace_frames_map.clear()
+        self._trace_frames_rev_map.clear()
+
+    def get_trace_frame_ids_from_caller(
+        self, kind: TraceKind, caller_id: int, caller_port: str
+    ) -> List[int]:
+        frame_ids = list(
+            self._trace_frames_map.get(kind, {}).get(caller_id, {}).get(caller_port, ())
+        )
+        compact_map = self._compact_trace_frames_map
+        if compact_map is not None:
+            frame_ids.extend(compact_map.frame_ids(kind, caller_id, caller_port))
+        return frame_ids
+
+    def get_trace_frame_ids_from_callee(
+        self, kind: TraceKind, callee_id: int, callee_port: str
+    ) -> List[int]:
+        frame_ids = list(
+            self._trace_frames_rev_map.get(kind, {}).get((callee_id, callee_port), ())
+        )
+        compact_rev_map = self._compact_trace_frames_rev_map
+        if compact_rev_map is not None:
+            frame_ids.extend(compact_rev_map.frame_ids(kind, callee_id, callee_port))
+        return frame_ids
+
     def get_trace_frames_from_caller(
         self,
         kind: TraceKind,
@@ -252,9 +375,9 @@ class TraceGraph:
     ) -> List[TraceFrame]:
         return [
             self._trace_frames[trace_frame_id]
-            for trace_frame_id in self._trace_frames_map[kind][caller_id.local_id][
-                caller_port
-            ]
+            for trace_frame_id in self.get_trace_frame_ids_from_caller(
+                kind, caller_id.local_id, caller_port
+            )
             if run_id in (None, self._trace_frames[trace_frame_id].run_id)
         ]
 
@@ -263,9 +386,9 @@ class TraceGraph:
     ) -> List[TraceFrame]:
         return [
             self._trace_frames[trace_frame_id]
-            for trace_frame_id in self._trace_frames_rev_map[kind][
-                (callee_id.local_id, callee_port)
-            ]
+            for trace_frame_id in self.get_trace_frame_ids_from_callee(
+                kind, callee_id.local_id, callee_port
+            )
         ]
 
     def get_all_trace_frames_from_caller(
@@ -274,9 +397,14 @@ class TraceGraph:
         caller_id: DBID,
     ) -> List[TraceFrame]:
         frame_ids = []
-        ports = self._trace_frames_map[kind][caller_id.local_id]
-        for port in ports:
-            frame_ids.extend(ports[port])
+        for port_frame_ids in (
+            self._trace_frames_map.get(kind, {}).get(caller_id.local_id, {}).values()
+        ):
+            frame_ids.extend(port_frame_ids)
+        compact_map = self._compact_trace_frames_map
+        if compact_map is not None:
+            for _, port_frame_ids in compact_map.ports(kind, caller_id.local_id):
+                frame_ids.extend(port_frame_ids)
         return [self._trace_frames[trace_frame_id] for trace_frame_id in frame_ids]
 
     def get_trace_frame_from_id(self, id: int) -> TraceFrame:
@@ -303,7 +431,9 @@ class TraceGraph:
         name = name[:SHARED_TEXT_LENGTH]
         shared_text = self.get_shared_text(kind, name)
         if shared_text is None:
-            shared_text = SharedText.Record(id=DBID(), contents=name, kind=kind)
+            shared_text = SharedText.Record(
+                id=DBID(), contents=self.string_pool.intern(name), kind=kind
+            )
             self.add_shared_text(shared_text)
         return shared_text
 
@@ -409,46 +539,74 @@ class TraceGraph:
         ]
 
     def update_bulk_saver(self, bulk_saver: BulkSaver) -> None:
+        """Hands the contents of the graph to the bulk saver. Frames and other
+        records held by the graph are streamed from their maps, and assoc
+        records are only created while they are saved, so that saving does not
+        hold a second copy of the graph.
+        """
         bulk_saver.add_all(list(self._issues.values()))
         bulk_saver.add_all(list(self._issue_instances.values()))
-        bulk_saver.add_all(list(self._trace_frames.values()))
-        bulk_saver.add_all(list(self._issue_instance_fix_info.values()))
-        bulk_saver.add_all(list(self._trace_annotations.values()))
         bulk_saver.add_all(list(self._shared_texts.values()))
-        bulk_saver.add_all(list(self._class_type_intervals.values()))
-        bulk_saver.add_all(list(self._meta_run_issue_instances.values()))
-
-        self._save_issue_instance_trace_frame_assoc(bulk_saver)
-        self._save_trace_frame_leaf_assoc(bulk_saver)
-        self._save_issue_instance_shared_text_assoc(bulk_saver)
-        self._save_trace_frame_annotation_trace_frame_assoc(bulk_saver)
+        for cls, records in [
+            (TraceFrame, self._trace_frames),
+            (IssueInstanceFixInfo, self._issue_instance_fix_info),
+            (TraceFrameAnnotation, self._trace_annotations),
+            (ClassTypeInterval, self._class_type_intervals),
+            (MetaRunIssueInstanceIndex, self._meta_run_issue_instances),
+        ]:
+            bulk_saver.add_stream(cls, records.values, len(records))
+
+        bulk_saver.add_stream(
+            IssueInstanceTraceFrameAssoc,
+            self._issue_instance_trace_frame_assocs,
+            _assoc_count(self._trace_frame_issue_instance_assoc),
+        )
+        bulk_saver.add_stream(
+            TraceFrameLeafAssoc,
+            self._trace_frame_leaf_assocs,
+            _assoc_count(self._trace_frame_leaf_assoc),
+        )
+        bulk_saver.add_stream(
+            IssueInstanceSharedTextAssoc,
+            self._issue_instance_shared_text_assocs,
+            _assoc_count(self._shared_text_issue_instance_assoc),
+        )
+        bulk_saver.add_stream(
+            TraceFrameAnnotationTraceFrameAssoc,
+            self._trace_frame_annotation_trace_frame_assocs,
+            _assoc_count(self._trace_frame_annotation_trace_frame_assoc),
+        )
 
-    def _save_issue_instance_trace_frame_assoc(self, bulk_saver: BulkSaver) -> None:
+    def _issue_instance_trace_frame_assocs(
+        self,
+    ) -> Iterator[IssueInstanceTraceFrameAssoc]:
         for (
             trace_frame_id,
             instance_ids,
         ) in self._trace_frame_issue_instance_assoc.items():
             for instance_id in instance_ids:
-                bulk_saver.add_issue_instance_trace_frame_assoc(
-                    self._issue_instances[instance_id],
-                    self._trace_frames[trace_frame_id],
+                yield IssueInstanceTraceFrameAssoc.Record(
+                    issue_instance_id=self._issue_instances[instance_id].id,
+                    trace_frame_id=self._trace_frames[trace_frame_id].id,
                 )
 
-    def _save_trace_frame_annotation_trace_frame_assoc(
-        self, bulk_saver: BulkSaver
-    ) -> None:
+    def _trace_frame_annotation_trace_frame_assocs(
+        self,
+    ) -> Iterator[TraceFrameAnnotationTraceFrameAssoc]:
         for (
             trace_annotation_id,
             trace_frame_ids,
         ) in self._trace_frame_annotation_trace_frame_assoc.items():
             for trace_frame_id in trace_frame_ids:
-                bulk_saver.add_trace_frame_annotation_trace_frame_assoc(
-                    self._trace_annotations[trace_annotation_id],
-                    self._trace_frames[trace_frame_id],
+                yield TraceFrameAnnotationTraceFrameAssoc.Record(
+                    trace_frame_annotation_id=self._trace_annotations[
+                        trace_annotation_id
+                    ].id,
+                    trace_frame_id=self._trace_frames[trace_frame_id].id,
                 )
 
-    def _save_trace_frame_leaf_assoc(self, bulk_saver: BulkSaver) -> None:
-        """Adds trace frame leaf assocs to bulk saver after filtering them:
+    def _trace_frame_leaf_assocs(self) -> Iterator[TraceFrameLeafAssoc]:
+        """Trace frame leaf assocs, after filtering them:
         1. if frame is a leaf, include all kinds
         2. otherwise, find outgoing leaf kinds and intersect with union of incoming
            leaf kinds of all successor frames.
@@ -464,7 +622,11 @@ class TraceGraph:
                     or leaf_id in valid_frame_leaf_ids
                     or self._is_opposite_leaf(frame, leaf_text)
                 ):
-                    bulk_saver.add_trace_frame_leaf_assoc(leaf_text, frame, depth)
+                    yield TraceFrameLeafAssoc.Record(
+                        trace_frame_id=frame.id,
+                        leaf_id=leaf_text.id,
+                        trace_length=depth,
+                    )
                 else:
                     # Logging all the leaf kinds that are omitted causes large logs.
                     pass
@@ -479,21 +641,16 @@ class TraceGraph:
         )
 
     def _compute_valid_frame_leaves(self, frame: TraceFrame) -> Set[int]:
-        leaf_mapping = frame.leaf_mapping
-        is_leaf_frame = self.is_leaf_port(frame.callee_port)
-        if not is_leaf_frame:
-            callee_frames = self.get_next_trace_frames(frame)
-            callee_leaf_ids = {
-                callee_map.caller_leaf
-                for callee_frame in callee_frames
-                for callee_map in callee_frame.leaf_mapping
-            }
-        else:
-            callee_leaf_ids = set()
+        raw_kinds = self.leaf_mapping_masks(frame).raw_kinds
+        if self.is_leaf_port(frame.callee_port):
+            return {raw_kind for _, raw_kind in raw_kinds}
+        callee_leaves = 0
+        for callee_frame in self.get_next_trace_frames(frame):
+            callee_leaves |= self.leaf_mapping_masks(callee_frame).caller_kinds
         return {
-            leaf_map.raw_kind
-            for leaf_map in leaf_mapping
-            if is_leaf_frame or (leaf_map.callee_leaf in callee_leaf_ids)
+            raw_kind
+            for callee_kind, raw_kind in raw_kinds
+            if callee_kind & callee_leaves
         }
 
     def is_leaf_port(self, port: str) -> bool:
@@ -508,15 +665,17 @@ class TraceGraph:
             or port.startswith("sink:")
         )
 
-    def _save_issue_instance_shared_text_assoc(self, bulk_saver: BulkSaver) -> None:
+    def _issue_instance_shared_text_assocs(
+        self,
+    ) -> Iterator[IssueInstanceSharedTextAssoc]:
         for (
             shared_text_id,
             instance_ids,
         ) in self._shared_text_issue_instance_assoc.items():
             for instance_id in instance_ids:
-                bulk_saver.add_issue_instance_shared_text_assoc(
-                    self._issue_instances[instance_id],
-                    self._shared_texts[shared_text_id],
+                yield IssueInstanceSharedTextAssoc.Record(
+                    issue_instance_id=self._issue_instances[instance_id].id,
+                    shared_text_id=self._shared_texts[shared_text_id].id,
                 )
 
     def compute_next_leaf_kinds(
@@ -545,6 +704,78 @@ class TraceGraph:
                 next_kinds.add(leaf_map.callee_leaf)
         return next_kinds
 
+    def leaf_kind_bit(self, leaf_id: int) -> int:
+        bit = self._leaf_kind_bits.get(leaf_id)
+        if bit is None:
+            bit = 1 << len(self._leaf_kind_ids)
+            self._leaf_kind_bits[leaf_id] = bit
+            self._leaf_kind_ids.append(leaf_id)
+        return bit
+
+    def leaf_kinds_mask(self, leaf_ids: Iterable[int]) -> int:
+        mask = 0
+        for leaf_id in leaf_ids:
+            mask |= self.leaf_kind_bit(leaf_id)
+        return mask
+
+    def leaf_kinds_from_mask(self, mask: int) -> Set[int]:
+        leaf_ids = set()
+        while mask:
+            bit = mask & -mask
+            leaf_ids.add(self._leaf_kind_ids[bit.bit_length() - 1])
+            mask ^= bit
+        return leaf_ids
+
+    def leaf_mapping_masks(self, trace_frame: TraceFrame) -> LeafMappingMasks:
+        leaf_mapping = trace_frame.leaf_mapping
+        masks = self._leaf_mapping_masks.get(trace_frame.id.local_id)
+        if masks is not None and masks.size == len(leaf_mapping):
+            return masks
+
+        caller_kinds = 0
+        callee_kinds = 0
+        identity_kinds = 0
+        transforms = []
+        raw_kinds = []
+        for leaf_map in leaf_mapping:
+            caller_bit = self.leaf_kind_bit(leaf_map.caller_leaf)
+            callee_bit = self.leaf_kind_bit(leaf_map.callee_leaf)
+            caller_kinds |= caller_bit
+            callee_kinds |= callee_bit
+            if caller_bit == callee_bit:
+                identity_kinds |= caller_bit
+            else:
+                transforms.append((caller_bit, callee_bit))
+            raw_kinds.append((callee_bit, leaf_map.raw_kind))
+        masks = LeafMappingMasks(
+            size=len(leaf_mapping),
+            caller_kinds=caller_kinds,
+            callee_kinds=callee_kinds,
+            identity_kinds=identity_kinds,
+            transforms=tuple(transforms),
+            raw_kinds=tuple(raw_kinds),
+        )
+        self._leaf_mapping_masks[trace_frame.id.local_id] = masks
+        return masks
+
+    def next_leaf_kinds_mask(self, leaves: int, trace_frame: TraceFrame) -> int:
+        """Same as `compute_next_leaf_kinds`, over masks of leaf kinds."""
+        masks = self.leaf_mapping_masks(trace_frame)
+        next_kinds = leaves & masks.identity_kinds
+        for caller_kind, callee_kind in masks.transforms:
+            if leaves & caller_kind:
+                next_kinds |= callee_kind
+        return next_kinds
+
+    def prev_leaf_kinds_mask(self, leaves: int, trace_frame: TraceFrame) -> int:
+        """Same as `compute_prev_leaf_kinds`, over masks of leaf kinds."""
+        masks = self.leaf_mapping_masks(trace_frame)
+        prev_kinds = leaves & masks.identity_kinds
+        for caller_kind, callee_kind in masks.transforms:
+            if leaves & callee_kind:
+                prev_kinds |= caller_kind
+        return prev_kinds
+
     def compute_prev_leaf_kinds(
         self, leaves: Set[int], leaf_mapping: Set[LeafMapping]
     ) -> Set[int]:
@@ -649,3 +880,288 @@ class TraceGraph:
 
     def get_issue_instances_for_root_frame(self, frame_id: FrameID) -> Set[InstanceID]:
         return self._trace_frame_issue_instance_assoc[frame_id]
+
+    def memory_report(self) -> MemoryReport:
+        """Approximate memory used by the records and indexes of the graph."""
+        frame_index = MemoryUsage(0, 0)
+        for frame_map in (self._trace_frames_map, self._trace_frames_rev_map):
+            for frames_by_key in frame_map.values():
+                frame_index += collection_usage(frames_by_key)
+        for compact_map in (
+            self._compact_trace_frames_map,
+            self._compact_trace_frames_rev_map,
+        ):
+            if compact_map is not None:
+                frame_index += MemoryUsage(
+                    compact_map.key_count(), compact_map.nbytes()
+                )
+
+        return {
+            "issues": collection_usage(self._issues),
+            "issue_instances": collection_usage(self._issue_instances),
+            "issue_instance_fix_info": collection_usage(self._issue_instance_fix_info),
+            "trace_frames": collection_usage(self._trace_frames),
+            "trace_frame_index": frame_index,
+            "trace_frame_leaf_assoc": collection_usage(self._trace_frame_leaf_assoc),
+            "leaf_mapping_masks": collection_usage(self._leaf_mapping_masks),
+            "trace_annotations": collection_usage(self._trace_annotations),
+            "shared_texts": collection_usage(self._shared_texts)
+            + collection_usage(self._shared_text_lookup),
+            "string_pool": self.string_pool.memory_usage(),
+            "issue_instance_trace_frame_assoc": collection_usage(
+                self._issue_instance_trace_frame_assoc
+            )
+            + collection_usage(self._trace_frame_issue_instance_assoc),
+            "trace_frame_annotation_trace_frame_assoc": collection_usage(
+                self._trace_frame_annotation_trace_frame_assoc
+            )
+            + collection_usage(self._trace_frame_trace_frame_annotation_assoc),
+            "issue_instance_shared_text_assoc": collection_usage(
+                self._issue_instance_shared_text_assoc
+            )
+            + collection_usage(self._shared_text_issue_instance_assoc),
+            "class_type_intervals": collection_usage(self._class_type_intervals),
+            "meta_run_issue_instances": collection_usage(
+                self._meta_run_issue_instances
+            ),
+        }
+
+    def __getstate__(self) -> Dict[str, object]:
+        """Graphs are pickled without their string pool and without the indexes
+        derived from their records. Records are pickled as their model and
+        fields, since record classes are created at runtime."""
+        return {
+            "shared_texts": [
+                _record_state(text) for text in self._shared_texts.values()
+            ],
+            "issues": [_record_state(issue) for issue in self._issues.values()],
+            "issue_instances": [
+                _record_state(instance) for instance in self._issue_instances.values()
+            ],
+            "trace_frames": [
+                _record_state(frame) for frame in self._trace_frames.values()
+            ],
+            "trace_annotations": [
+                _record_state(annotation)
+                for annotation in self._trace_annotations.values()
+            ],
+            "issue_instance_fix_info": {
+                instance_id: _record_state(fix_info)
+                for instance_id, fix_info in self._issue_instance_fix_info.items()
+            },
+            "class_type_intervals": [
+                _record_state(interval)
+                for interval in self._class_type_intervals.values()
+            ],
+            "meta_run_issue_instances": [
+                _record_state(instance)
+                for instance in self._meta_run_issue_instances.values()
+            ],
+            "trace_frame_leaf_assoc": dict(self._trace_frame_leaf_assoc),
+            "issue_instance_trace_frame_assoc": dict(
+                self._issue_instance_trace_frame_assoc
+            ),
+            "trace_frame_annotation_trace_frame_assoc": dict(
+                self._trace_frame_annotation_trace_frame_assoc
+            ),
+            "issue_instance_shared_text_assoc": dict(
+                self._issue_instance_shared_text_assoc
+            ),
+            "extra_features_to_propagate_up": dict(
+                self._extra_features_to_propagate_up
+            ),
+        }
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        TraceGraph.__init__(self)
+        max_local_id = -1
+        for text in state["shared_texts"]:
+            text = _record_from_state(text)
+            self.add_shared_text(text)
+            self.string_pool.intern(text.contents)
+            max_local_id = max(max_local_id, text.id.local_id)
+        for issue in state["issues"]:
+            issue = _record_from_state(issue)
+            self.add_issue(issue)
+            max_local_id = max(max_local_id, issue.id.local_id)
+        for instance in state["issue_instances"]:
+            instance = _record_from_state(instance)
+            self.add_issue_instance(instance)
+            max_local_id = max(max_local_id, instance.id.local_id)
+        for frame in state["trace_frames"]:
+            frame = _record_from_state(frame)
+            self.add_trace_frame(frame)
+            max_local_id = max(max_local_id, frame.id.local_id)
+        for annotation in state["trace_annotations"]:
+            annotation = _record_from_state(annotation)
+            self.add_trace_annotation(annotation)
+            max_local_id = max(max_local_id, annotation.id.local_id)
+        for instance_id, fix_info in state["issue_instance_fix_info"].items():
+            fix_info = _record_from_state(fix_info)
+            self._issue_instance_fix_info[instance_id] = fix_info
+            max_local_id = max(max_local_id, fix_info.id.local_id)
+        for interval in state["class_type_intervals"]:
+            interval = _record_from_state(interval)
+            self.add_class_type_interval(interval)
+            max_local_id = max(max_local_id, interval.id.local_id)
+        for instance in state["meta_run_issue_instances"]:
+            self.add_meta_run_issue_instance(_record_from_state(instance))
+
+        for frame_id, leaves in state["trace_frame_leaf_assoc"].items():
+            self._trace_frame_leaf_assoc[frame_id].update(leaves)
+        for instance_id, frame_ids in state["issue_instance_trace_frame_assoc"].items():
+            for frame_id in frame_ids:
+                self._issue_instance_trace_frame_assoc[instance_id].add(frame_id)
+                self._trace_frame_issue_instance_assoc[frame_id].add(instance_id)
+        for annotation_id, frame_ids in state[
+            "trace_frame_annotation_trace_frame_assoc"
+        ].items():
+            for frame_id in frame_ids:
+                self._trace_frame_annotation_trace_frame_assoc[annotation_id].add(
+                    frame_id
+                )
+                self._trace_frame_trace_frame_annotation_assoc[frame_id].add(
+                    annotation_id
+                )
+        for instance_id, text_ids in state["issue_instance_shared_text_assoc"].items():
+            for text_id in text_ids:
+                self.add_issue_instance_id_shared_text_assoc_id(instance_id, text_id)
+        for frame_id, feature_ids in state["extra_features_to_propagate_up"].items():
+            self._extra_features_to_propagate_up[frame_id].update(feature_ids)
+
+        # Ids created from now on must not collide with the unpickled ones.
+        DBID.next_id = max(DBID.next_id, max_local_id + 1)
+
+    def merge(self, other: "TraceGraph", run_ids: Iterable[DBID]) -> None:
+        """Adds the records of a graph built separately for the same run, e.g.
+        in another process, under new ids.
+
+        Shared texts are deduplicated by kind and contents. Trace frames from a
+        caller and port are generated from the same models in both graphs, so
+        they are only added if this graph has none yet. Frames starting the
+        traces of an issue instance or the subtraces of an annotation are always
+        added, with their annotations.
+
+        run_ids: Runs of this graph, which records of `other` refer to by
+        local id.
+        """
+        runs = {run_id.local_id: run_id for run_id in run_ids}
+        ids: Dict[int, DBID] = {
+            local_id: self.get_or_add_shared_text(text.kind, text.contents).id
+            for local_id, text in other._shared_texts.items()
+        }
+
+        def remap(record: Any) -> Any:
+            model, fields = _record_state(record)
+            for name, value in fields.items():
+                if name == "run_id":
+                    fields[name] = runs[value.local_id]
+                elif isinstance(value, DBID):
+                    new_id = ids.get(value.local_id)
+                    if new_id is None:
+                        new_id = ids[value.local_id] = type(value)()
+                    fields[name] = new_id
+                elif name == "leaf_mapping":
+                    fields[name] = {
+                        LeafMapping(
+                            caller_leaf=ids[leaf_map.caller_leaf].local_id,
+                            callee_leaf=ids[leaf_map.callee_leaf].local_id,
+                            raw_kind=ids[leaf_map.raw_kind].local_id,
+                        )
+                        for leaf_map in value
+                    }
+            return _record_from_state((model, fields))
+
+        for issue in other._issues.values():
+            self.add_issue(remap(issue))
+        for instance_id, instance in other._issue_instances.items():
+            instance = remap(instance)
+            self.add_issue_instance(instance)
+            fix_info = other._issue_instance_fix_info.get(instance_id)
+            if fix_info is not None:
+                self.add_issue_instance_fix_info(instance, remap(fix_info))
+            meta_run_instance = other._meta_run_issue_instances.get(instance_id)
+            if meta_run_instance is not None:
+                self.add_meta_run_issue_instance(remap(meta_run_instance))
+            for text_id in other._issue_instance_shared_text_assoc.get(instance_id, ()):
+                self.add_issue_instance_id_shared_text_assoc_id(
+                    instance.id.local_id, ids[text_id].local_id
+                )
+
+        # Frames are kept before any of them is added, so that the frames of
+        # `other` do not hide each other.
+        kept_frames = set(other._trace_frame_issue_instance_assoc)
+        for frame_id, frame in other._trace_frames.items():
+            if (
+                frame_id not in other._trace_frame_trace_frame_annotation_assoc
+                and not self.has_trace_frames_with_caller(
+                    frame.kind, ids[frame.caller_id.local_id], frame.caller_port
+                )
+            ):
+                kept_frames.add(frame_id)
+        annotations_by_frame: DefaultDict[int, List[int]] = defaultdict(list)
+        for annotation_id, annotation in other._trace_annotations.items():
+            annotations_by_frame[annotation.trace_frame_id.local_id].append(
+                annotation_id
+            )
+        kept_annotations = set()
+        queue = list(kept_frames)
+        while queue:
+            for annotation_id in annotations_by_frame.get(queue.pop(), ()):
+                kept_annotations.add(annotation_id)
+                for subtrace_id in other._trace_frame_annotation_trace_frame_assoc.get(
+                    annotation_id, ()
+                ):
+                    if subtrace_id not in kept_frames:
+                        kept_frames.add(subtrace_id)
+                        queue.append(subtrace_id)
+
+        for frame_id, frame in other._trace_frames.items():
+            if frame_id not in kept_frames:
+                continue
+            frame = remap(frame)
+            self.add_trace_frame(frame)
+            for leaf_id, depth in other._trace_frame_leaf_assoc.get(
+                frame_id, {}
+            ).items():
+                self.add_trace_frame_leaf_by_local_id_assoc(
+                    frame, ids[leaf_id].local_id, depth
+                )
+            for feature_id in other._extra_features_to_propagate_up.get(frame_id, ()):
+                self._extra_features_to_propagate_up[frame.id.local_id].add(
+                    ids[feature_id].local_id
+                )
+            for instance_id in other._trace_frame_issue_instance_assoc.get(
+                frame_id, ()
+            ):
+                self.add_issue_instance_trace_frame_assoc(
+                    self._issue_instances[ids[instance_id].local_id], frame
+                )
+        for annotation_id, annotation in other._trace_annotations.items():
+            if annotation_id not in kept_annotations:
+                continue
+            annotation = remap(annotation)
+            self.add_trace_annotation(annotation)
+            for subtrace_id in other._trace_frame_annotation_trace_frame_assoc.get(
+                annotation_id, ()
+            ):
+                self.add_trace_frame_annotation_trace_frame_assoc(
+                    annotation, self._trace_frames[ids[subtrace_id].local_id]
+                )
+
+        for class_name, interval in other._class_type_intervals.items():
+            if class_name not in self._class_type_intervals:
+                self.add_class_type_interval(remap(interval))
+
+
+def _record_state(record: Any) -> Tuple[Type[object], Dict[str, Any]]:
+    fields = dict(record) if isinstance(record, Munch) else record._asdict()
+    return fields.pop("model"), fields
+
+
+def _record_from_state(state: Tuple[Type[object], Dict[str, Any]]) -> Any:
+    model, fields = state
+    if model is TraceFrame:
+        return TraceFrame.Record(extra_fields=["leaf_mapping"], **fields)
+    # pyre-ignore[16]: Models have a `Record` constructor.
+    return model.Record(**fields)
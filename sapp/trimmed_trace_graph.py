@@ -645,17 +645,20 @@ class TrimmedTraceGraph(TraceGraph):
         return graph._trace_frame_issue_instance_assoc[trace_frame_id]
 
     def _get_predecessor_frames(
-        self, graph: TraceGraph, leaves: Set[int], trace_frame: TraceFrame
-    ) -> List[Tuple[TraceFrame, Set[int]]]:
-        """Returns predecessor frames paired with leaf kinds to follow for those frames"""
+        self, graph: TraceGraph, leaves: int, trace_frame: TraceFrame
+    ) -> List[Tuple[TraceFrame, int]]:
+        """Returns predecessor frames paired with the mask of leaf kinds to follow
+        for those frames"""
         result = []
-        # pyre-fixme[6]: Enums and str are the same but Pyre doesn't think so.
-        for trace_frame_id in graph._trace_frames_rev_map[trace_frame.kind][
-            (trace_frame.caller_id.local_id, trace_frame.caller_port)
-        ]:
+        for trace_frame_id in graph.get_trace_frame_ids_from_callee(
+            # pyre-fixme[6]: Enums and str are the same but Pyre doesn't think so.
+            trace_frame.kind,
+            trace_frame.caller_id.local_id,
+            trace_frame.caller_port,
+        ):
             predecessor = graph._trace_frames[trace_frame_id]
             assert predecessor.leaf_mapping is not None
-            pred_kinds = graph.compute_prev_leaf_kinds(leaves, predecessor.leaf_mapping)
+            pred_kinds = graph.prev_leaf_kinds_mask(leaves, predecessor)
             result.append((predecessor, pred_kinds))
         return result
 
@@ -666,10 +669,12 @@ class TrimmedTraceGraph(TraceGraph):
         result = []
         assert trace_frame.leaf_mapping is not None
         succ_kinds = graph.compute_next_leaf_kinds(leaves, trace_frame.leaf_mapping)
-        # pyre-fixme[6]: Enums and str are the same but Pyre doesn't think so.
-        for trace_frame_id in graph._trace_frames_map[trace_frame.kind][
-            trace_frame.callee_id.local_id
-        ][trace_frame.callee_port]:
+        for trace_frame_id in graph.get_trace_frame_ids_from_caller(
+            # pyre-fixme[6]: Enums and str are the same but Pyre doesn't think so.
+            trace_frame.kind,
+            trace_frame.callee_id.local_id,
+            trace_frame.callee_port,
+        ):
             successor = graph._trace_frames[trace_frame_id]
             result.append(successor)
         return (result, succ_kinds)
@@ -698,11 +703,12 @@ class TrimmedTraceGraph(TraceGraph):
         graph: The trace graph to search for issues. Nodes/edges in this graph
         will be copied over to the local state
         """
-        visited: Dict[int, Set[int]] = {}
+        # Leaf kinds are followed as masks, see `TraceGraph.leaf_kind_bit`.
+        visited: Dict[int, int] = {}
         stack = [
             # We will be using these leaf kinds to look for matching callers. So
             # we need the caller view of the kinds.
-            (frame, graph.get_caller_leaf_kinds_of_frame(frame))
+            (frame, graph.leaf_mapping_masks(frame).caller_kinds)
             for frame in initial_conditions
         ]
 
@@ -716,11 +722,11 @@ class TrimmedTraceGraph(TraceGraph):
             cond_id = condition.id.local_id
 
             if cond_id in visited:
-                leaves = leaves - visited[cond_id]
-                if len(leaves) == 0:
+                leaves &= ~visited[cond_id]
+                if leaves == 0:
                     continue
                 else:
-                    visited[cond_id].update(leaves)
+                    visited[cond_id] |= leaves
             else:
                 visited[cond_id] = leaves
 
@@ -731,11 +737,10 @@ class TrimmedTraceGraph(TraceGraph):
                 # Check if the leaves (sources/sinks) of the issue reach
                 # the same leaves as the ones relevant to this condition.
                 instance = graph._issue_instances[instance_id]
-                issue_leaves = set(
+                issue_leaves = graph.leaf_kinds_mask(
                     self._get_instance_leaf_ids(graph, instance.id.local_id)
                 )
-                common_leaves = issue_leaves.intersection(leaves)
-                if len(common_leaves) > 0:
+                if issue_leaves & leaves:
                     if instance_id not in self._issue_instances:
                         self._populate_issue(graph, instance_id)
                     self.add_issue_instance_trace_frame_assoc(instance, condition)
@@ -756,10 +761,7 @@ class TrimmedTraceGraph(TraceGraph):
                     stack.append(
                         (
                             parent_frame,
-                            {
-                                leaf_map.caller_leaf
-                                for leaf_map in parent_frame.leaf_mapping
-                            },
+                            graph.leaf_mapping_masks(parent_frame).caller_kinds,
                         )
                     )
             else:
@@ -767,7 +769,7 @@ class TrimmedTraceGraph(TraceGraph):
                 for next_frame, frame_leaves in self._get_predecessor_frames(
                     graph, leaves, condition
                 ):
-                    if len(frame_leaves) > 0:
+                    if frame_leaves:
                         stack.append((next_frame, frame_leaves))
 
         # Add traces leading out from initial_conditions, and all visited
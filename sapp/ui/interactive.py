@@ -143,6 +143,7 @@ json CALLABLE        show the original json output for the matching callable
         repository_directory: Optional[str] = None,
         parser_class: Type[BaseParser],
         read_only: bool = False,
+        jobs: Optional[int] = None,
     ) -> None:
         self.db = database
         self.scope_vars: ScopeVariables = {
@@ -203,6 +204,7 @@ json CALLABLE        show the original json output for the matching callable
         self.prompt_history: Dict[str, History] = {}
 
         self.read_only = read_only
+        self.jobs = jobs
 
     def setup(self) -> ScopeVariables:
         if not self.read_only:
@@ -1709,7 +1711,9 @@ json CALLABLE        show the original json output for the matching callable
             not diagnostics
             or current_output.directory != diagnostics.analysis_output.directory
         ):
-            diagnostics = JSONDiagnostics(current_output, self.parser_class)
+            diagnostics = JSONDiagnostics(
+                current_output, self.parser_class, processes=self.jobs
+            )
             try:
                 diagnostics.load()
             except JSONDiagnosticsException as e: